@@ -0,0 +1,187 @@
+#-----------------------------------------------------
+# batchConvert.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Converts many images between 3D image file formats in one
+#              long-lived process, using a pool of worker processes.
+#              Each conversion is done by fileConverter.convert_image.
+#-----------------------------------------------------
+#
+# Usage:
+#   1. python batchConvert.py --manifest <MANIFEST.csv|MANIFEST.json> [--workers N]
+#
+#   2. python batchConvert.py --glob "<INPUT_PATTERN>" --template "<OUTPUT_TEMPLATE>" [--workers N]
+#
+#   e.g. python batchConvert.py --glob "/data/cohort/*.aim" --template "/data/nifti/{stem}.nii" --workers 8
+#
+# Notes:
+#   -A CSV manifest has two columns: input,output (an optional header row "input,output" is skipped).
+#   -A JSON manifest is a list of objects: [{"input": "...", "output": "..."}, ...]
+#   -The output template can use:
+#       {stem}   - input file name without extension (e.g. C0001234)
+#       {name}   - input file name (e.g. C0001234.AIM)
+#       {dir}    - input directory
+#       {parent} - name of the input directory
+#   -Each worker imports the toolkits it needs (SimpleITK, and VTK/vtkbone or pydicom only if an
+#    input needs them) once and then converts many images.
+#   -A per-image status and timing report is written as JSON (--report, default: batchReport.json).
+#   -If a worker process dies (e.g. a segmentation fault in VTK or vtkbone), the images that were not
+#    converted yet are reported as failed and the report is still written.
+#   -Two jobs with the same output file are rejected before anything is converted.
+#-----------------------------------------------------
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from util.dicom_codecs import SYNTAXES
+
+
+def read_manifest(manifestFile):
+    #
+    # Read (input, output) pairs from a CSV or JSON manifest
+    #
+    jobs = []
+
+    if manifestFile.lower().endswith(".json"):
+        with open(manifestFile) as jsonFile:
+            for item in json.load(jsonFile):
+                jobs.append( (item["input"], item["output"]) )
+    else:
+        with open(manifestFile) as csvFile:
+            for row in csv.reader(csvFile):
+                if len(row) < 2 or row[0].strip().startswith("#"):
+                    continue
+                if row[0].strip().lower() == "input" and row[1].strip().lower() == "output":
+                    continue
+                jobs.append( (row[0].strip(), row[1].strip()) )
+
+    return jobs
+
+
+def glob_jobs(pattern, template):
+    #
+    # Build (input, output) pairs from a glob pattern and an output template
+    #
+    jobs = []
+
+    for inputImage in sorted( glob.glob(pattern) ):
+        inputImage = os.path.normpath(inputImage)
+        inDirectory, inName = os.path.split(inputImage)
+
+        outputImage = template.format( stem = os.path.splitext(inName)[0],
+                                       name = inName,
+                                       dir = inDirectory,
+                                       parent = os.path.basename(inDirectory) )
+        jobs.append( (inputImage, outputImage) )
+
+    return jobs
+
+
+def _convert_job(job):
+    # Runs in a worker process. The toolkits are imported once per worker, not once per image.
+    from fileConverter import convert_image
+
+    inputImage, outputImage, slab, compression = job
+    start = time.time()
+
+    try:
+        convert_image(inputImage, outputImage, slab=slab, verbose=False, compression=compression)
+        status = "ok"
+        error = None
+    except Exception as e:
+        status = "error"
+        error = str(e)
+
+    return { "input": inputImage,
+             "output": outputImage,
+             "status": status,
+             "error": error,
+             "seconds": round(time.time() - start, 3) }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", type=str, help="CSV or JSON file listing the input and output images")
+    parser.add_argument("--glob", type=str, help="Glob pattern of the input images (quote it!)")
+    parser.add_argument("--template", type=str, help="Output file name template for --glob (e.g. /out/{stem}.nii)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--slab", type=int, default=None, help="Convert N slices at a time (streaming, see fileConverter.py)")
+    parser.add_argument("--report", type=str, default="batchReport.json", help="Where to write the per-image report (default: batchReport.json)")
+    parser.add_argument("--dicom-compression", type=str, default=None, choices=SYNTAXES, help="Write lossless compressed DICOM series (default: uncompressed)")
+    args = parser.parse_args()
+
+    if args.manifest is not None:
+        jobs = read_manifest(args.manifest)
+    elif args.glob is not None and args.template is not None:
+        jobs = glob_jobs(args.glob, args.template)
+    else:
+        print ("Error: provide either --manifest or both --glob and --template!")
+        sys.exit(1)
+
+    if len(jobs) == 0:
+        print ("Error: no images to convert!")
+        sys.exit(1)
+
+    # Two inputs writing the same output would overwrite each other
+    outputs = [ os.path.abspath(outputImage) for inputImage, outputImage in jobs ]
+    if len( set(outputs) ) != len(outputs):
+        print ("Error: several inputs would be written to the same output file!")
+        sys.exit(1)
+
+    # Make sure the output directories exist
+    for inputImage, outputImage in jobs:
+        outDirectory = os.path.dirname( os.path.abspath(outputImage) )
+        if not os.path.exists(outDirectory):
+            os.makedirs(outDirectory)
+
+    print ("Converting " + str(len(jobs)) + " images with " + str(args.workers) + " workers...")
+
+    start = time.time()
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [ pool.submit( _convert_job, (inputImage, outputImage, args.slab, args.dicom_compression) ) for inputImage, outputImage in jobs ]
+
+        for (inputImage, outputImage), future in zip(jobs, futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # A worker died: this image (and every other unfinished one) was not converted
+                result = { "input": inputImage,
+                           "output": outputImage,
+                           "status": "error",
+                           "error": "a worker process stopped abruptly (e.g. a crash in a toolkit) before the image was converted",
+                           "seconds": None }
+            results.append(result)
+
+            if result["status"] == "ok":
+                print ("[" + str(len(results)) + "/" + str(len(jobs)) + "] " + result["input"] + " -> " + result["output"] + " (" + str(result["seconds"]) + " s)")
+            else:
+                print ("[" + str(len(results)) + "/" + str(len(jobs)) + "] " + result["input"] + " FAILED: " + str(result["error"]))
+
+    failed = len( [ result for result in results if result["status"] != "ok" ] )
+
+    report = { "total": len(results),
+               "failed": failed,
+               "workers": args.workers,
+               "seconds": round(time.time() - start, 3),
+               "items": results }
+
+    with open(args.report, "w") as reportFile:
+        json.dump(report, reportFile, indent=2)
+
+    print ("Report written to: " + os.path.abspath(args.report))
+    print ("Done! " + str(len(results) - failed) + " converted, " + str(failed) + " failed.")
+
+    if failed > 0:
+        sys.exit(1)
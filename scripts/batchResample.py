@@ -0,0 +1,196 @@
+#-----------------------------------------------------
+# batchResample.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Resamples many images onto one common grid in one process,
+#              using a pool of worker processes (e.g. all scans of a
+#              longitudinal study onto the grid of the baseline scan).
+#-----------------------------------------------------
+#
+# Usage:
+#   1. python batchResample.py --reference <REFERENCE_IMAGE> --output-dir <OUTPUT_DIRECTORY> <INPUT_IMAGE> [<INPUT_IMAGE> ...]
+#
+#   2. python batchResample.py --spacing SX SY SZ --size NX NY NZ --origin OX OY OZ --output-dir <OUTPUT_DIRECTORY> <INPUT_IMAGE> ...
+#
+#   3. python batchResample.py --reference <REFERENCE_IMAGE> --glob "<INPUT_PATTERN>" --template "<OUTPUT_TEMPLATE>"
+#
+#   4. python batchResample.py --reference <REFERENCE_IMAGE> --manifest <MANIFEST.csv|MANIFEST.json>
+#
+#   e.g. python batchResample.py --reference /data/C0001_baseline.nii --glob "/data/C0001_*.nii" --template "/data/grid/{stem}.nii" --workers 4
+#
+# Notes:
+#   -The output grid is the grid of the reference image (only its header is read). --spacing together
+#    with --reference covers the reference extent with a different voxel size. Without a reference,
+#    --spacing, --size, and --origin are required and --direction (9 values, row-major) is optional.
+#   -Inputs can be NIfTI or MHA files, or DICOM directories. Outputs are written with SimpleITK, so the
+#    direction cosines are kept. Without --template/--manifest, the output is <OUTPUT_DIRECTORY>/<stem>_resampled.nii
+#   -The output geometry is computed once. Each worker builds its ResampleImageFilter on its first
+#    image and reuses it for every other image it is given (no pool initializer: Python 3.6 has none).
+#   -Manifests and templates are the same as for batchConvert.py.
+#   -With --max-memory each output is written in blocks of slices (see resample.py).
+#   -A per-image status and timing report is written as JSON (--report, default: batchResampleReport.json).
+#-----------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+from batchConvert import read_manifest, glob_jobs
+from util.resampling import BACKEND_INTERPOLATORS, parse_memory, reference_geometry
+from util.slab_io import Geometry
+
+# Set up once per worker process by _worker_resampler: (settings, resampler)
+_worker = None
+
+
+def _worker_resampler(settings):
+    # The resampler of this worker process, built on its first job (again if the settings change)
+    global _worker
+    from util.resampling import sitk_resampler
+
+    if _worker is None or _worker[0] != settings:
+        geometry, interpolator, threads, maxMemory = settings
+        _worker = ( settings, sitk_resampler(geometry, interpolator, threads) )
+
+    return _worker[1]
+
+
+def _resample_job(job):
+    # Runs in a worker process. job is (input image, output image, (geometry, interpolator, threads, maxMemory))
+    from util.resampling import sitk_read, resample_to_grid
+
+    inputImage, outputImage, settings = job
+    geometry = settings[0]
+    maxMemory = settings[3]
+    start = time.time()
+
+    try:
+        resample_to_grid( sitk_read( os.path.abspath(inputImage) ), geometry, outputImage, _worker_resampler(settings), maxMemory )
+        status = "ok"
+        error = None
+    except Exception as e:
+        status = "error"
+        error = str(e)
+
+    return { "input": inputImage,
+             "output": outputImage,
+             "status": status,
+             "error": error,
+             "seconds": round(time.time() - start, 3) }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", type=str, nargs="*", help="Input images or DICOM directories (use with --output-dir)")
+    parser.add_argument("--output-dir", type=str, help="Output directory for the input images given on the command line")
+    parser.add_argument("--manifest", type=str, help="CSV or JSON file listing the input and output images")
+    parser.add_argument("--glob", type=str, help="Glob pattern of the input images (quote it!)")
+    parser.add_argument("--template", type=str, help="Output file name template for --glob (e.g. /out/{stem}.nii)")
+    parser.add_argument("--reference", type=str, help="Reference image or DICOM directory that defines the output grid")
+    parser.add_argument("--spacing", type=float, nargs=3, help="Output voxel size (x y z)")
+    parser.add_argument("--size", type=int, nargs=3, help="Output dimensions (x y z), without --reference")
+    parser.add_argument("--origin", type=float, nargs=3, help="Output origin (x y z), without --reference")
+    parser.add_argument("--direction", type=float, nargs=9, default=[1,0,0, 0,1,0, 0,0,1], help="Output direction cosines (9 values, row-major), without --reference")
+    parser.add_argument("--interpolator", type=str, default="bspline", choices=BACKEND_INTERPOLATORS["sitk"], help="Interpolation method (default: bspline)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads per worker (default: number of CPUs / workers)")
+    parser.add_argument("--max-memory", type=str, default=None, help="Write each output in blocks using at most this much memory (e.g. 512M, 4G)")
+    parser.add_argument("--report", type=str, default="batchResampleReport.json", help="Where to write the per-image report (default: batchResampleReport.json)")
+    args = parser.parse_args()
+
+    # The output grid, computed once for all inputs
+    try:
+        if args.reference is not None:
+            geometry = reference_geometry( os.path.abspath(args.reference), args.spacing )
+        elif args.spacing is not None and args.size is not None and args.origin is not None:
+            geometry = Geometry( tuple(args.size), tuple(args.spacing), tuple(args.origin), tuple(args.direction) )
+        else:
+            print ("Error: provide either --reference or all of --spacing, --size, and --origin!")
+            sys.exit(1)
+    except (ValueError, RuntimeError) as e:
+        print ("Error: " + str(e))
+        sys.exit(1)
+
+    if args.manifest is not None:
+        jobs = read_manifest(args.manifest)
+    elif args.glob is not None and args.template is not None:
+        jobs = glob_jobs(args.glob, args.template)
+    elif len(args.inputs) > 0 and args.output_dir is not None:
+        jobs = []
+        for inputImage in args.inputs:
+            stem = os.path.splitext( os.path.basename( os.path.normpath(inputImage) ) )[0]
+            jobs.append( (inputImage, os.path.join(args.output_dir, stem + "_resampled.nii")) )
+    else:
+        print ("Error: provide --manifest, --glob and --template, or input images and --output-dir!")
+        sys.exit(1)
+
+    if len(jobs) == 0:
+        print ("Error: no images to resample!")
+        sys.exit(1)
+
+    # Two inputs writing the same output would overwrite each other (e.g. scan.nii and scan.mha with --output-dir)
+    outputs = [ os.path.abspath(outputImage) for inputImage, outputImage in jobs ]
+    if len( set(outputs) ) != len(outputs):
+        print ("Error: several inputs would be written to the same output file!")
+        sys.exit(1)
+
+    # Make sure the output directories exist
+    for inputImage, outputImage in jobs:
+        outDirectory = os.path.dirname( os.path.abspath(outputImage) )
+        if not os.path.exists(outDirectory):
+            os.makedirs(outDirectory)
+
+    workers = max(1, args.workers)
+    threads = args.threads
+    if threads is None:
+        threads = max( 1, (os.cpu_count() or 1) // workers )
+
+    maxMemory = None
+    if args.max_memory is not None:
+        maxMemory = parse_memory(args.max_memory)
+
+    print ("Output grid:")
+    print ("Dimensions:  " + str(geometry.size))
+    print ("Spacing:     " + str(geometry.spacing))
+    print ("Origin:      " + str(geometry.origin))
+    print ("Direction:   " + str(geometry.direction))
+    print ("Resampling " + str(len(jobs)) + " images with " + str(workers) + " workers (" + str(threads) + " threads each)...")
+
+    start = time.time()
+    results = []
+
+    settings = ( geometry, args.interpolator, threads, maxMemory )
+
+    with ProcessPoolExecutor( max_workers=workers ) as pool:
+        for result in pool.map( _resample_job, [ ( inputImage, outputImage, settings ) for inputImage, outputImage in jobs ] ):
+            results.append(result)
+
+            if result["status"] == "ok":
+                print ("[" + str(len(results)) + "/" + str(len(jobs)) + "] " + result["input"] + " -> " + result["output"] + " (" + str(result["seconds"]) + " s)")
+            else:
+                print ("[" + str(len(results)) + "/" + str(len(jobs)) + "] " + result["input"] + " FAILED: " + str(result["error"]))
+
+    failed = len( [ result for result in results if result["status"] != "ok" ] )
+
+    report = { "total": len(results),
+               "failed": failed,
+               "workers": workers,
+               "threads": threads,
+               "grid": geometry._asdict(),
+               "seconds": round(time.time() - start, 3),
+               "items": results }
+
+    with open(args.report, "w") as reportFile:
+        json.dump(report, reportFile, indent=2)
+
+    print ("Report written to: " + os.path.abspath(args.report))
+    print ("Done! " + str(len(results) - failed) + " resampled, " + str(failed) + " failed.")
+
+    if failed > 0:
+        sys.exit(1)
@@ -0,0 +1,104 @@
+# coding=utf-8
+#-----------------------------------------------------
+# daemon_latency.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Compares the per-job time of small jobs run as a new process
+#              (python manskelab.py ...) and on the conversion service
+#              (manskelabd.py), which keeps the toolkits imported.
+#-----------------------------------------------------
+#
+# Usage:
+#   python daemon_latency.py [--jobs 20] [--workers 2] [--size 64]
+#
+# Notes:
+#   -The jobs convert a small synthetic NIfTI image (--size^3 voxels) to MHA and AIM, and
+#    resample it with VTK, so the time is mostly start-up, not work.
+#   -"service" is the wall time seen by the client (submit() to reply), "run" is the time
+#    spent in the worker, the difference is the socket/queue overhead.
+#-----------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+SCRIPTS_DIRECTORY = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+sys.path.insert( 0, SCRIPTS_DIRECTORY )
+
+from manskelabd import submit, request
+from benchmarks.startup_time import write_nifti
+
+
+def median(values):
+    values = sorted(values)
+    return values[ len(values) // 2 ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=20, help="Number of jobs per case (default: 20)")
+    parser.add_argument("--workers", type=int, default=2, help="Number of service workers (default: 2)")
+    parser.add_argument("--size", type=int, default=64, help="Size of the test image in voxels per axis (default: 64)")
+    args = parser.parse_args()
+
+    workDirectory = tempfile.mkdtemp(prefix="daemon_latency_")
+    socketPath = os.path.join(workDirectory, "manskelabd.sock")
+    inputImage = os.path.join(workDirectory, "input.nii")
+    write_nifti(inputImage, args.size)
+
+    cases = [ ("convert nii-mha",   [ "convert", inputImage, os.path.join(workDirectory, "output.mha") ]),
+              ("convert nii-aim",   [ "convert", inputImage, os.path.join(workDirectory, "output.aim") ]),
+              ("resample vtk",      [ "resample", inputImage, workDirectory, "1", "1", "1" ]) ]
+
+    service = subprocess.Popen( [ sys.executable, os.path.join(SCRIPTS_DIRECTORY, "manskelabd.py"), "serve",
+                                  "--socket", socketPath, "--workers", str(args.workers) ],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL )
+
+    try:
+        start = time.perf_counter()
+        while True:
+            try:
+                request(socketPath, None, { "command": "status" })
+                break
+            except (IOError, OSError):
+                if service.poll() is not None:
+                    raise RuntimeError("The service did not start")
+                time.sleep(0.05)
+        print ("Service started in " + "{:.2f}".format(time.perf_counter() - start) + " s\n")
+
+        print ( "{:<18} {:>14} {:>14} {:>14} {:>10}".format("case", "process (s)", "service (s)", "run (s)", "speed-up") )
+
+        for name, job in cases:
+            processTimes = []
+            for i in range(args.jobs):
+                start = time.perf_counter()
+                subprocess.run( [ sys.executable, os.path.join(SCRIPTS_DIRECTORY, "manskelab.py") ] + job,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True )
+                processTimes.append( time.perf_counter() - start )
+
+            serviceTimes = []
+            runTimes = []
+            for i in range(args.jobs):
+                start = time.perf_counter()
+                reply = submit( job[0], job[1:], socketPath )
+                serviceTimes.append( time.perf_counter() - start )
+
+                if reply["status"] != "ok":
+                    raise RuntimeError(name + " failed on the service:\n" + reply["output"])
+                runTimes.append( reply["run_seconds"] )
+
+            print ( "{:<18} {:>14.4f} {:>14.4f} {:>14.4f} {:>9.1f}x".format( name, median(processTimes), median(serviceTimes), median(runTimes),
+                                                                              median(processTimes) / median(serviceTimes) ) )
+    finally:
+        try:
+            request(socketPath, None, { "command": "stop" })
+            service.wait(timeout=30)
+        except (IOError, OSError, subprocess.TimeoutExpired):
+            service.kill()
+        shutil.rmtree(workDirectory, ignore_errors=True)
@@ -0,0 +1,143 @@
+# coding=utf-8
+#-----------------------------------------------------
+# dicom_compression.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Compares the size and the encode/decode time of each lossless
+#              DICOM transfer syntax (util/dicom_codecs.py) on a DICOM series.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -gdcm, pydicom, numpy
+#
+# Usage:
+#   python dicom_compression.py [<DICOM_FOLDER>] [--repeat 3] [--json results.json]
+#
+#   The default DICOM folder is the example series in img/hand-ct-dicom.
+#
+# Notes:
+#   -Every file is compressed from its uncompressed form (decompressed first if needed),
+#    so all syntaxes start from the same input.
+#   -Times are the best of --repeat runs over the whole series. Decoding is timed with
+#    pydicom (pixel_array) and checked against the uncompressed pixels.
+#-----------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+import numpy as np
+import pydicom
+
+from util.dicom_codecs import SYNTAXES, compress_file
+
+DEFAULT_SERIES = os.path.join( os.path.dirname( os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) ), "img", "hand-ct-dicom" )
+
+
+def uncompressed_copy(inputDirectory, outDirectory):
+    # Write an uncompressed (Explicit VR Little Endian) copy of every DICOM file
+    fileNames = []
+
+    for name in sorted( os.listdir(inputDirectory) ):
+        inputFile = os.path.join(inputDirectory, name)
+        if not os.path.isfile(inputFile):
+            continue
+
+        try:
+            dicom = pydicom.dcmread(inputFile)
+        except pydicom.errors.InvalidDicomError:
+            continue
+
+        outputFile = os.path.join(outDirectory, name)
+
+        if dicom.file_meta.TransferSyntaxUID.is_compressed:
+            dicom.decompress()
+            dicom.save_as(outputFile)
+        else:
+            shutil.copy2(inputFile, outputFile)
+
+        fileNames.append(outputFile)
+
+    return fileNames
+
+
+def decode_all(fileNames):
+    return [ pydicom.dcmread(fileName).pixel_array for fileName in fileNames ]
+
+
+def benchmark(fileNames, syntax, workDirectory, repeat):
+    # Compress (and decode) the series with one syntax, return the result as a dictionary
+    outFileNames = [ os.path.join(workDirectory, os.path.basename(fileName)) for fileName in fileNames ]
+
+    encode = float("inf")
+    for r in range(repeat):
+        start = time.time()
+        for inputFile, outputFile in zip(fileNames, outFileNames):
+            compress_file(inputFile, outputFile, syntax)
+        encode = min( encode, time.time() - start )
+
+    decode = float("inf")
+    for r in range(repeat):
+        start = time.time()
+        pixels = decode_all(outFileNames)
+        decode = min( decode, time.time() - start )
+
+    return { "syntax": syntax,
+             "bytes": sum( os.path.getsize(fileName) for fileName in outFileNames ),
+             "encode_s": round(encode, 4),
+             "decode_s": round(decode, 4),
+             "pixels": pixels }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputDirectory", type=str, nargs="?", default=DEFAULT_SERIES, help="DICOM series directory (default: img/hand-ct-dicom)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per syntax, the best time is reported (default: 3)")
+    parser.add_argument("--json", type=str, default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    tempDirectory = tempfile.mkdtemp(prefix="dicom_compression_")
+
+    try:
+        uncompressedDirectory = os.path.join(tempDirectory, "uncompressed")
+        os.mkdir(uncompressedDirectory)
+        fileNames = uncompressed_copy(args.inputDirectory, uncompressedDirectory)
+
+        if len(fileNames) == 0:
+            print ("Error: no DICOM files found in " + args.inputDirectory)
+            sys.exit(1)
+
+        rawBytes = sum( os.path.getsize(fileName) for fileName in fileNames )
+        reference = decode_all(fileNames)
+
+        print ("Series: " + os.path.abspath(args.inputDirectory) + " (" + str(len(fileNames)) + " files, " + str(rawBytes) + " bytes uncompressed)")
+        print ( "{:<10} {:>12} {:>8} {:>12} {:>12} {:>9}".format("syntax", "bytes", "ratio", "encode (s)", "decode (s)", "lossless") )
+
+        results = []
+        for syntax in SYNTAXES:
+            workDirectory = os.path.join(tempDirectory, syntax)
+            os.mkdir(workDirectory)
+
+            result = benchmark(fileNames, syntax, workDirectory, max(1, args.repeat))
+            pixels = result.pop("pixels")
+
+            result["ratio"] = round( float(rawBytes) / result["bytes"], 2 )
+            result["lossless"] = all( np.array_equal(a, b) for a, b in zip(reference, pixels) )
+            results.append(result)
+
+            print ( "{:<10} {:>12} {:>8.2f} {:>12.4f} {:>12.4f} {:>9}".format(
+                    result["syntax"], result["bytes"], result["ratio"], result["encode_s"], result["decode_s"], str(result["lossless"]) ) )
+    finally:
+        shutil.rmtree(tempDirectory, ignore_errors=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as jsonFile:
+            json.dump( { "series": os.path.abspath(args.inputDirectory), "files": len(fileNames), "uncompressed_bytes": rawBytes, "results": results }, jsonFile, indent=2 )
@@ -0,0 +1,69 @@
+# coding=utf-8
+#-----------------------------------------------------
+# flip_speed.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Compares the time to flip an image with vtkImageReslice (the old
+#              flipImage.py method) and with the array reordering of util/reorient.py.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -numpy, SimpleITK, VTK
+#
+# Usage:
+#   python flip_speed.py [<INPUT_IMAGE_OR_DICOM_DIRECTORY> ...] [--axes x,y,z,xy,xz,yz] [--repeat 3]
+#
+#   The default input is the example series in img/hand-ct-dicom.
+#
+# Notes:
+#   -The input is read once before timing, only the flip itself is timed (best of --repeat runs).
+#-----------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+from util.reorient import FLIP_COSINES, reslice_image, reorient_image
+from util.resampling import sitk_read
+from util.sitk_vtk import sitk2vtk
+
+DEFAULT_INPUT = os.path.join( os.path.dirname( os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) ), "img", "hand-ct-dicom" )
+
+
+def best_time(function, repeat):
+    # Best of repeat runs of function(), in seconds
+    best = float("inf")
+
+    for r in range( max(1, repeat) ):
+        start = time.time()
+        function()
+        best = min( best, time.time() - start )
+
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", type=str, nargs="*", default=[DEFAULT_INPUT], help="Input images or DICOM directories (default: img/hand-ct-dicom)")
+    parser.add_argument("--axes", type=str, default="x,y,z,xy,xz,yz", help="Comma separated flip axes (default: x,y,z,xy,xz,yz)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    for inputImage in args.inputs:
+        image = sitk2vtk( sitk_read( os.path.abspath(inputImage) ) )
+
+        print ("Input: " + inputImage + " " + str(image.GetDimensions()))
+        print ( "{:<6} {:>12} {:>12} {:>10}".format("axis", "reslice (s)", "reorder (s)", "speedup") )
+
+        for axis in args.axes.split(","):
+            cosines = FLIP_COSINES[axis]
+
+            resliceSeconds = best_time( lambda: reslice_image(image, cosines), args.repeat )
+            reorderSeconds = best_time( lambda: reorient_image(image, cosines), args.repeat )
+
+            print ( "{:<6} {:>12.4f} {:>12.4f} {:>9.1f}x".format( axis, resliceSeconds, reorderSeconds, resliceSeconds / max(reorderSeconds, 1e-9) ) )
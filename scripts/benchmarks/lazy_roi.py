@@ -0,0 +1,97 @@
+# coding=utf-8
+#-----------------------------------------------------
+# lazy_roi.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Compares cropping a region of interest with util/lazy_volume.py
+#              (memory-mapped) and with SimpleITK (read the whole image, then crop).
+#-----------------------------------------------------
+#
+# Requirements:
+#   -numpy, SimpleITK
+#
+# Usage:
+#   python lazy_roi.py <INPUT_IMAGE> [--roi 200]
+#
+#   python lazy_roi.py --create 1000 /tmp/big.nii     (writes a 1000^3 int16 test volume first)
+#
+# Notes:
+#   -Each method runs in its own process so the peak memory (max RSS) of each is reported separately.
+#   -The ROI is a cube of --roi voxels in the centre of the image.
+#   -Run each method on a cold page cache for disk timings (e.g. sync; echo 3 > /proc/sys/vm/drop_caches).
+#-----------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import resource
+import argparse
+import subprocess
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+import numpy as np
+
+
+def create_volume(fileName, n):
+    # Write an n^3 int16 NIfTI volume, one slice at a time
+    from util.volume_headers import nifti_header
+
+    with open(fileName, "wb") as niftiFile:
+        niftiFile.write( nifti_header( (n, n, n), (0.1, 0.1, 0.1), (0.0, 0.0, 0.0), (1, 0, 0, 0, 1, 0, 0, 0, 1), "int16" ) )
+
+        for z in range(n):
+            niftiFile.write( ( np.arange(n * n, dtype=np.int64).reshape(n, n) + z ).astype(np.int16).tobytes() )
+
+
+def run(method, inputImage, roi):
+    # Crop the centre ROI with one method, return the result as a dict
+    start = time.time()
+
+    if method == "lazy":
+        from util.lazy_volume import LazyVolume
+
+        volume = LazyVolume(inputImage)
+        index = [ max(0, (n - roi) // 2) for n in volume.size ]
+        image = volume.roi_image( index, [ min(roi, n) for n in volume.size ] )
+    else:
+        import SimpleITK as sitk
+
+        image = sitk.ReadImage(inputImage)
+        index = [ max(0, (n - roi) // 2) for n in image.GetSize() ]
+        image = sitk.RegionOfInterest( image, [ min(roi, n) for n in image.GetSize() ], index )
+
+    return { "method": method,
+             "seconds": round(time.time() - start, 3),
+             "roi": list( image.GetSize() ),
+             "max_rss_mb": round( resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1 ) }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputImage", type=str, help="Uncompressed MHA, MHD, or NIfTI image")
+    parser.add_argument("--roi", type=int, default=200, help="Edge length of the ROI cube in voxels (default: 200)")
+    parser.add_argument("--create", type=int, default=None, help="First write an N^3 int16 test volume to the input path")
+    parser.add_argument("--method", type=str, default=None, choices=["lazy", "sitk"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run one method and print the result
+    if args.method is not None:
+        print ( json.dumps( run(args.method, args.inputImage, args.roi) ) )
+        sys.exit(0)
+
+    if args.create is not None:
+        print ("Writing a " + str(args.create) + "^3 test volume to: " + args.inputImage)
+        create_volume(args.inputImage, args.create)
+
+    print ("Input: " + args.inputImage + " (" + str( round( os.path.getsize(args.inputImage) / 1024.0**2, 1 ) ) + " MB)")
+    print ( "{:<8} {:>10} {:>14} {:>20}".format("method", "seconds", "max RSS (MB)", "ROI") )
+
+    for method in ["lazy", "sitk"]:
+        output = subprocess.check_output( [ sys.executable, os.path.abspath(__file__), args.inputImage, "--roi", str(args.roi), "--method", method ] )
+        result = json.loads( output.decode().strip().splitlines()[-1] )
+
+        print ( "{:<8} {:>10.3f} {:>14.1f} {:>20}".format( method, result["seconds"], result["max_rss_mb"], str(result["roi"]) ) )
@@ -0,0 +1,435 @@
+# coding=utf-8
+#-----------------------------------------------------
+# run_benchmarks.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Benchmark suite for the scripts. Times every entry point and records
+#              its peak memory, on the example series in img/hand-ct-dicom and on
+#              synthetic volumes, and writes the results to JSON so runs can be
+#              compared across commits.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Linux or Mac (uses os.wait4 to read the peak RSS of each run)
+#   -numpy, SimpleITK, VTK, pydicom, gdcm
+#
+# Usage:
+#   1. python run_benchmarks.py [--synthetic 128 256] [--no-bundled] [--cases <REGEX>] [--repeat 3] [--json results.json]
+#
+#   2. python run_benchmarks.py --compare <BASELINE.json> <RESULTS.json> [--threshold 0.2]
+#
+#   e.g. on two commits:
+#       git checkout main;  python run_benchmarks.py --json main.json
+#       git checkout topic; python run_benchmarks.py --json topic.json
+#       python run_benchmarks.py --compare main.json topic.json
+#
+# Notes:
+#   -Cases (for each dataset):
+#       decompressDICOM                 (a JPEG-LS compressed copy of the series)
+#       dicomSeriesSort
+#       fileConverter <IN>-<OUT>        (every pair of dicom, nii, mha, aim)
+#       resample <BACKEND>-<INTERP>     (every backend and interpolator, spacing x --resample-factor)
+#       flipImage <AXIS>                (x, y, z, xy, xz, yz)
+#       sitk2vtk, vtk2sitk              (util/sitk_vtk.py)
+#   -Every run is a new Python process, started on a fresh copy of its input where the script
+#    changes its input directory. The time of the scripts is the wall time of the whole process
+#    (Python start-up and imports included, as a user sees it). sitk2vtk and vtk2sitk only time
+#    the conversion (VTK is imported before the timer starts). The peak memory is the max RSS of the process.
+#   -This process only starts the runs and does not import numpy, SimpleITK, or VTK itself
+#    (on Linux the max RSS of a child process starts at the max RSS of its parent).
+#   -The best time of --repeat runs is reported, with the largest peak memory of those runs.
+#   -Synthetic volumes are N^3 int16 images (a sphere in a ramp), written as NIfTI and converted
+#    to the other formats before timing starts. The DICOM header cache is kept in the work directory.
+#   -With --compare a case is a regression if its time or memory grew by more than --threshold
+#    (a fraction, default 0.2) and by more than 0.05 s or 5 MB. The exit code is 1 if there is one.
+#-----------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+SCRIPTS_DIRECTORY = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+sys.path.insert( 0, SCRIPTS_DIRECTORY )
+
+DEFAULT_SERIES = os.path.join( os.path.dirname(SCRIPTS_DIRECTORY), "img", "hand-ct-dicom" )
+
+FORMATS = ["dicom", "nii", "mha", "aim"]
+FLIP_AXES = ["x", "y", "z", "xy", "xz", "yz"]
+CONVERSIONS = ["sitk2vtk", "vtk2sitk"]
+
+# A regression has to be at least this large (seconds, MB) to be reported
+MIN_SECONDS = 0.05
+MIN_MB = 5.0
+
+
+def script(name):
+    return os.path.join(SCRIPTS_DIRECTORY, name)
+
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on Mac
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss / 1024.0**2
+    return rusage.ru_maxrss / 1024.0
+
+
+def file_converter(inputPath, outputPath, workDirectory):
+    # Convert a fixture with fileConverter.py (not timed)
+    if os.path.splitext(outputPath)[1] == ".dcm" and not os.path.exists( os.path.dirname(outputPath) ):
+        os.makedirs( os.path.dirname(outputPath) )
+
+    subprocess.check_call( [ sys.executable, script("fileConverter.py"), inputPath, outputPath ],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=child_environment(workDirectory) )
+
+
+def child_environment(workDirectory):
+    # Keep the DICOM header cache of the runs out of the user's cache
+    environment = dict(os.environ)
+    environment["MANSKELAB_CACHE_DIR"] = os.path.join(workDirectory, "cache")
+    return environment
+
+
+def synthetic_volume(fileName, n):
+    #
+    # Write an n^3 int16 NIfTI volume (a bright sphere in a ramp), one slice at a time (run in a child process)
+    #
+    import numpy as np
+    from util.volume_headers import nifti_header
+
+    y, x = np.mgrid[0:n, 0:n].astype(np.float32)
+    centre = (n - 1) / 2.0
+
+    with open(fileName, "wb") as niftiFile:
+        niftiFile.write( nifti_header( (n, n, n), (0.082, 0.082, 0.082), (0.0, 0.0, 0.0), (1, 0, 0, 0, 1, 0, 0, 0, 1), "int16" ) )
+
+        for z in range(n):
+            distance = (x - centre)**2 + (y - centre)**2 + (z - centre)**2
+            voxels = x + y + z + np.where( distance < (n / 3.0)**2, 1000, 0 )
+            niftiFile.write( voxels.astype(np.int16).tobytes() )
+
+
+def prepare_dataset(name, workDirectory, series=None, n=None):
+    #
+    # Write the input of every case for one dataset (not timed)
+    # @params:
+    #     series - Optional  : DICOM series directory to start from
+    #     n      - Optional  : size of a synthetic volume (used if series is None)
+    # @returns:
+    #     A dict with the path of each format, plus "dicom_compressed"
+    #
+    directory = os.path.join(workDirectory, name)
+    os.makedirs(directory)
+
+    fixtures = { "nii": os.path.join(directory, "image.nii"),
+                 "mha": os.path.join(directory, "image.mha"),
+                 "aim": os.path.join(directory, "image.aim") }
+
+    if series is not None:
+        fixtures["dicom"] = series
+        file_converter( series, fixtures["nii"], workDirectory )
+    else:
+        fixtures["dicom"] = os.path.join(directory, "dicom")
+        subprocess.check_call( [ sys.executable, os.path.abspath(__file__), "--create", str(n), fixtures["nii"] ] )
+        file_converter( fixtures["nii"], os.path.join(fixtures["dicom"], "image.dcm"), workDirectory )
+
+    file_converter( fixtures["nii"], fixtures["mha"], workDirectory )
+    file_converter( fixtures["nii"], fixtures["aim"], workDirectory )
+
+    # A JPEG-LS compressed copy of the series for decompressDICOM (written to <copy>/compressedDICOMs)
+    shutil.copytree( fixtures["dicom"], os.path.join(directory, "compress") )
+    subprocess.check_call( [ sys.executable, script("compressDICOM.py"), os.path.join(directory, "compress"), "--syntax", "jpegls" ],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=child_environment(workDirectory) )
+    fixtures["dicom_compressed"] = os.path.join(directory, "compress", "compressedDICOMs")
+
+    return fixtures
+
+
+def describe(inputImage):
+    #
+    # Spacing of an image and the resampling backends and interpolators (run in a child process)
+    #
+    import SimpleITK as sitk
+    from util.resampling import BACKENDS, BACKEND_INTERPOLATORS
+
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(inputImage)
+    reader.ReadImageInformation()
+
+    return { "spacing": reader.GetSpacing(), "backends": BACKENDS, "interpolators": BACKEND_INTERPOLATORS }
+
+
+def copy_series(source):
+    # Prepare function: a fresh copy of a DICOM series in the run directory
+    def prepare(runDirectory):
+        destination = os.path.join(runDirectory, "series")
+        shutil.copytree(source, destination)
+        return destination
+    return prepare
+
+
+def link_file(source):
+    # Prepare function: the input file in the run directory (flipImage writes its output next to its input)
+    def prepare(runDirectory):
+        destination = os.path.join( runDirectory, os.path.basename(source) )
+        if hasattr(os, "symlink"):
+            os.symlink(source, destination)
+        else:
+            shutil.copy2(source, destination)
+        return destination
+    return prepare
+
+
+def output_path(extension):
+    # Prepare function: an output path in the run directory
+    def prepare(runDirectory):
+        if extension == ".dcm":
+            os.makedirs( os.path.join(runDirectory, "dicom") )
+            return os.path.join(runDirectory, "dicom", "image.dcm")
+        return os.path.join(runDirectory, "output" + extension)
+    return prepare
+
+
+def build_cases(fixtures, resampleFactor):
+    #
+    # The cases of one dataset
+    # @returns:
+    #     A list of (name, arguments, child times itself) where each argument is a string or a
+    #     prepare function that is called with the run directory and returns a string
+    #
+    extensions = { "dicom": ".dcm", "nii": ".nii", "mha": ".mha", "aim": ".aim" }
+
+    output = subprocess.check_output( [ sys.executable, os.path.abspath(__file__), "--describe", fixtures["nii"] ] )
+    information = json.loads( output.decode().strip().splitlines()[-1] )
+    spacing = [ str(s * resampleFactor) for s in information["spacing"] ]
+
+    cases = []
+    cases.append( ("decompressDICOM", [ script("decompressDICOM.py"), copy_series( fixtures["dicom_compressed"] ) ], False) )
+    cases.append( ("dicomSeriesSort", [ script("dicomSeriesSort.py"), copy_series( fixtures["dicom"] ) ], False) )
+
+    for inputFormat in FORMATS:
+        for outputFormat in FORMATS:
+            if inputFormat != outputFormat:
+                cases.append( ( "fileConverter " + inputFormat + "-" + outputFormat,
+                                [ script("fileConverter.py"), fixtures[inputFormat], output_path( extensions[outputFormat] ) ], False ) )
+
+    for backend in information["backends"]:
+        for interpolator in information["interpolators"][backend]:
+            cases.append( ( "resample " + backend + "-" + interpolator,
+                            [ script("resample.py"), fixtures["nii"], lambda runDirectory: runDirectory ] + spacing
+                            + [ "--backend", backend, "--interpolator", interpolator ], False ) )
+
+    for axis in FLIP_AXES:
+        cases.append( ( "flipImage " + axis, [ script("flipImage.py"), link_file( fixtures["mha"] ), axis ], False ) )
+
+    for conversion in CONVERSIONS:
+        cases.append( ( conversion, [ os.path.abspath(__file__), "--convert", conversion, fixtures["nii"] ], True ) )
+
+    return cases
+
+
+def run_once(arguments, selfTimed, workDirectory):
+    #
+    # Run one case once in a new process
+    # @returns:
+    #     (seconds, peak memory in MB, error message or None)
+    #
+    runDirectory = tempfile.mkdtemp(prefix="run_", dir=workDirectory)
+
+    try:
+        command = [sys.executable] + [ argument(runDirectory) if callable(argument) else argument for argument in arguments ]
+        logFileName = os.path.join(runDirectory, "log.txt")
+
+        with open(logFileName, "w") as logFile:
+            start = time.perf_counter()
+            process = subprocess.Popen( command, stdout=logFile, stderr=subprocess.STDOUT, cwd=runDirectory, env=child_environment(workDirectory) )
+            pid, status, rusage = os.wait4(process.pid, 0)
+            seconds = time.perf_counter() - start
+            process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+
+        with open(logFileName) as logFile:
+            log = logFile.read().strip().splitlines()
+
+        if process.returncode != 0:
+            return ( seconds, peak_rss_mb(rusage), " | ".join(log[-3:]) or "exit code " + str(process.returncode) )
+
+        if selfTimed:
+            seconds = json.loads( log[-1] )["seconds"]
+
+        return ( seconds, peak_rss_mb(rusage), None )
+    finally:
+        shutil.rmtree(runDirectory, ignore_errors=True)
+
+
+def run_conversion(conversion, inputImage):
+    #
+    # Time sitk2vtk or vtk2sitk on an image (run in the child process)
+    #
+    import SimpleITK as sitk
+    from util.sitk_vtk import sitk2vtk, vtk2sitk
+
+    # sitk2vtk imports VTK on its first call: import it here so it is not timed
+    import vtk
+    import vtk.util.numpy_support
+
+    image = sitk.ReadImage(inputImage)
+
+    if conversion == "vtk2sitk":
+        image = sitk2vtk(image)
+
+    start = time.perf_counter()
+    converted = sitk2vtk(image) if conversion == "sitk2vtk" else vtk2sitk(image)
+
+    return { "seconds": time.perf_counter() - start }
+
+
+def metadata():
+    # Where and on what the benchmarks ran (only called after all the runs)
+    import numpy
+    import vtk
+    import SimpleITK as sitk
+
+    try:
+        commit = subprocess.check_output( ["git", "rev-parse", "HEAD"], cwd=SCRIPTS_DIRECTORY, stderr=subprocess.DEVNULL ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return { "commit": commit,
+             "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+             "python": platform.python_version(),
+             "platform": platform.platform(),
+             "cpus": os.cpu_count(),
+             "numpy": numpy.__version__,
+             "SimpleITK": sitk.Version.VersionString(),
+             "vtk": vtk.vtkVersion.GetVTKVersion() }
+
+
+def compare(baselineFileName, resultsFileName, threshold):
+    #
+    # Print the change of every case between two result files
+    # @returns:
+    #     The number of regressions
+    #
+    with open(baselineFileName) as baselineFile:
+        baseline = json.load(baselineFile)
+    with open(resultsFileName) as resultsFile:
+        results = json.load(resultsFile)
+
+    before = dict( ( (result["dataset"], result["case"]), result ) for result in baseline["results"] )
+
+    print ("Baseline: " + str( baseline["metadata"].get("commit") ) + " (" + baseline["metadata"]["date"] + ")")
+    print ("Results:  " + str( results["metadata"].get("commit") ) + " (" + results["metadata"]["date"] + ")")
+    print ( "{:<20} {:<28} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}".format("dataset", "case", "old (s)", "new (s)", "change", "old (MB)", "new (MB)", "change") )
+
+    regressions = 0
+    for result in results["results"]:
+        old = before.get( (result["dataset"], result["case"]) )
+        if old is None or old.get("error") or result.get("error"):
+            continue
+
+        timeChange = result["seconds"] / old["seconds"] - 1.0 if old["seconds"] > 0 else 0.0
+        memoryChange = result["max_rss_mb"] / old["max_rss_mb"] - 1.0 if old["max_rss_mb"] > 0 else 0.0
+
+        slower = timeChange > threshold and result["seconds"] - old["seconds"] > MIN_SECONDS
+        larger = memoryChange > threshold and result["max_rss_mb"] - old["max_rss_mb"] > MIN_MB
+
+        flag = ""
+        if slower or larger:
+            regressions += 1
+            flag = "  <-- " + " and ".join( [ name for name, changed in [ ("slower", slower), ("more memory", larger) ] if changed ] )
+
+        print ( "{:<20} {:<28} {:>10.3f} {:>10.3f} {:>+7.0%} {:>10.1f} {:>10.1f} {:>+7.0%}{}".format(
+                result["dataset"], result["case"], old["seconds"], result["seconds"], timeChange,
+                old["max_rss_mb"], result["max_rss_mb"], memoryChange, flag ) )
+
+    print (str(regressions) + " regression(s) (threshold: " + str( int(threshold * 100) ) + "%)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[], help="Also run on synthetic N^3 volumes of these sizes (e.g. 128 256)")
+    parser.add_argument("--no-bundled", dest="bundled", action="store_false", help="Do not run on img/hand-ct-dicom")
+    parser.add_argument("--series", type=str, default=DEFAULT_SERIES, help="DICOM series to use as the bundled dataset (default: img/hand-ct-dicom)")
+    parser.add_argument("--cases", type=str, default=None, help="Only run the cases whose name matches this regular expression")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per case, the best time is reported (default: 3)")
+    parser.add_argument("--resample-factor", type=float, default=2.0, help="Output spacing of the resample cases, times the input spacing (default: 2.0)")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--work-directory", type=str, default=None, help="Directory for the test data and outputs (default: a temporary directory)")
+    parser.add_argument("--compare", type=str, nargs=2, default=None, metavar=("BASELINE", "RESULTS"), help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change that counts as a regression with --compare (default: 0.2)")
+    parser.add_argument("--convert", type=str, nargs=2, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--create", type=str, nargs=2, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--describe", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child processes: time one sitk2vtk / vtk2sitk conversion, write a synthetic volume, or describe an image
+    if args.convert is not None:
+        print ( json.dumps( run_conversion(args.convert[0], args.convert[1]) ) )
+        sys.exit(0)
+
+    if args.create is not None:
+        synthetic_volume( args.create[1], int(args.create[0]) )
+        sys.exit(0)
+
+    if args.describe is not None:
+        print ( json.dumps( describe(args.describe) ) )
+        sys.exit(0)
+
+    if args.compare is not None:
+        sys.exit( 1 if compare(args.compare[0], args.compare[1], args.threshold) > 0 else 0 )
+
+    datasets = []
+    if args.bundled:
+        datasets.append( (os.path.basename( os.path.normpath(args.series) ), args.series, None) )
+    for n in args.synthetic:
+        datasets.append( ("synthetic-" + str(n), None, n) )
+
+    if len(datasets) == 0:
+        print ("Error: no datasets to run (use --synthetic N or leave out --no-bundled)")
+        sys.exit(1)
+
+    workDirectory = tempfile.mkdtemp(prefix="benchmarks_", dir=args.work_directory)
+    results = []
+
+    try:
+        print ( "{:<20} {:<28} {:>10} {:>14}".format("dataset", "case", "seconds", "max RSS (MB)") )
+
+        for name, series, n in datasets:
+            fixtures = prepare_dataset( name, workDirectory, os.path.abspath(series) if series is not None else None, n )
+
+            for case, arguments, selfTimed in build_cases(fixtures, args.resample_factor):
+                if args.cases is not None and re.search(args.cases, case) is None:
+                    continue
+
+                runs = [ run_once(arguments, selfTimed, workDirectory) for r in range( max(1, args.repeat) ) ]
+                errors = [ error for seconds, peak, error in runs if error is not None ]
+
+                result = { "dataset": name,
+                           "case": case,
+                           "seconds": round( min( seconds for seconds, peak, error in runs ), 4 ),
+                           "max_rss_mb": round( max( peak for seconds, peak, error in runs ), 1 ),
+                           "repeat": len(runs) }
+
+                if len(errors) > 0:
+                    result["error"] = errors[0]
+                    print ( "{:<20} {:<28} {:>10} {:>14}   {}".format(name, case, "failed", "", errors[0]) )
+                else:
+                    print ( "{:<20} {:<28} {:>10.3f} {:>14.1f}".format(name, case, result["seconds"], result["max_rss_mb"]) )
+
+                results.append(result)
+    finally:
+        shutil.rmtree(workDirectory, ignore_errors=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as jsonFile:
+            json.dump( { "metadata": metadata(), "results": results }, jsonFile, indent=2 )
+        print ("Results written to: " + os.path.abspath(args.json))
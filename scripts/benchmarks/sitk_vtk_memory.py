@@ -0,0 +1,140 @@
+# coding=utf-8
+#-----------------------------------------------------
+# sitk_vtk_memory.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Measures the peak memory used by sitk2vtk and vtk2sitk
+#              (util/sitk_vtk.py) on a synthetic volume.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Linux or Mac (uses the resource module to read the peak RSS)
+#   -numpy, SimpleITK, VTK
+#
+# Usage:
+#   python sitk_vtk_memory.py [--size-mb 512]
+#
+# Notes:
+#   -Each case runs in a fresh Python process so the peak RSS of one case does not
+#    hide the next. The reported ratio is:
+#         (peak RSS after the conversion - peak RSS before the input was created) / volume size
+#    so the input volume itself counts as 1.0. sitk2vtk should stay at ~1.0 (no copy).
+#    vtk2sitk should stay at ~2.0 (the input plus the one copy SimpleITK has to own).
+#   -The "legacy" cases reproduce the old conversion (GetArrayFromImage + tostring +
+#    CopyImportVoidPointer, and reshape + transpose + GetImageFromArray) for comparison.
+#-----------------------------------------------------
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+CASES = ["sitk2vtk", "sitk2vtk-legacy", "vtk2sitk", "vtk2sitk-legacy"]
+
+
+def peak_rss_bytes():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on Mac
+    if sys.platform == "darwin":
+        return peak
+    return peak * 1024
+
+
+def legacy_sitk2vtk(img):
+    import vtk
+    import SimpleITK as sitk
+    from util.sitk_vtk import pixelmap
+
+    size = list(img.GetSize())
+    i2 = sitk.GetArrayFromImage(img)
+    i2_string = i2.tobytes()
+
+    dataImporter = vtk.vtkImageImport()
+    dataImporter.CopyImportVoidPointer(i2_string, len(i2_string))
+    dataImporter.SetDataScalarType(pixelmap[img.GetPixelID()])
+    dataImporter.SetNumberOfScalarComponents(img.GetNumberOfComponentsPerPixel())
+    dataImporter.SetDataExtent(0, size[0]-1, 0, size[1]-1, 0, size[2]-1)
+    dataImporter.SetWholeExtent(0, size[0]-1, 0, size[1]-1, 0, size[2]-1)
+    dataImporter.Update()
+
+    return dataImporter.GetOutput()
+
+
+def legacy_vtk2sitk(img):
+    import SimpleITK as sitk
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    numpy_data = vtk_to_numpy(img.GetPointData().GetScalars())
+    dims = img.GetDimensions()
+    numpy_data = numpy_data.reshape(dims[2], dims[1], dims[0])
+    numpy_data = numpy_data.transpose(2, 1, 0)
+
+    return sitk.GetImageFromArray(numpy_data)
+
+
+def run_case(case, sizeMB):
+    # Run a single case in this process and return the result as a dictionary
+    import vtk
+    import SimpleITK as sitk
+    from vtk.util.numpy_support import vtk_to_numpy
+    from util.sitk_vtk import sitk2vtk, vtk2sitk
+
+    # Cube of 16-bit voxels with the requested size
+    n = int( round( (sizeMB * 1024 * 1024 / 2.0) ** (1.0 / 3.0) ) )
+    volumeBytes = n * n * n * 2
+
+    before = peak_rss_bytes()
+
+    if case.startswith("sitk2vtk"):
+        sitk_image = sitk.Image(n, n, n, sitk.sitkInt16)
+        sitk_image.SetSpacing( (0.082, 0.082, 0.082) )
+    else:
+        vtk_image = vtk.vtkImageData()
+        vtk_image.SetDimensions(n, n, n)
+        vtk_image.SetSpacing(0.082, 0.082, 0.082)
+        vtk_image.AllocateScalars(vtk.VTK_SHORT, 1)
+
+        # Touch every page so the input volume is resident
+        vtk_to_numpy( vtk_image.GetPointData().GetScalars() )[:] = 0
+
+    if case == "sitk2vtk":
+        output = sitk2vtk(sitk_image)
+    elif case == "sitk2vtk-legacy":
+        output = legacy_sitk2vtk(sitk_image)
+    elif case == "vtk2sitk":
+        output = vtk2sitk(vtk_image)
+    elif case == "vtk2sitk-legacy":
+        output = legacy_vtk2sitk(vtk_image)
+
+    after = peak_rss_bytes()
+
+    return { "case": case,
+             "volume_mb": round(volumeBytes / 1024.0 / 1024.0, 1),
+             "peak_mb": round( (after - before) / 1024.0 / 1024.0, 1 ),
+             "ratio": round( float(after - before) / volumeBytes, 2 ) }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=512, help="Size of the synthetic volume in MB (default: 512)")
+    parser.add_argument("--case", type=str, choices=CASES, help="Run a single case in this process (used internally)")
+    args = parser.parse_args()
+
+    if args.case is not None:
+        print (json.dumps( run_case(args.case, args.size_mb) ))
+        sys.exit(0)
+
+    for case in CASES:
+        output = subprocess.check_output( [sys.executable, os.path.abspath(__file__), "--case", case, "--size-mb", str(args.size_mb)] )
+        result = json.loads( output.decode().strip().splitlines()[-1] )
+
+        print ( "{:<18} volume: {:>8.1f} MB   peak: {:>8.1f} MB   peak/volume: {:.2f}".format(
+                result["case"], result["volume_mb"], result["peak_mb"], result["ratio"] ) )
@@ -0,0 +1,167 @@
+# coding=utf-8
+#-----------------------------------------------------
+# startup_time.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Measures the start-up time of manskelab.py commands and which
+#              toolkits (VTK, vtkbone, SimpleITK, pydicom, gdcm) each one loads,
+#              using python -X importtime.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.7 or later (-X importtime)
+#
+# Usage:
+#   python startup_time.py [--repeat 5] [--json results.json]
+#
+# Notes:
+#   -Each case is run --repeat times in a new Python process, the best wall time is reported.
+#    "imports" is the total import time reported by -X importtime for that run.
+#   -Every case lists the toolkits it must not load. The exit code is 1 if a case loads one of them,
+#    so the script can be used as a check.
+#   -The "all toolkits" case imports every toolkit, i.e. what every command cost when the scripts
+#    imported them all at the top.
+#-----------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+SCRIPTS_DIRECTORY = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+sys.path.insert( 0, SCRIPTS_DIRECTORY )
+
+MANSKELAB = os.path.join(SCRIPTS_DIRECTORY, "manskelab.py")
+
+TOOLKITS = ["vtk", "vtkbone", "SimpleITK", "pydicom", "gdcm", "numpy"]
+
+IMPORT_ALL = "import vtk, SimpleITK, pydicom\ntry:\n    import gdcm, vtkbone\nexcept ImportError:\n    pass"
+
+
+def toolkit(module):
+    # Toolkit a module belongs to (None for everything else)
+    top = module.split(".")[0]
+
+    if top == "vtkmodules":
+        return "vtk"
+    if top in TOOLKITS:
+        return top
+    return None
+
+
+def parse_importtime(stderr):
+    #
+    # Parse the -X importtime output of a run
+    # @returns:
+    #     (total import time in seconds, set of toolkits that were imported)
+    #
+    total = 0
+    toolkits = set()
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+
+        name = fields[2].rstrip()
+
+        # Top-level imports are not indented, their cumulative time includes everything they import
+        if not name.startswith("  ") and name.strip() != "":
+            total += int( fields[1] )
+
+        if toolkit( name.strip() ) is not None:
+            toolkits.add( toolkit( name.strip() ) )
+
+    return ( total / 1e6, toolkits )
+
+
+def write_nifti(fileName, n=64):
+    # A small n^3 int16 NIfTI image (all zeros) as the input of the conversion cases
+    from util.volume_headers import nifti_header
+
+    with open(fileName, "wb") as niftiFile:
+        niftiFile.write( nifti_header( (n, n, n), (0.5, 0.5, 0.5), (0.0, 0.0, 0.0), (1, 0, 0, 0, 1, 0, 0, 0, 1), "int16" ) )
+        niftiFile.write( bytes(n * n * n * 2) )
+
+
+def build_cases(workDirectory):
+    #
+    # (name, arguments after "python -X importtime", toolkits the case must not load)
+    #
+    inputImage = os.path.join(workDirectory, "input.nii")
+    write_nifti(inputImage)
+
+    noDicom = ["vtk", "vtkbone", "pydicom", "gdcm"]
+
+    return [ ("manskelab --help",         [ MANSKELAB, "--help" ],                                            ["vtk", "vtkbone", "SimpleITK", "pydicom", "gdcm", "numpy"]),
+             ("convert --help",           [ MANSKELAB, "convert", "--help" ],                                 noDicom),
+             ("convert nii-mha",          [ MANSKELAB, "convert", inputImage, os.path.join(workDirectory, "output.mha") ], noDicom),
+             ("convert nii-aim",          [ MANSKELAB, "convert", inputImage, os.path.join(workDirectory, "output.aim") ], noDicom),
+             ("resample --backend sitk",  [ MANSKELAB, "resample", inputImage, workDirectory, "1", "1", "1", "--backend", "sitk" ], noDicom),
+             ("resample --help",          [ MANSKELAB, "resample", "--help" ],                                noDicom),
+             ("flip --help",              [ MANSKELAB, "flip", "--help" ],                                    noDicom),
+             ("reorient --show",          [ MANSKELAB, "reorient", inputImage, "--show" ],                    ["vtk", "vtkbone", "SimpleITK", "pydicom", "gdcm"]),
+             ("all toolkits",             [ "-c", IMPORT_ALL ],                                               []) ]
+
+
+def run_case(arguments, workDirectory):
+    #
+    # Run a case once
+    # @returns:
+    #     (wall time in seconds, import time in seconds, imported toolkits)
+    #
+    start = time.perf_counter()
+    process = subprocess.run( [ sys.executable, "-X", "importtime" ] + arguments, cwd=workDirectory,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True )
+    seconds = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError("Failed: " + " ".join(arguments) + "\n" + process.stderr[-2000:])
+
+    imports, toolkits = parse_importtime(process.stderr)
+    return ( seconds, imports, toolkits )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs per case, the best time is reported (default: 5)")
+    parser.add_argument("--json", type=str, default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    workDirectory = tempfile.mkdtemp(prefix="startup_time_")
+    results = []
+    failures = 0
+
+    try:
+        print ( "{:<26} {:>10} {:>12}   {:<36} {}".format("case", "wall (s)", "imports (s)", "toolkits loaded", "check") )
+
+        for name, arguments, forbidden in build_cases(workDirectory):
+            runs = [ run_case(arguments, workDirectory) for r in range( max(1, args.repeat) ) ]
+            seconds, imports, toolkits = min( runs, key=lambda run: run[0] )
+
+            loaded = [ name for name in TOOLKITS if name in toolkits ]
+            unexpected = [ name for name in forbidden if name in toolkits ]
+            failures += len(unexpected) > 0
+
+            check = "ok" if len(unexpected) == 0 else "FAIL (loads " + ", ".join(unexpected) + ")"
+            print ( "{:<26} {:>10.3f} {:>12.3f}   {:<36} {}".format( name, seconds, imports, ", ".join(loaded) or "-", check ) )
+
+            results.append( { "case": name, "seconds": round(seconds, 4), "import_seconds": round(imports, 4),
+                              "toolkits": loaded, "unexpected": unexpected } )
+    finally:
+        shutil.rmtree(workDirectory, ignore_errors=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as jsonFile:
+            json.dump( results, jsonFile, indent=2 )
+
+    sys.exit( 1 if failures > 0 else 0 )
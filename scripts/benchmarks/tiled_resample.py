@@ -0,0 +1,129 @@
+# coding=utf-8
+#-----------------------------------------------------
+# tiled_resample.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Checks that tiled resampling (resample.py --max-memory) writes
+#              the same image as resampling in one go, and compares their time.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -numpy, SimpleITK, VTK
+#
+# Usage:
+#   python tiled_resample.py [--size 96] [--max-memory 1M] [--angle 17]
+#
+# Notes:
+#   -The test inputs are a NIfTI and an oblique MHA (rotated --angle degrees about Z) with random voxels.
+#    An oblique MHA checks the direction cosines of the tiled output (vtkMetaImageReader stores them
+#    transposed in the VTK direction).
+#   -Each input is resampled with the vtk and sitk backends, whole and with --max-memory. The tiled
+#    output must read back with the same voxels, origin, spacing, and direction as the whole output.
+#   -Exits with 1 if any tiled output differs.
+#-----------------------------------------------------
+
+import os
+import sys
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+SCRIPTS_DIRECTORY = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+
+import numpy as np
+import SimpleITK as sitk
+
+
+def write_inputs(directory, n, angle):
+    # A NIfTI and an oblique MHA test image of n x n x n/2 int16 voxels
+    image = sitk.GetImageFromArray( np.random.RandomState(0).randint(0, 2000, (n // 2, n, n)).astype(np.int16) )
+    image.SetSpacing( (0.8, 0.9, 1.1) )
+    image.SetOrigin( (10.0, -5.0, 3.0) )
+
+    niftiImage = os.path.join(directory, "input.nii")
+    sitk.WriteImage(image, niftiImage)
+
+    c = math.cos( math.radians(angle) )
+    s = math.sin( math.radians(angle) )
+    image.SetDirection( (c, -s, 0, s, c, 0, 0, 0, 1) )
+
+    metaImage = os.path.join(directory, "oblique.mha")
+    sitk.WriteImage(image, metaImage)
+
+    return [ niftiImage, metaImage ]
+
+
+def run_resample(inputImage, outputDirectory, backend, maxMemory):
+    # Run resample.py in a child process, returns the seconds it took
+    os.makedirs(outputDirectory)
+
+    command = [ sys.executable, os.path.join(SCRIPTS_DIRECTORY, "resample.py"), inputImage, outputDirectory, "0.7", "0.7", "0.7", "--backend", backend ]
+    if maxMemory is not None:
+        command += [ "--max-memory", maxMemory ]
+
+    start = time.time()
+    subprocess.run( command, stdout=subprocess.DEVNULL, check=True )
+    return time.time() - start
+
+
+def differences(wholeImage, tiledImage):
+    # What differs between two output images (empty if they read back identically)
+    whole = sitk.ReadImage(wholeImage)
+    tiled = sitk.ReadImage(tiledImage)
+    problems = []
+
+    if whole.GetSize() != tiled.GetSize():
+        return [ "size " + str(tiled.GetSize()) + " != " + str(whole.GetSize()) ]
+    if not np.array_equal( sitk.GetArrayViewFromImage(whole), sitk.GetArrayViewFromImage(tiled) ):
+        problems.append("voxels")
+    if not np.allclose( whole.GetSpacing(), tiled.GetSpacing(), atol=1e-5 ):
+        problems.append("spacing")
+    if not np.allclose( whole.GetOrigin(), tiled.GetOrigin(), atol=1e-4 ):
+        problems.append( "origin " + str( tuple( round(v, 4) for v in tiled.GetOrigin() ) ) + " != " + str( tuple( round(v, 4) for v in whole.GetOrigin() ) ) )
+    if not np.allclose( whole.GetDirection(), tiled.GetDirection(), atol=1e-5 ):
+        problems.append( "direction " + str( tuple( round(v, 3) for v in tiled.GetDirection() ) ) + " != " + str( tuple( round(v, 3) for v in whole.GetDirection() ) ) )
+
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=96, help="Edge length of the test images in voxels (default: 96)")
+    parser.add_argument("--max-memory", type=str, default="1M", help="Memory budget of the tiled runs (default: 1M)")
+    parser.add_argument("--angle", type=float, default=17.0, help="Rotation of the oblique MHA about Z in degrees (default: 17)")
+    args = parser.parse_args()
+
+    workDirectory = tempfile.mkdtemp(prefix="tiled_resample_")
+    failed = 0
+
+    try:
+        print ( "{:<14} {:<8} {:>12} {:>12}   {}".format("input", "backend", "whole (s)", "tiled (s)", "check") )
+
+        for inputImage in write_inputs(workDirectory, args.size, args.angle):
+            name = os.path.basename(inputImage)
+            outputName = "reslice.mha" if inputImage.endswith(".mha") else "reslice.nii"
+
+            for backend in ["vtk", "sitk"]:
+                wholeDirectory = os.path.join(workDirectory, name + "_" + backend + "_whole")
+                tiledDirectory = os.path.join(workDirectory, name + "_" + backend + "_tiled")
+
+                wholeSeconds = run_resample(inputImage, wholeDirectory, backend, None)
+                tiledSeconds = run_resample(inputImage, tiledDirectory, backend, args.max_memory)
+
+                problems = differences( os.path.join(wholeDirectory, outputName), os.path.join(tiledDirectory, outputName) )
+                if len(problems) > 0:
+                    failed += 1
+
+                print ( "{:<14} {:<8} {:>12.3f} {:>12.3f}   {}".format( name, backend, wholeSeconds, tiledSeconds,
+                                                                       "ok" if len(problems) == 0 else "DIFFERENT: " + ", ".join(problems) ) )
+    finally:
+        shutil.rmtree(workDirectory, ignore_errors=True)
+
+    if failed > 0:
+        print ("\n" + str(failed) + " tiled output(s) differ from the whole output")
+        sys.exit(1)
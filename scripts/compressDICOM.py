@@ -0,0 +1,149 @@
+# coding=utf-8
+#-----------------------------------------------------
+# compressDICOM.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Losslessly compresses DICOM images (the inverse of decompressDICOM.py).
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.4 or later
+#   -gdcm
+#
+# Usage:
+#   python compressDICOM.py <DICOM_FOLDER>
+#   python compressDICOM.py <DICOM_FOLDER> --syntax jpeg2000 --workers 8
+#
+# Notes:
+#   -The compressed DICOM directory it will be created automatically
+#    in the DICOM folder and will be named: compressedDICOMs
+#   -Supported transfer syntaxes (all lossless, default: jpegls):
+#       jpeg, jpegls, jpeg2000, rle     (see util/dicom_codecs.py)
+#   -Files that already have the requested transfer syntax are copied as they are.
+#   -Use --workers N to spread the work over N processes.
+#-----------------------------------------------------
+
+import argparse
+import os
+import sys
+import errno
+import shutil
+import multiprocessing
+
+import pydicom
+
+from pydicom.errors import InvalidDicomError
+
+from util.dicom_codecs import SYNTAXES, TRANSFER_SYNTAXES, compress_file
+from decompressDICOM import print_progress
+
+
+def compress_dicom_file(currentFilePath, outputPathAbs, syntax):
+    #
+    # Compress a single DICOM file
+    # @params:
+    #     currentFilePath - Required  : path to the input DICOM file (Str)
+    #     outputPathAbs   - Required  : directory to write the compressed file to (Str)
+    #     syntax          - Required  : one of util.dicom_codecs.SYNTAXES (Str)
+    # @returns:
+    #     (status, message) where status is one of "invalid", "compressed", or "done"
+    #
+    filename = os.path.basename(currentFilePath)
+
+    # Only the header is needed to check the file and its transfer syntax
+    try:
+        dicom = pydicom.dcmread(currentFilePath, stop_before_pixels=True)
+    except InvalidDicomError:
+        return ("invalid", "File: " + currentFilePath + " is not a valid DICOM file. Skipping...")
+
+    # Rename the DICOM file to include a file extension (if needed)
+    if "." not in filename:
+        outputFilePath = os.path.join(outputPathAbs, filename + ".dcm")
+    else:
+        outputFilePath = os.path.join(outputPathAbs, filename)
+
+    # Already in the requested transfer syntax
+    if dicom.file_meta.TransferSyntaxUID == TRANSFER_SYNTAXES[syntax]:
+        shutil.copy2(currentFilePath, outputFilePath)
+        return ("compressed", None)
+
+    try:
+        compress_file(currentFilePath, outputFilePath, syntax)
+    except (ValueError, IOError) as e:
+        return ("invalid", "File: " + currentFilePath + " could not be compressed (" + str(e) + "). Skipping...")
+
+    return ("done", None)
+
+
+def _compress_job(job):
+    # Pool.imap_unordered only passes a single argument
+    return compress_dicom_file(*job)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputDirectory", type=str, help="The input DICOM directory")
+    parser.add_argument("-s", "--syntax", type=str, default="jpegls", choices=SYNTAXES, help="Lossless transfer syntax (default: jpegls)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes (default: 1, serial)")
+    args = parser.parse_args()
+
+    inputPath = args.inputDirectory
+
+    # Check if the provided directory exists
+    if not os.path.exists(inputPath):
+        print ("Error: provided directory does not exist!")
+        sys.exit(1)
+
+    if args.workers < 1:
+        print ("Error: --workers must be at least 1!")
+        sys.exit(1)
+
+    inputPathAbs = os.path.abspath(inputPath)
+    outputPathAbs = os.path.join(inputPathAbs, "compressedDICOMs")
+
+    # Create the directory for compressed DICOMs inside the DICOM folder
+    try:
+        os.mkdir(outputPathAbs)
+    except OSError as e:
+        if e.errno != errno.EEXIST:     # Directory already exists error
+            raise
+
+    jobs = []
+    for file in os.listdir(inputPathAbs):
+        filename = os.fsdecode(file)
+        currentFilePath = os.path.join(inputPathAbs, filename)
+
+        if os.path.isfile(currentFilePath):
+            jobs.append( (currentFilePath, outputPathAbs, args.syntax) )
+
+    l = len(jobs)
+
+    # Counter for the progress bar
+    i = 0
+
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers)
+        results = pool.imap_unordered(_compress_job, jobs, chunksize=max(1, l // (args.workers * 4)))
+    else:
+        pool = None
+        results = map(_compress_job, jobs)
+
+    try:
+        for status, message in results:
+            if message is not None:
+                print (message)
+
+            if status == "invalid":
+                continue
+
+            # Update progress bar
+            print_progress(i + 1, l, prefix = 'Progress:', suffix = 'Complete', bar_length = 50)
+            i = i + 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print ("Done!")
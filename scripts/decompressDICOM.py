@@ -14,10 +14,14 @@
 #
 # Usage:
 #   python decompressDICOM.py <COMPRESSED_DICOM_FOLDER>
+#   python decompressDICOM.py <COMPRESSED_DICOM_FOLDER> --workers 8
 #
 # Notes:
 #   -The decompressed DICOM directory it will be created automatically
 #    in the compressed DICOM folder and will be named: decompressedDICOMs
+#   -Use --workers N to spread the read/decompress/save work over N processes.
+#    Every file is handled by the same function in both modes, so the output
+#    is identical to a serial run.
 #-----------------------------------------------------
 #   TO-DO:
 #       -Change the DICOM header to reflect decompression
@@ -28,7 +32,7 @@ import argparse
 import os
 import sys
 import errno
-import platform
+import multiprocessing
 
 from pydicom.errors import InvalidDicomError
 
@@ -57,91 +61,130 @@ def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_lengt
     sys.stdout.flush()
 
 
-parser = argparse.ArgumentParser()
-parser.add_argument("inputDirectory", type=str, help="The input DICOM directory (compressed files)")
-args = parser.parse_args()
-
-inputPath = args.inputDirectory
-
-# Check if the provided directory exists
-if not os.path.exists(inputPath):
-    print ("Error: provided directory does not exist!")
-    sys.exit(1)
-
-# Get the absolute path of the directory provided. Use os.path.join() to avoid slash direction issues between Mac, Linux, and Windows
-inputPathAbs = os.path.abspath(inputPath)
-outputPathAbs = os.path.join(inputPathAbs, "decompressedDICOMs")
-
-# Create the directory for decompressed DICOMs inside the compressed DICOM folder
-try:
-    os.mkdir(outputPathAbs)
-except OSError as e:
-    if e.errno != errno.EEXIST:     # Directory already exists error
-        raise
-
-# Get the number of files in a directory for the progress bar
-l = len( [ name for name in os.listdir(inputPathAbs) if os.path.isfile( os.path.join(inputPathAbs, name) ) ] )
-
-# Counter for the progress bar
-i = 0
-
-# Loop through all DICOMs in the provided directory, rename and decompress
-for file in os.listdir(inputPathAbs):
-    filename = os.fsdecode(file)
-
-    currentFilePath = os.path.join(inputPathAbs, filename)
-
-    # Check if we have a file
-    if os.path.isfile(currentFilePath):
-
-        # Read the DICOM file. Make sure we have a valid DICOM file...
-        try:
-            dicom = pydicom.dcmread(currentFilePath)
-        except InvalidDicomError:
-            print ("File: " + currentFilePath + " is not a valid DICOM file. Skipping...")
-            continue
-
-        # Check transfer syntax tag in DICOM header to see if file is compressed or not
-        # If the file is already decompressed, skip it
-        tsUID = dicom.file_meta.TransferSyntaxUID
-
-        # Uncompressed Implicit VR Little-endian = 1.2.840.10008.1.2
-        # Uncompressed Explicit VR Little-endian = 1.2.840.10008.1.2.1
-        # Uncompressed Explicit VR Big-endian = 1.2.840.10008.1.2.2
-        if (tsUID == "1.2.840.10008.1.2") or (tsUID == "1.2.840.10008.1.2.1") or (tsUID == "1.2.840.10008.1.2.2"):
-            print ("File " + filename + " is not compressed...")
-            continue
-
-        # Rename the DICOM file to include a file extension (if needed)
-        if "." not in filename:
-            outputFilePath = os.path.join(outputPathAbs, filename + ".dcm")
-
-            dicom.decompress()
-
-            # Save the decompressed file
-            try:
-                dicom.save_as(outputFilePath)
-            except OSError as e:
-                if e.errno != errno.ENOENT:     # No such file or directory error
-                    print ("ERROR: No such file or directory named " + outputFilePath)
-                    raise
-
-        # For cases when we have compressed DICOMs with file extensions
-        elif ".dcm" in filename:
-            outputFilePath = os.path.join(outputPathAbs, filename)
-
-            dicom.decompress()
-
-            # Save the decompressed file
-            try:
-                dicom.save_as(outputFilePath)
-            except OSError as e:
-                if e.errno != errno.ENOENT:     # No such file or directory error
-                    print ("ERROR: No such file or directory named " + outputFilePath)
-                    raise
-
-        # Update progress bar
-        print_progress(i + 1, l, prefix = 'Progress:', suffix = 'Complete', bar_length = 50)
-        i = i + 1
-
-print ("Done!")
+def decompress_file(currentFilePath, outputPathAbs):
+    #
+    # Read, decompress, and save a single DICOM file
+    # @params:
+    #     currentFilePath - Required  : path to the (compressed) input DICOM file (Str)
+    #     outputPathAbs   - Required  : directory to write the decompressed file to (Str)
+    # @returns:
+    #     (status, message) where status is one of "invalid", "uncompressed", or "done"
+    #
+    filename = os.path.basename(currentFilePath)
+
+    # Read the DICOM file. Make sure we have a valid DICOM file...
+    try:
+        dicom = pydicom.dcmread(currentFilePath)
+    except InvalidDicomError:
+        return ("invalid", "File: " + currentFilePath + " is not a valid DICOM file. Skipping...")
+
+    # Check transfer syntax tag in DICOM header to see if file is compressed or not
+    # If the file is already decompressed, skip it
+    tsUID = dicom.file_meta.TransferSyntaxUID
+
+    # Uncompressed Implicit VR Little-endian = 1.2.840.10008.1.2
+    # Uncompressed Explicit VR Little-endian = 1.2.840.10008.1.2.1
+    # Uncompressed Explicit VR Big-endian = 1.2.840.10008.1.2.2
+    if (tsUID == "1.2.840.10008.1.2") or (tsUID == "1.2.840.10008.1.2.1") or (tsUID == "1.2.840.10008.1.2.2"):
+        return ("uncompressed", "File " + filename + " is not compressed...")
+
+    # Rename the DICOM file to include a file extension (if needed)
+    if "." not in filename:
+        outputFilePath = os.path.join(outputPathAbs, filename + ".dcm")
+    # For cases when we have compressed DICOMs with file extensions
+    elif ".dcm" in filename:
+        outputFilePath = os.path.join(outputPathAbs, filename)
+    else:
+        return ("done", None)
+
+    # Newer pydicom versions give the decompressed file a new SOP Instance UID by default.
+    # Keep the original UID (as pydicom 1.x does) so repeated and parallel runs give identical files.
+    try:
+        dicom.decompress(generate_instance_uid=False)
+    except TypeError:
+        dicom.decompress()
+
+    # Save the decompressed file
+    try:
+        dicom.save_as(outputFilePath)
+    except OSError as e:
+        if e.errno != errno.ENOENT:     # No such file or directory error
+            print ("ERROR: No such file or directory named " + outputFilePath)
+            raise
+
+    return ("done", None)
+
+
+def _decompress_job(job):
+    # Pool.imap_unordered only passes a single argument
+    return decompress_file(*job)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputDirectory", type=str, help="The input DICOM directory (compressed files)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes (default: 1, serial)")
+    args = parser.parse_args()
+
+    inputPath = args.inputDirectory
+
+    # Check if the provided directory exists
+    if not os.path.exists(inputPath):
+        print ("Error: provided directory does not exist!")
+        sys.exit(1)
+
+    if args.workers < 1:
+        print ("Error: --workers must be at least 1!")
+        sys.exit(1)
+
+    # Get the absolute path of the directory provided. Use os.path.join() to avoid slash direction issues between Mac, Linux, and Windows
+    inputPathAbs = os.path.abspath(inputPath)
+    outputPathAbs = os.path.join(inputPathAbs, "decompressedDICOMs")
+
+    # Create the directory for decompressed DICOMs inside the compressed DICOM folder
+    try:
+        os.mkdir(outputPathAbs)
+    except OSError as e:
+        if e.errno != errno.EEXIST:     # Directory already exists error
+            raise
+
+    # Get all files in the directory. The number of files is used for the progress bar
+    jobs = []
+    for file in os.listdir(inputPathAbs):
+        filename = os.fsdecode(file)
+        currentFilePath = os.path.join(inputPathAbs, filename)
+
+        if os.path.isfile(currentFilePath):
+            jobs.append( (currentFilePath, outputPathAbs) )
+
+    l = len(jobs)
+
+    # Counter for the progress bar
+    i = 0
+
+    # Loop through all DICOMs in the provided directory, rename and decompress.
+    # With more than one worker the files are handed out in chunks and results come back as they finish.
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers)
+        results = pool.imap_unordered(_decompress_job, jobs, chunksize=max(1, l // (args.workers * 4)))
+    else:
+        pool = None
+        results = map(_decompress_job, jobs)
+
+    try:
+        for status, message in results:
+            if message is not None:
+                print (message)
+
+            if status != "done":
+                continue
+
+            # Update progress bar
+            print_progress(i + 1, l, prefix = 'Progress:', suffix = 'Complete', bar_length = 50)
+            i = i + 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print ("Done!")
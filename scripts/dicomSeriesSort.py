@@ -16,20 +16,35 @@
 # Notes:
 #   -The newly created subdirectories are named based on the series description tag
 #   -These new directories are placed in the same directory that is provided
-#   -The DICOMs in the provided directory are not modified in any way, just copied
+#   -The DICOMs in the provided directory are not modified, except with --mode move (they are
+#    moved into the series directories)
+#   -Files are named IM_<INSTANCE NUMBER>.dcm. If that name is already taken (e.g. two series with the
+#    same description and instance numbers), the SOP instance UID is added: IM_<INSTANCE NUMBER>_<SOP UID>.dcm.
+#    Existing files are never removed with --mode link or move.
+#   -How the files are placed in the series directories is set with --mode:
+#       rewrite - (default) read, decompress, and save each file with pydicom
+#       copy    - copy the file as-is (no pixel data is decoded)
+#       link    - hard link the file (no extra disk space)
+#       reflink - copy-on-write clone where the file system supports it, otherwise copy
+#       move    - move the file into the series directory
+#   -The directory is indexed first (headers only, see util/dicom_index.py). Each file's
+#    pixel data is only read when the file is written to its series directory.
+#   -Parsed headers are cached between runs (see util/dicom_cache.py). Use --no-cache to
+#    parse every header again.
 #
 # Usage:
 #   dicomSeriesSort.py DICOM_FOLDER
+#   dicomSeriesSort.py DICOM_FOLDER --mode link
 #----------------------------------------------------- 
 
 import os
 import sys
-import gdcm
 import errno
 import pydicom
 import argparse
 
-from pydicom.errors import InvalidDicomError
+from util.dicom_index import index_directory
+from util.file_place import place_file, PLACE_MODES
 
 # Just for fun :)
 # Print iterations progress
@@ -58,6 +73,8 @@ def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_lengt
 # Parse input arguements
 parser = argparse.ArgumentParser()
 parser.add_argument("inputDirectory", type=str, help="The input DICOM directory (compressed files)")
+parser.add_argument("--mode", type=str, default="rewrite", choices=PLACE_MODES + ["rewrite"], help="How to place files in the series directories (default: rewrite)")
+parser.add_argument("--no-cache", dest="useCache", action="store_false", help="Do not use the persistent DICOM header cache")
 args = parser.parse_args()
 
 inputPath = args.inputDirectory
@@ -70,42 +87,59 @@ if not os.path.exists(inputPath):
 # Get the absolute path of the directory provided. Use os.path.join() to avoid slash direction issues between Mac, Linux, and Windows
 inputPathAbs = os.path.abspath(inputPath)
 
-# Get the number of files in a directory for the progress bar
-l = len( [ name for name in os.listdir(inputPathAbs) if os.path.isfile( os.path.join(inputPathAbs, name) ) ] )
+# Index the directory first. Only the DICOM headers are read, not the pixel data.
+print ("Indexing DICOM files...")
+index = index_directory(inputPathAbs, useCache=args.useCache)
+
+# Get the number of files in the index for the progress bar
+l = len(index)
 
 # Counter for the progress bar
 i = 0
 
-# Loop through all DICOMs in the provided directory, rename, decompress, and copy to the appropriate directory
-for file in os.listdir(inputPathAbs):
-    filename = os.fsdecode(file)
+# Output files written by this run
+placed = set()
+
+# Loop through all DICOMs in the index, rename, decompress, and copy to the appropriate directory
+for entry in index.entries():
+    # Get the file's series description and instance number from the index
+    # Series description is located at [0x0008, 0x103e]
+    # Use the instance number located at [0x0020, 0x0013] to rename the images
+    seriesDescription = str(entry.seriesDescription).upper()
+    instanceNumber = entry.instanceNumber
+
+    # Make the instance number have the same number of digits for all images
+    instanceNumberString = str(instanceNumber).rjust(4, '0')
 
-    currentFilePath = os.path.join(inputPathAbs, filename)
+    seriesFilePath = os.path.join(inputPathAbs, seriesDescription)
+    newFileName = "IM_" + instanceNumberString + ".dcm"
 
-    # Check if we have a file
-    if os.path.isfile(currentFilePath):
+    # If the series description directory doesn't already exist, create one
+    if not os.path.exists(seriesFilePath):
+        os.makedirs(seriesFilePath)
 
-        # Read the DICOM file. Make sure we have a valid DICOM file...
+    outputFilePath = os.path.join(seriesFilePath, newFileName)
+
+    # Another file of this run already has the name (e.g. two series with the same description)
+    if outputFilePath in placed:
+        outputFilePath = os.path.join(seriesFilePath, "IM_" + instanceNumberString + "_" + entry.sopInstanceUID + ".dcm")
+
+    # Copy/link/move the file as-is. The pixel data is never read.
+    if args.mode != "rewrite":
         try:
-            dicom = pydicom.dcmread(currentFilePath)
-        except InvalidDicomError:
-            continue
+            place_file(entry.path, outputFilePath, args.mode)
+        except FileExistsError:
+            # A file from a previous run: never removed with link or move
+            outputFilePath = os.path.join(seriesFilePath, "IM_" + instanceNumberString + "_" + entry.sopInstanceUID + ".dcm")
+            place_file(entry.path, outputFilePath, args.mode)
+
+    else:
+        # Read the full DICOM file (including pixel data) only now that we need to write it out
+        dicom = pydicom.dcmread(entry.path)
 
         # Check transfer syntax tag in DICOM header to see if file is compressed or not
         # If the file is already decompressed, skip it
-        tsUID = dicom.file_meta.TransferSyntaxUID
-
-        # Get the file's tag and parse out the series description
-        # Series description is located at [0x0008, 0x103e]
-        # Use the instance number located at [0x0020, 0x0013] to rename the images
-        seriesDescription = str(dicom[0x0008, 0x103e].value).upper()
-        instanceNumber = dicom[0x0020, 0x0013].value
-
-        # Make the instance number have the same number of digits for all images
-        instanceNumberString = str(instanceNumber).rjust(4, '0')
-        
-        seriesFilePath = os.path.join(inputPathAbs, seriesDescription)
-        newFileName = "IM_" + instanceNumberString + ".dcm"
+        tsUID = entry.transferSyntaxUID
 
         # Uncompressed Implicit VR Little-endian = 1.2.840.10008.1.2
         # Uncompressed Explicit VR Little-endian = 1.2.840.10008.1.2.1
@@ -113,12 +147,6 @@ for file in os.listdir(inputPathAbs):
         if not ( (tsUID == "1.2.840.10008.1.2") or (tsUID == "1.2.840.10008.1.2.1") or (tsUID == "1.2.840.10008.1.2.2") ):
             dicom.decompress()
 
-        # If the series description directory doesn't already exist, create one
-        if not os.path.exists(seriesFilePath):
-            os.makedirs(seriesFilePath)
-
-        outputFilePath = os.path.join(seriesFilePath, newFileName)
-
         # Save the decompressed file
         try:
             dicom.save_as(outputFilePath)
@@ -127,6 +155,8 @@ for file in os.listdir(inputPathAbs):
                 print ("ERROR: No such file or directory named " + outputFilePath)
                 raise
 
-        # Update progress bar
-        print_progress(i + 1, l, prefix = 'Progress:', suffix = 'Complete', bar_length = 50)
-        i = i + 1
\ No newline at end of file
+    placed.add(outputFilePath)
+
+    # Update progress bar
+    print_progress(i + 1, l, prefix = 'Progress:', suffix = 'Complete', bar_length = 50)
+    i = i + 1
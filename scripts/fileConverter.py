@@ -26,15 +26,45 @@
 # Unfortunately, SimpleITK cannot read/write AIM files. vtkbone however, can. The quick solution to
 # these problems is to use SimpleITK for all image conversions except AIM and use vtkbone only for AIMs.
 #
+# AIM files are now read and written with numpy (see util/aim_io.py), so vtkbone is only needed
+# for AIM data types that util/aim_io.py does not support (it is then used if it is installed).
+# VTK and vtkbone are only imported in that case, and pydicom only for DICOM inputs, so a conversion
+# only loads the toolkits it uses (e.g. NIfTI to MHA only needs SimpleITK).
+#
 # Some useful links that explain image orientation, direction, and origin:
 #   -https://www.slicer.org/wiki/Coordinate_systems
 #   -https://discourse.vtk.org/t/proposal-to-add-orientation-to-vtkimagedata-feedback-wanted/120
 #   -http://www.itksnap.org/pmwiki/pmwiki.php?n=Documentation.DirectionMatrices
 #   -https://fromosia.wordpress.com/2017/03/10/image-orientation-vtk-itk/
 #
+# Streaming conversion: with --slab N the image is read and written N slices at a time, so
+# volumes larger than the available memory can be converted. This works for uncompressed MHA/MHD
+# and NIfTI inputs and DICOM series, written to MHA, MHD/RAW, NIfTI, or DICOM (see util/slab_io.py).
+#
+# DICOM directories: the series are resolved from the headers (see util/dicom_series.py) and sorted by
+# slice position. The first series is converted, or the one given with --series (series number or UID).
+# Missing or duplicate slices and non-uniform slice spacing are printed as warnings.
+# With --all-series every series is converted, by a pool of --workers processes, to
+# <output>_<SERIES DESCRIPTION>_<SERIES NUMBER>.<ext> (DICOM output: one directory per series). Spaces and other
+# characters that are not letters, digits, ".", "_", or "-" in the series description become "_".
+#
+# Region of interest: with --roi only that region of the input is read from disk and converted
+# (voxel indices, or mm with --roi-mm, see util/roi.py).
+#
+# Profiling: with --profile FILE the time, bytes read/written, and memory of each stage (read, cast,
+# sitk2vtk, write) are written to a Chrome trace (.json) or JSON lines file (see util/profiling.py).
+#
 #----------------------------------------------------- 
 # Usage:
 #   python fileConverter.py <inputImage.ext> <outputImage.ext>
+#   python fileConverter.py <inputImage.ext> <outputImage.ext> --slab 64
+#   python fileConverter.py <inputImage.ext> <outputDirectory/image.dcm> --dicom-compression jpegls
+#   python fileConverter.py <inputImage.ext> <outputImage.ext> --roi <X0> <X1> <Y0> <Y1> <Z0> <Z1> [--roi-mm]
+#   python fileConverter.py <inputImage.ext> <outputImage.ext> --profile profile.json
+#   python fileConverter.py <DICOM_DIRECTORY> <outputImage.ext> --series 3
+#   python fileConverter.py <DICOM_DIRECTORY> <outputImage.ext> --all-series [--workers 8]
+#
+#   To convert many images in one process, see batchConvert.py
 #-----------------------------------------------------
 
 import os
@@ -43,134 +73,372 @@ import time
 import argparse
 import numpy as np
 
-from util.sitk_vtk import sitk2vtk, vtk2sitk
+from util.sitk_vtk import LazyImage
 from util.img2dicom import img2dicom
-
-import vtk
-import vtkbone
+from util.dicom_codecs import SYNTAXES
+from util.slab_io import open_slab_source, convert_slabs
+from util.aim_io import read_aim, write_aim, aim_voxels
+from util.lazy_volume import LazyVolume
+from util.roi import add_roi_arguments, roi_region, read_sitk_roi
+from util.dicom_series import add_series_argument
+from util.profiling import add_profile_argument, enable_profiling, profile_stage
 
 import SimpleITK as sitk
 
-# Parse input arguments
-parser = argparse.ArgumentParser()
-parser.add_argument( "inputImage", type=str, help="The input image (path + filename)" )
-parser.add_argument( "outputImage", type=str, help="The output image (path + filename)" )
-args = parser.parse_args()
-
-inputImage = args.inputImage
-outputImage = args.outputImage
-
-# Extract directory, filename, basename, and extensions from the output image
-outDirectory, outFilename = os.path.split(outputImage)
-outBasename, outExtension = os.path.splitext(outFilename)
-
-# Check the output file format
-if outExtension.lower() == ".mha" :
-    outputImageFileName = os.path.join(outDirectory, outBasename + ".mha")
-elif outExtension.lower() == ".mhd" or outExtension.lower() == ".raw" :
-    outputImageFileName = os.path.join(outDirectory, outBasename + ".mhd")
-    outputImageFileNameRAW = os.path.join(outDirectory, outBasename + ".raw")
-elif outExtension.lower() == ".nii" :
-    outputImageFileName = os.path.join(outDirectory, outBasename + ".nii")
-elif outExtension.lower() == ".aim" :
-    outputImageFileName = os.path.join(outDirectory, outBasename + ".aim")
-elif outExtension.lower() == ".dcm" :
-    outputImageFileName = os.path.join(outDirectory, outBasename + ".dcm")
-else :
-    print ("Error: output file extension must be MHD, MHA, RAW, NII, or AIM")
-    sys.exit(1)
-
-# Check if the input is a DICOM series directory
-if os.path.isfile(inputImage) :
-    # NOT DICOM SERIES
-
-    # Extract directory, filename, basename, and extensions from the input image
-    inDirectory, inFilename = os.path.split(inputImage)
-    inBasename, inExtension = os.path.splitext(inFilename)
-
-    # Setup the correct reader based on the input image extension
-    if inExtension.lower() == ".aim" :
-        imageReader = vtkbone.vtkboneAIMReader()
-        imageReader.SetFileName(inputImage)
-        imageReader.DataOnCellsOff()
-        imageReader.Update()
-
-        # Determine scalar type to use
-        #   VTK_CHAR <-> D1char
-        #   VTK_SHORT <-> D1short
-        #   If it is of type BIT, CHAR, SIGNED CHAR, or UNSIGNED CHAR it is possible
-        #   to store in a CHAR.
-        inputScalarType = imageReader.GetOutput().GetScalarType()
-
-        if (inputScalarType == vtk.VTK_BIT or inputScalarType == vtk.VTK_CHAR or
-            inputScalarType == vtk.VTK_SIGNED_CHAR or
-            inputScalarType == vtk.VTK_UNSIGNED_CHAR) :
-
-            # Make sure the image will fit in the range
-            #   It is possible that the chars are defined in such a way that either
-            #   signed or unsigned chars don't fit inside the char. We can be safe
-            #   buy checking if the image range will fit inside the VTK_CHAR
-            scalarRange = imageReader.GetOutput().GetScalarRange()
-            if scalarRange[0] >= vtk.VTK_SHORT_MIN and scalarRange[1] <= vtk.VTK_SHORT_MAX :
-                outputScalarType = vtk.VTK_CHAR
+# Supported output extensions
+OUTPUT_EXTENSIONS = [".mha", ".mhd", ".raw", ".nii", ".aim", ".dcm"]
+
+
+def output_file_name(outputImage):
+    #
+    # Check the output file format and return the output file name
+    #
+    # Extract directory, filename, basename, and extensions from the output image
+    outDirectory, outFilename = os.path.split(outputImage)
+    outBasename, outExtension = os.path.splitext(outFilename)
+
+    if outExtension.lower() not in OUTPUT_EXTENSIONS :
+        raise ValueError("output file extension must be MHD, MHA, RAW, NII, DCM, or AIM")
+
+    # MHD/RAW pairs are always named by their header
+    if outExtension.lower() == ".raw" :
+        outExtension = ".mhd"
+
+    return os.path.join(outDirectory, outBasename + outExtension.lower())
+
+
+def import_vtkbone():
+    #
+    # Import vtkbone (and VTK) only for the AIM files that need it
+    # @returns:
+    #     The vtkbone module, or None if it is not installed
+    #
+    try:
+        import vtkbone
+    except ImportError:
+        return None
+
+    return vtkbone
+
+
+def dicom_series_files(inputImage, useCache=True, series=None):
+    #
+    # Sorted file list of a DICOM series in a directory (default: the first series), from the cached header index.
+    # Missing/duplicate slices and non-uniform spacing are printed as warnings (see util/dicom_series.py).
+    #
+    from util.dicom_series import open_series
+
+    return open_series( inputImage, series, useCache ).files
+
+
+def read_aim_image(inputImage, roi=None, roiMM=False):
+    #
+    # Read an AIM file (or only a region of interest) with util/aim_io.py (memory-mapped, one copy into SimpleITK)
+    #
+    if roi is not None:
+        volume = LazyVolume(inputImage)
+        index, size = roi_region( roi, volume.size, volume.spacing, volume.origin, volume.direction, roiMM )
+        voxels, geometry = volume.roi(index, size)
+    else:
+        voxels, geometry = read_aim(inputImage)
+
+    # Same pixel types as the vtkbone reader followed by vtkImageCast: CHAR for char images, SHORT for everything else
+    with profile_stage("cast", dtype=voxels.dtype):
+        if voxels.dtype == np.uint8:
+            voxels = voxels.astype(np.int8) if voxels.max() <= 127 else voxels.astype(np.int16)
+        elif voxels.dtype != np.int8 and voxels.dtype != np.int16:
+            voxels = voxels.astype(np.int16)
+
+    image = sitk.GetImageFromArray(voxels)
+    image.SetSpacing(geometry.spacing)
+    image.SetOrigin(geometry.origin)
+
+    return image
+
+
+def read_image(inputImage, useCache=True, roi=None, roiMM=False, fileNames=None):
+    #
+    # Read an image file or DICOM series directory. With roi (x0 x1 y0 y1 z0 z1), only that region is read.
+    # fileNames is the sorted file list of the DICOM series to read (default: the first series of the directory).
+    # @returns:
+    #     A LazyImage
+    #
+    # Check if the input is a DICOM series directory
+    if os.path.isfile(inputImage) :
+        # NOT DICOM SERIES
+
+        # Extract directory, filename, basename, and extensions from the input image
+        inDirectory, inFilename = os.path.split(inputImage)
+        inBasename, inExtension = os.path.splitext(inFilename)
+
+        # Setup the correct reader based on the input image extension
+        if inExtension.lower() == ".aim" :
+            try:
+                return LazyImage( sitk_image=read_aim_image(inputImage, roi, roiMM) )
+            except ValueError:
+                # AIM data type not supported by util/aim_io.py
+                vtkbone = import_vtkbone()
+                if vtkbone is None or roi is not None:
+                    raise
+
+            import vtk
+
+            imageReader = vtkbone.vtkboneAIMReader()
+            imageReader.SetFileName(inputImage)
+            imageReader.DataOnCellsOff()
+            imageReader.Update()
+
+            # Determine scalar type to use
+            #   VTK_CHAR <-> D1char
+            #   VTK_SHORT <-> D1short
+            #   If it is of type BIT, CHAR, SIGNED CHAR, or UNSIGNED CHAR it is possible
+            #   to store in a CHAR.
+            inputScalarType = imageReader.GetOutput().GetScalarType()
+
+            if (inputScalarType == vtk.VTK_BIT or inputScalarType == vtk.VTK_CHAR or
+                inputScalarType == vtk.VTK_SIGNED_CHAR or
+                inputScalarType == vtk.VTK_UNSIGNED_CHAR) :
+
+                # Make sure the image will fit in the range
+                #   It is possible that the chars are defined in such a way that either
+                #   signed or unsigned chars don't fit inside the char. We can be safe
+                #   buy checking if the image range will fit inside the VTK_CHAR
+                scalarRange = imageReader.GetOutput().GetScalarRange()
+                if scalarRange[0] >= vtk.VTK_SHORT_MIN and scalarRange[1] <= vtk.VTK_SHORT_MAX :
+                    outputScalarType = vtk.VTK_CHAR
+                else :
+                    outputScalarType = vtk.VTK_SHORT
             else :
                 outputScalarType = vtk.VTK_SHORT
-        else :
-            outputScalarType = vtk.VTK_SHORT
-    
-        # Cast
-        caster = vtk.vtkImageCast()
-        caster.SetOutputScalarType(outputScalarType)
-        caster.SetInputConnection(imageReader.GetOutputPort())
-        caster.ReleaseDataFlagOff()
-        caster.Update()
-
-        vtk_image = caster.GetOutput()
-        sitk_image = vtk2sitk(vtk_image)
-    
-    else :
-        sitk_image = sitk.ReadImage(inputImage)
-        vtk_image = sitk2vtk(sitk_image)
 
-# Check if the input is a DICOM series directory
-elif os.path.isdir(inputImage) :
-    # DICOM DIRECTORY
+            # Cast
+            caster = vtk.vtkImageCast()
+            caster.SetOutputScalarType(outputScalarType)
+            caster.SetInputConnection(imageReader.GetOutputPort())
+            caster.ReleaseDataFlagOff()
 
-    # Check if the directory exists
-    if not os.path.exists(inputImage):
-        print ("Error: DICOM directory does not exist!")
-        sys.exit(1)
-    else :
+            with profile_stage("cast", scalarType=outputScalarType):
+                caster.Update()
+
+            return LazyImage( vtk_image=caster.GetOutput() )
+
+        elif roi is not None :
+            return LazyImage( sitk_image=read_sitk_roi(inputImage, roi, roiMM) )
+
+        else :
+            return LazyImage( sitk_image=sitk.ReadImage(inputImage) )
+
+    # Check if the input is a DICOM series directory
+    elif os.path.isdir(inputImage) :
+        # DICOM DIRECTORY
         reader = sitk.ImageSeriesReader()
 
-        dicom_names = reader.GetGDCMSeriesFileNames( inputImage )
+        dicom_names = fileNames if fileNames is not None else dicom_series_files( inputImage, useCache )
+
+        if roi is not None :
+            return LazyImage( sitk_image=read_sitk_roi(inputImage, roi, roiMM, dicom_names) )
+
         reader.SetFileNames( dicom_names )
 
-        sitk_image = reader.Execute()
-        vtk_image = sitk2vtk(sitk_image)
+        return LazyImage( sitk_image=reader.Execute() )
 
-# Setup the correct writer based on the output image extension
-if outExtension.lower() == ".mha" :
-    print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
-    sitk.WriteImage(sitk_image, str(outputImageFileName))
+    else :
+        raise ValueError("input image or DICOM directory does not exist!")
+
+
+def write_image(image, outputImage, compression=None):
+    #
+    # Write a LazyImage. All writers use the SimpleITK image, which is only converted from VTK if the
+    # image was read by vtkbone. compression only applies to DICOM output.
+    #
+    outputImageFileName = output_file_name(outputImage)
+    outDirectory = os.path.dirname(outputImage)
+    outExtension = os.path.splitext(outputImageFileName)[1]
+
+    # Setup the correct writer based on the output image extension
+    if outExtension == ".mha" or outExtension == ".mhd" or outExtension == ".nii" :
+        sitk.WriteImage(image.sitk_image, str(outputImageFileName))
+
+    elif outExtension == ".dcm" :
+        img2dicom(image.sitk_image, outDirectory, compression=compression)
+
+    elif outExtension == ".aim" :
+        voxels = aim_voxels( sitk.GetArrayViewFromImage(image.sitk_image) )
+        write_aim( str(outputImageFileName), voxels, image.sitk_image.GetSpacing(), image.sitk_image.GetOrigin() )
+
+
+def convert_image(inputImage, outputImage, slab=None, useCache=True, verbose=True, compression=None, roi=None, roiMM=False, fileNames=None):
+    #
+    # Convert an image to another file format
+    # @params:
+    #     inputImage  - Required  : the input image or DICOM directory (Str)
+    #     outputImage - Required  : the output image (path + filename) (Str)
+    #     slab        - Optional  : convert this many slices at a time (streaming) (Int)
+    #     useCache    - Optional  : use the persistent DICOM header cache (Bool)
+    #     verbose     - Optional  : print progress messages (Bool)
+    #     compression - Optional  : lossless DICOM compression, one of util.dicom_codecs.SYNTAXES (Str)
+    #     roi         - Optional  : only read and convert this region, x0 x1 y0 y1 z0 z1 (List)
+    #     roiMM       - Optional  : roi is in mm instead of voxel indices (Bool)
+    #     fileNames   - Optional  : sorted files of the DICOM series to convert (default: the first series of the directory) (List)
+    #
+    outputImageFileName = output_file_name(outputImage)
+
+    if slab is not None and roi is not None :
+        raise ValueError("--slab and --roi cannot be used together")
+
+    # Streaming conversion: read and write one slab of slices at a time
+    if slab is not None :
+        dicom_names = fileNames
+
+        if dicom_names is None and os.path.isdir(inputImage) :
+            dicom_names = dicom_series_files( inputImage, useCache )
+
+        source = open_slab_source( inputImage, dicom_names )
+
+        if verbose :
+            print ("Writing file: " + str(inputImage) + " to " + str(outputImage) + " (" + str(slab) + " slices at a time)")
+        convert_slabs( source, str(outputImageFileName), slab, compression=compression )
+        return
+
+    with profile_stage("read", file=inputImage):
+        image = read_image( inputImage, useCache, roi, roiMM, fileNames )
+
+    if verbose :
+        print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
+
+    with profile_stage("write", file=outputImageFileName):
+        write_image( image, outputImage, compression )
+
+
+def series_output_name(outputImage, name):
+    #
+    # Output file of one series in --all-series mode: <outputImage stem>_<series name>.<ext>
+    # (DICOM output: <stem>_<series name>/<outputImage name>, one directory per series)
+    #
+    outDirectory, outFilename = os.path.split(outputImage)
+    outBasename, outExtension = os.path.splitext(outFilename)
+
+    if outExtension.lower() == ".dcm" :
+        return os.path.join( outDirectory, outBasename + "_" + name, outFilename )
+
+    return os.path.join( outDirectory, outBasename + "_" + name + outExtension )
+
+
+def _convert_series_job(job):
+    # Runs in a worker process (see convert_all_series)
+    inputImage, outputImage, fileNames, slab, compression, roi, roiMM = job
+    start = time.time()
 
-elif outExtension.lower() == ".mhd" or outExtension.lower() == ".raw" :
-    print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
-    sitk.WriteImage(sitk_image, str(outputImageFileName))
+    try :
+        convert_image( inputImage, outputImage, slab, verbose=False, compression=compression, roi=roi, roiMM=roiMM, fileNames=fileNames )
+        error = None
+    except Exception as e :
+        error = str(e)
 
-elif outExtension.lower() == ".nii" :
-    print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
-    sitk.WriteImage(sitk_image, str(outputImageFileName))
+    return ( outputImage, error, round(time.time() - start, 3) )
 
-elif outExtension.lower() == ".dcm" :
-    print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
-    img2dicom(sitk_image, outDirectory)
 
-elif outExtension.lower() == ".aim" :
-    print ("Writing file: " + str(inputImage) + " to " + str(outputImage))
-    writer = vtkbone.vtkboneAIMWriter()
-    writer.SetFileName( str(outputImageFileName) ) 
-    writer.SetInputData(vtk_image)
-    writer.Write()
+def convert_all_series(inputImage, outputImage, workers=None, slab=None, useCache=True, compression=None, roi=None, roiMM=False):
+    #
+    # Convert every DICOM series of a directory, in parallel
+    # @params:
+    #     inputImage  - Required  : the DICOM directory (Str)
+    #     outputImage - Required  : output name, each series is written to series_output_name(outputImage, series name) (Str)
+    #     workers     - Optional  : number of worker processes (default: number of CPUs) (Int)
+    # @returns:
+    #     The number of series that failed
+    #
+    from concurrent.futures import ProcessPoolExecutor
+    from util.dicom_series import resolve_series
+
+    output_file_name(outputImage)
+
+    seriesList = resolve_series( inputImage, useCache )
+    if len(seriesList) == 0 :
+        raise ValueError("no DICOM files found in the directory!")
+
+    # Two series with the same description and number get different outputs
+    jobs = []
+    names = set()
+    for series in seriesList :
+        name = series.name()
+        count = 2
+        while name in names :
+            name = series.name() + "_" + str(count)
+            count += 1
+        names.add(name)
+
+        seriesOutput = series_output_name(outputImage, name)
+
+        print ( series.summary() + " -> " + seriesOutput )
+        for problem in series.problems :
+            print ("  Warning: " + problem)
+
+        if not os.path.isdir( os.path.dirname( os.path.abspath(seriesOutput) ) ) :
+            os.makedirs( os.path.dirname( os.path.abspath(seriesOutput) ) )
+
+        jobs.append( (inputImage, seriesOutput, series.files, slab, compression, roi, roiMM) )
+
+    workers = max( 1, min( len(jobs), workers if workers is not None else (os.cpu_count() or 1) ) )
+    print ("Converting " + str(len(jobs)) + " series with " + str(workers) + " workers...")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool :
+        for i, (seriesOutput, error, seconds) in enumerate( pool.map(_convert_series_job, jobs) ) :
+            if error is None :
+                print ("[" + str(i + 1) + "/" + str(len(jobs)) + "] " + seriesOutput + " (" + str(seconds) + " s)")
+            else :
+                failed += 1
+                print ("[" + str(i + 1) + "/" + str(len(jobs)) + "] " + seriesOutput + " FAILED: " + error)
+
+    return failed
+
+
+if __name__ == "__main__":
+    # Parse input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument( "inputImage", type=str, help="The input image (path + filename)" )
+    parser.add_argument( "outputImage", type=str, help="The output image (path + filename)" )
+    parser.add_argument( "--slab", type=int, default=None, help="Convert N slices at a time (streaming, for images larger than memory)" )
+    parser.add_argument( "--no-cache", dest="useCache", action="store_false", help="Do not use the persistent DICOM header cache" )
+    parser.add_argument( "--dicom-compression", type=str, default=None, choices=SYNTAXES, help="Write a lossless compressed DICOM series (default: uncompressed)" )
+    add_series_argument(parser)
+    parser.add_argument( "--all-series", action="store_true", help="Convert every series of a DICOM directory (named <output>_<DESCRIPTION>_<NUMBER>)" )
+    parser.add_argument( "-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes for --all-series (default: number of CPUs)" )
+    add_roi_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    if args.profile is not None :
+        enable_profiling(args.profile)
+
+    if args.all_series :
+        if args.series is not None or not os.path.isdir(args.inputImage) :
+            print ("Error: --all-series needs a DICOM directory and cannot be used with --series")
+            sys.exit(1)
+
+        try :
+            failed = convert_all_series( args.inputImage, args.outputImage, args.workers, args.slab, args.useCache, args.dicom_compression, args.roi, args.roi_mm )
+        except ValueError as e :
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+        if failed > 0 :
+            print ("Done! " + str(failed) + " series failed.")
+            sys.exit(1)
+
+        print ("Done!")
+        sys.exit(0)
+
+    try :
+        fileNames = None
+        if args.series is not None and os.path.isdir(args.inputImage) :
+            fileNames = dicom_series_files( args.inputImage, args.useCache, args.series )
+
+        convert_image( args.inputImage, args.outputImage, args.slab, args.useCache, compression=args.dicom_compression, roi=args.roi, roiMM=args.roi_mm,
+                       fileNames=fileNames )
+    except ValueError as e :
+        print ("Error: " + str(e))
+        sys.exit(1)
 
-print ("Done!")
\ No newline at end of file
+    print ("Done!")
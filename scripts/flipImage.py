@@ -16,21 +16,29 @@
 #
 #   2. python flipImage.py <INPUT_IMAGE_DIRECTORY> <OUTPUT_DIRECTORY> <FLIP_AXIS>
 #
+#   3. python flipImage.py <INPUT_IMAGE_DIRECTORY> <FLIP_AXIS> --roi <X0> <X1> <Y0> <Y1> <Z0> <Z1>
+#
 # Notes:
 #   -Current accepted file formats: NIfTI (.nii), MHA (.mha), DICOM series (provide directory containing uncompressed .dcm files)
 #   -All images are written out as MHA images.
-#   -Note that there is currently no functionality to check if a valid DICOM directory has been provided. You MUST provide a DICOM
-#    directory that contains only one series and no other files (ONLY uncompressed .dcm files).
+#   -DICOM directories can contain several series and other files. The first series is flipped, or the one given with --series
+#    (series number or UID). Missing or duplicate slices and non-uniform spacing are printed as warnings (see util/dicom_series.py).
+#   -Flips are done by reordering the voxel array in place of the image extent (see util/reorient.py), so the
+#    voxel values are copied exactly and the output has the same extent, spacing, and origin as the input.
+#   -With --roi only that region of the input is read and flipped (voxel indices, or mm with --roi-mm). See util/roi.py.
+#   -With --profile the time, bytes read/written, and memory of each stage (read, reslice, write) are written
+#    to a Chrome trace (.json) or JSON lines file. See util/profiling.py.
 #-----------------------------------------------------
 
 import os
 import sys
-import vtk
-import errno
 import ntpath
-import pydicom
 import argparse
-import platform
+
+from util.reorient import FLIP_COSINES, reorient_image
+from util.roi import add_roi_arguments, extract_vtk
+from util.dicom_series import add_series_argument, open_series, stage_series
+from util.profiling import add_profile_argument, enable_profiling, profile_stage
 
 # Read in the input arguements
 parser = argparse.ArgumentParser()
@@ -38,9 +46,18 @@ parser = argparse.ArgumentParser()
 parser.add_argument("inputPath", type=str, nargs="?", help="The input image file path")
 parser.add_argument("-o", "--outputPath", type=str, nargs="?", default=os.getcwd() , help="The output image file path")
 parser.add_argument("flipAxis", type=str, nargs="?", help="The axis to flip the image about")
+add_series_argument(parser)
+add_roi_arguments(parser)
+add_profile_argument(parser)
 
 args = parser.parse_args()
 
+if args.profile is not None :
+    enable_profiling(args.profile)
+
+# Only import VTK once the arguments are parsed (--help does not need it)
+import vtk
+
 inputPath = args.inputPath
 outputPath = args.outputPath
 flipAxis = str(args.flipAxis).lower()
@@ -64,10 +81,16 @@ if os.path.isdir(inputPathAbs) :
         sys.exit(1)
     else:
         filename, fileExtension = os.path.splitext(inputPathAbs)
-        
+
+        # Resolve the series (sorted by slice position), the reader gets a directory with only that series
+        try:
+            series = open_series(inputPathAbs, args.series)
+        except ValueError as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
         imageReader = vtk.vtkDICOMImageReader()
-        imageReader.SetDirectoryName(inputPathAbs) 
-        imageReader.Update()  
+        imageReader.SetDirectoryName( stage_series(series.files) )
 
 # If the input is a file, check if it is NIfTI or MHA
 elif os.path.isfile(inputPathAbs) :
@@ -81,44 +104,36 @@ elif os.path.isfile(inputPathAbs) :
     if str(fileExtension).lower() == ".nii" :
         imageReader = vtk.vtkNIFTIImageReader()  
         imageReader.SetFileName(inputPathAbs)
-        imageReader.Update()  
     
     elif str(fileExtension).lower() == ".mha" :  
         imageReader = vtk.vtkMetaImageReader()
         imageReader.SetFileName(inputPathAbs)
-        imageReader.Update()  
 
 else :
     print ("Error: Unrecognized input file type.")
     sys.exit(1)
 
-image = imageReader.GetOutput()
+# Read the image (or only the region of interest)
+if args.roi is not None :
+    try :
+        voi = extract_vtk(imageReader, args.roi, args.roi_mm)
+    except ValueError as e :
+        print ("Error: " + str(e))
+        sys.exit(1)
 
-resliceFilter = vtk.vtkImageReslice()
-resliceFilter.SetInputData(image)
+    with profile_stage("read", file=inputPathAbs) :
+        voi.Update()
+    image = voi.GetOutput()
+else :
+    with profile_stage("read", file=inputPathAbs) :
+        imageReader.Update()
+    image = imageReader.GetOutput()
 
 print ("Flipping image: " + filename + fileExtension + " about axis: " + str(flipAxis).upper() + "...")
 
-# Flip the image
-if flipAxis == "x" :
-    resliceFilter.SetResliceAxesDirectionCosines(-1,0,0, 0,1,0, 0,0,1)
-elif flipAxis == "y" :
-    resliceFilter.SetResliceAxesDirectionCosines(1,0,0, 0,-1,0, 0,0,1)
-elif flipAxis == "z" :
-    resliceFilter.SetResliceAxesDirectionCosines(1,0,0, 0,1,0, 0,0,-1)
-elif flipAxis == "xy" or flipAxis == "yx":
-    resliceFilter.SetResliceAxesDirectionCosines(-1,0,0, 0,-1,0, 0,0,1)
-elif flipAxis == "xz" or flipAxis == "zx":
-    resliceFilter.SetResliceAxesDirectionCosines(-1,0,0, 0,1,0, 0,0,-1)
-elif flipAxis == "yz" or flipAxis == "zy":
-    resliceFilter.SetResliceAxesDirectionCosines(1,0,0, 0,-1,0, 0,0,-1)
-
-# Once the image is flipped, it needs to be moved back to the original image origin
-resliceFilter.SetOutputOrigin(image.GetOrigin())
-resliceFilter.Update()
-
-# Get the new image and write it out as a MHA image
-imageResampled = resliceFilter.GetOutput()
+# Flip the image. Axis flips only reorder the voxels (no resampling), the flipped image keeps the original image origin
+with profile_stage("reslice", axis=flipAxis) :
+    imageResampled = reorient_image( image, FLIP_COSINES[flipAxis], image.GetOrigin() )
 
 # Create the output file name (resliced)
 outputFileName = os.path.join(outputPathAbs, filename + "_" + flipAxis + ".mha")
@@ -128,6 +143,8 @@ print ("Writing out flipped image as: " + outputFileName + "...")
 writer = vtk.vtkMetaImageWriter()
 writer.SetFileName( str(outputFileName) ) 
 writer.SetInputData(imageResampled)
-writer.Write()
+
+with profile_stage("write", file=outputFileName) :
+    writer.Write()
 
 print ("Done!")
\ No newline at end of file
@@ -0,0 +1,414 @@
+# coding=utf-8
+#-----------------------------------------------------
+# ingestDICOM.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Watches an incoming DICOM directory and streams every file that
+#              arrives through indexing, (optional) decompression, and sorting
+#              into its series directory. Each series is converted to a volume
+#              as soon as it is complete. Replaces running dicomSeriesSort.py,
+#              decompressDICOM.py, and fileConverter.py one after the other.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.5 or later
+#   -pydicom, SimpleITK (gdcm for compressed files)
+#
+# Usage:
+#   python ingestDICOM.py <INCOMING_FOLDER> <SORTED_FOLDER> [--output-directory DIR] [--format nii]
+#                         [--decompress] [--mode copy] [--quiet 10] [--expected N] [--workers N] [--once]
+#
+#   e.g. python ingestDICOM.py /pacs/incoming /data/sorted --output-directory /data/nifti --decompress
+#
+# Notes:
+#   -The incoming directory is polled every --poll seconds (not recursive). A file is taken once its
+#    size and modification time did not change between two polls, so files still being written are
+#    left alone. With --once, the files already in the directory are ingested and the script exits
+#    after converting every series.
+#   -Each file is read once, in a worker process: the header is parsed from memory, the file is
+#    decompressed if --decompress is given and it is compressed, and it is written to
+#    <SORTED_FOLDER>/<SERIES DESCRIPTION>_<SERIES NUMBER>/IM_<INSTANCE NUMBER>.dcm (or placed there
+#    with --mode link/reflink/move if it is not rewritten). The series number keeps series with the
+#    same description apart. If another SOP instance already has the name (duplicate or missing
+#    instance numbers), the SOP Instance UID is added: IM_<INSTANCE NUMBER>_<SOP INSTANCE UID>.dcm.
+#   -A series is complete when it has --expected files, or the number in its Images in Acquisition
+#    tag [0x0020, 0x1002], or else when no file of the series arrived for --quiet seconds. It is then
+#    converted (files sorted by slice position, see util/dicom_index.py) to
+#    <OUTPUT_DIRECTORY>/<SERIES DESCRIPTION>_<SERIES NUMBER>.<FORMAT>. Files that arrive after the
+#    conversion convert the series again. Use --no-convert to only sort.
+#   -Files with the same SOP Instance UID replace each other (e.g. a resent image).
+#   -The incoming files are not changed, except with --mode move. Ingested files are remembered for
+#    the run only: after a restart the files still in the incoming directory are ingested again.
+#-----------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+from util.file_place import place_file, PLACE_MODES
+from util.dicom_series import series_name
+
+# Uncompressed transfer syntaxes (implicit VR little endian, explicit VR little endian, explicit VR big endian)
+UNCOMPRESSED = ["1.2.840.10008.1.2", "1.2.840.10008.1.2.1", "1.2.840.10008.1.2.2"]
+
+OUTPUT_FORMATS = ["nii", "mha", "aim"]
+
+
+def _same_instance(filePath, sopInstanceUID):
+    # True if filePath is a (complete) DICOM file of the SOP instance
+    import pydicom
+
+    try:
+        dicom = pydicom.dcmread(filePath, stop_before_pixels=True, specific_tags=["SOPInstanceUID"])
+        return str(dicom.get("SOPInstanceUID", "")) == sopInstanceUID
+    except Exception:
+        # Empty (claimed by another worker, not written yet) or not a DICOM file
+        return False
+
+
+def claim_file_name(seriesDirectory, entry):
+    #
+    # The file of a SOP instance in its series directory: IM_<INSTANCE NUMBER>.dcm, or
+    # IM_<INSTANCE NUMBER>_<SOP INSTANCE UID>.dcm if another instance has that name (duplicate or
+    # missing instance numbers). A new name is created empty, so no other worker can take it.
+    # @returns:
+    #     The path to write the file to (the file of the same SOP instance if there is one)
+    #
+    instanceNumber = str(entry.instanceNumber).rjust(4, "0") if entry.instanceNumber is not None else "NONE"
+    names = [ "IM_" + instanceNumber + ".dcm" ]
+    if entry.sopInstanceUID != "":
+        names.append( "IM_" + instanceNumber + "_" + entry.sopInstanceUID + ".dcm" )
+
+    # Without a SOP instance UID, the next free counter
+    count = 2
+    while True:
+        for name in names:
+            path = os.path.join(seriesDirectory, name)
+            try:
+                os.close( os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY) )
+                return path
+            except FileExistsError:
+                if entry.sopInstanceUID != "" and _same_instance(path, entry.sopInstanceUID):
+                    return path
+
+        names = [ "IM_" + instanceNumber + "_" + str(count) + ".dcm" ]
+        count += 1
+
+
+def ingest_file(filePath, sortedDirectory, mode, decompress):
+    #
+    # Runs in a worker process: read one incoming file, and write it to its series directory
+    # @params:
+    #     filePath        - Required  : the incoming file (Str)
+    #     sortedDirectory - Required  : directory of the series directories (Str)
+    #     mode            - Required  : "copy", or one of PLACE_MODES (Str)
+    #     decompress      - Required  : decompress compressed files (Bool)
+    # @returns:
+    #     (entry, images in acquisition) where entry is the util.dicom_index.DicomFile of the sorted
+    #     file, or (None, None) if the file is not a DICOM file
+    #
+    import pydicom
+
+    from pydicom.errors import InvalidDicomError
+    from util.dicom_index import entry_from_dataset
+
+    # The only time the incoming file is read
+    with open(filePath, "rb") as incomingFile:
+        data = incomingFile.read()
+
+    try:
+        dicom = pydicom.dcmread( io.BytesIO(data) )
+    except InvalidDicomError:
+        return ( None, None )
+
+    entry = entry_from_dataset(dicom, filePath)
+
+    seriesDirectory = os.path.join( sortedDirectory, series_name(entry.seriesDescription, entry.seriesNumber) )
+    if not os.path.isdir(seriesDirectory):
+        os.makedirs(seriesDirectory, exist_ok=True)
+
+    outputFilePath = claim_file_name(seriesDirectory, entry)
+
+    # Written to a temporary name first, so a conversion never reads a file that is half written
+    partFilePath = outputFilePath + ".part"
+
+    try:
+        if decompress and entry.transferSyntaxUID not in UNCOMPRESSED:
+            # Keep the SOP Instance UID (see decompressDICOM.py)
+            try:
+                dicom.decompress(generate_instance_uid=False)
+            except TypeError:
+                dicom.decompress()
+            dicom.save_as(partFilePath)
+            os.replace(partFilePath, outputFilePath)
+
+            if mode == "move":
+                os.remove(filePath)
+
+            entry = entry._replace( path=outputFilePath, transferSyntaxUID=str(dicom.file_meta.TransferSyntaxUID) )
+
+        elif mode == "copy":
+            # The bytes are already in memory, no need to read the file again
+            with open(partFilePath, "wb") as partFile:
+                partFile.write(data)
+            os.replace(partFilePath, outputFilePath)
+            entry = entry._replace(path=outputFilePath)
+
+        else:
+            if os.path.lexists(partFilePath):
+                os.remove(partFilePath)
+            place_file(filePath, partFilePath, mode)
+            os.replace(partFilePath, outputFilePath)
+            entry = entry._replace(path=outputFilePath)
+    except Exception:
+        # Give the claimed name back if nothing was written to it
+        if os.path.exists(outputFilePath) and os.path.getsize(outputFilePath) == 0:
+            os.remove(outputFilePath)
+        raise
+
+    imagesInAcquisition = dicom.get( (0x0020, 0x1002) )
+    try:
+        imagesInAcquisition = int(imagesInAcquisition.value) if imagesInAcquisition is not None else None
+    except (TypeError, ValueError):
+        imagesInAcquisition = None
+
+    return ( entry, imagesInAcquisition )
+
+
+def convert_series(fileNames, outputImage):
+    # Runs in a worker process: convert the sorted files of one series
+    from fileConverter import convert_image
+
+    start = time.time()
+    convert_image( os.path.dirname(fileNames[0]), outputImage, verbose=False, fileNames=fileNames )
+    return round(time.time() - start, 3)
+
+
+class Series(object):
+    #
+    # The files of one series received so far
+    #
+    def __init__(self, name, expected):
+        self.name = name
+        self.expected = expected
+        self.entries = {}           # Sorted file -> DicomFile
+        self.last = time.time()     # When the last file arrived
+        self.converting = False
+        self.converted = False
+        self.changed = False        # A file arrived while the series was being converted
+
+    def complete(self, quiet):
+        if self.expected is not None and len(self.entries) >= self.expected:
+            return True
+        return time.time() - self.last >= quiet
+
+
+class Ingest(object):
+    #
+    # Polls the incoming directory and runs the file and series jobs on a pool of worker processes
+    #
+    def __init__(self, args, loop, pool):
+        self.args = args
+        self.loop = loop
+        self.pool = pool
+        self.series = {}            # Series Instance UID -> Series
+        self.seen = {}              # Incoming file -> (size, modification time) at the last poll
+        self.taken = set()          # Incoming files that were ingested (or are being ingested)
+        self.files = set()          # Running file jobs
+        self.conversions = set()    # Running conversions
+        self.counts = { "files": 0, "skipped": 0, "failed": 0, "series": 0 }
+
+        # Bounds the number of files read ahead of the workers
+        self.slots = asyncio.Semaphore( 2 * args.workers )
+
+    def poll(self, once):
+        # Incoming files that are ready to be ingested
+        ready = []
+
+        for entry in os.scandir(self.args.incomingDirectory):
+            if entry.name.startswith(".") or entry.name.endswith(".part") or entry.path in self.taken:
+                continue
+
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                # Removed since the listing
+                continue
+
+            signature = ( stat.st_size, stat.st_mtime )
+
+            # Still being written if it changed since the last poll
+            if once or self.seen.get(entry.path) == signature:
+                ready.append(entry.path)
+                self.taken.add(entry.path)
+                self.seen.pop(entry.path, None)
+            else:
+                self.seen[entry.path] = signature
+
+        return sorted(ready)
+
+    async def ingest(self, filePath):
+        try:
+            entry, imagesInAcquisition = await self.loop.run_in_executor( self.pool, ingest_file, filePath, self.args.sortedDirectory,
+                                                                          self.args.mode, self.args.decompress )
+        except Exception as e:
+            self.counts["failed"] += 1
+            print ("Error: " + filePath + ": " + str(e))
+            return
+        finally:
+            self.slots.release()
+
+        if entry is None:
+            self.counts["skipped"] += 1
+            print ("File: " + filePath + " is not a valid DICOM file. Skipping...")
+            return
+
+        self.counts["files"] += 1
+
+        series = self.series.get(entry.seriesUID)
+        if series is None:
+            expected = self.args.expected if self.args.expected is not None else imagesInAcquisition
+            series = self.series[entry.seriesUID] = Series( series_name(entry.seriesDescription, entry.seriesNumber), expected )
+            self.counts["series"] += 1
+            print ("New series: " + series.name + ( "" if expected is None else " (" + str(expected) + " images expected)" ))
+
+        # One entry per sorted file (a resent SOP instance is written over its file)
+        series.entries[entry.path] = entry
+        series.last = time.time()
+
+        if series.converting:
+            series.changed = True
+        elif series.converted:
+            print ("Series " + series.name + " changed, it will be converted again")
+            series.converted = False
+
+        # Convert right away when the last expected file arrived
+        if series.expected is not None and len(series.entries) >= series.expected:
+            self.convert_ready()
+
+    async def convert(self, seriesUID, series):
+        from util.dicom_index import DicomIndex
+
+        index = DicomIndex(self.args.sortedDirectory)
+        for entry in series.entries.values():
+            index.add(entry)
+        fileNames = index.files(seriesUID)
+
+        outputImage = os.path.join( self.args.output_directory, series.name + "." + self.args.format )
+        print ("Series " + series.name + " complete (" + str(len(fileNames)) + " images), converting to " + outputImage)
+
+        try:
+            seconds = await self.loop.run_in_executor( self.pool, convert_series, fileNames, outputImage )
+            print ("Converted " + series.name + " in " + str(seconds) + " s")
+        except Exception as e:
+            self.counts["failed"] += 1
+            print ("Error: converting " + series.name + ": " + str(e))
+
+        series.converting = False
+        series.converted = not series.changed
+        series.changed = False
+
+    def convert_ready(self, everything=False):
+        # Start the conversion of every series that is complete (of every series with everything=True)
+        if self.args.no_convert:
+            return
+
+        for seriesUID, series in self.series.items():
+            if series.converting or series.converted:
+                continue
+            if everything or series.complete(self.args.quiet):
+                series.converting = True
+                self.start( self.conversions, self.convert(seriesUID, series) )
+
+    def start(self, tasks, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def run(self, once):
+        while True:
+            for filePath in self.poll(once):
+                await self.slots.acquire()
+                self.start( self.files, self.ingest(filePath) )
+
+            self.convert_ready()
+
+            if once:
+                break
+            await asyncio.sleep(self.args.poll)
+
+        # --once: wait for every file, then convert every series that is left
+        while len(self.files) > 0:
+            await asyncio.wait( list(self.files) )
+        self.convert_ready(everything=True)
+        while len(self.conversions) > 0:
+            await asyncio.wait( list(self.conversions) )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("incomingDirectory", type=str, help="The directory the DICOM files arrive in")
+    parser.add_argument("sortedDirectory", type=str, help="Where to write the series directories")
+    parser.add_argument("-o", "--output-directory", type=str, default=None, help="Where to write the converted series (default: SORTED_FOLDER)")
+    parser.add_argument("--format", type=str, default="nii", choices=OUTPUT_FORMATS, help="File format of the converted series (default: nii)")
+    parser.add_argument("--no-convert", action="store_true", help="Only sort the files, do not convert the series")
+    parser.add_argument("--decompress", action="store_true", help="Decompress compressed files while sorting them")
+    parser.add_argument("--mode", type=str, default="copy", choices=PLACE_MODES, help="How to place files that are not rewritten (default: copy)")
+    parser.add_argument("--quiet", type=float, default=10.0, help="A series is complete when no file arrived for this many seconds (default: 10)")
+    parser.add_argument("--expected", type=int, default=None, help="A series is complete when it has this many files")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between checks of the incoming directory (default: 1)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--once", action="store_true", help="Ingest the files in the directory now, convert every series, and exit")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.incomingDirectory):
+        print ("Error: incoming directory does not exist!")
+        sys.exit(1)
+
+    args.incomingDirectory = os.path.abspath(args.incomingDirectory)
+    args.sortedDirectory = os.path.abspath(args.sortedDirectory)
+    args.output_directory = os.path.abspath( args.output_directory if args.output_directory is not None else args.sortedDirectory )
+    args.workers = max(1, args.workers)
+
+    for directory in [ args.sortedDirectory, args.output_directory ]:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    pool = ProcessPoolExecutor(max_workers=args.workers)
+    ingest = Ingest(args, loop, pool)
+
+    start = time.time()
+    if not args.once:
+        print ("Watching: " + args.incomingDirectory + " (Ctrl+C to stop)")
+
+    # Stop the same way when a service manager sends SIGTERM
+    def stop(signalNumber, frame):
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        loop.run_until_complete( ingest.run(args.once) )
+    except KeyboardInterrupt:
+        print ("Stopped.")
+    finally:
+        pool.shutdown()
+        loop.close()
+
+    print ( "Done! " + str(ingest.counts["files"]) + " files in " + str(ingest.counts["series"]) + " series, " +
+            str(ingest.counts["skipped"]) + " skipped, " + str(ingest.counts["failed"]) + " failed (" +
+            str(round(time.time() - start, 1)) + " s)" )
+
+    if ingest.counts["failed"] > 0:
+        sys.exit(1)
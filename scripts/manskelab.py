@@ -0,0 +1,94 @@
+# coding=utf-8
+#-----------------------------------------------------
+# manskelab.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: One entry point for all scripts. Each command runs the matching
+#              script, which only imports the toolkits it needs.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.4 or later
+#
+# Usage:
+#   python manskelab.py <COMMAND> [ARGUMENTS]
+#
+#   python manskelab.py --help                       (list the commands)
+#   python manskelab.py help convert                 (the arguments of one command)
+#   python manskelab.py convert scan.nii scan.mha
+#   python manskelab.py resample scan.nii outDir 0.1 0.1 0.1 --backend sitk
+#
+# Notes:
+#   -The arguments after the command are passed to the script as they are, e.g.
+#    "manskelab.py convert A B" is the same as "fileConverter.py A B".
+#   -Nothing is imported until a command is chosen, so --help and the command list are instant.
+#    The scripts import VTK, vtkbone, pydicom, and gdcm only when the chosen reader/writer needs
+#    them (see benchmarks/startup_time.py).
+#-----------------------------------------------------
+
+import os
+import sys
+
+SCRIPTS_DIRECTORY = os.path.dirname( os.path.abspath(__file__) )
+
+# (command, script, description)
+COMMANDS = [ ("convert",        "fileConverter.py",   "Convert an image to another file format (DICOM, NIfTI, MHA/MHD, AIM)"),
+             ("batch-convert",  "batchConvert.py",    "Convert many images with a pool of worker processes"),
+             ("resample",       "resample.py",        "Resample an image to a new voxel size"),
+             ("batch-resample", "batchResample.py",   "Resample many images onto one common grid"),
+             ("flip",           "flipImage.py",       "Flip an image about an axis"),
+             ("reorient",       "reorientImage.py",   "Reorient an image to an orientation code (e.g. RAS)"),
+             ("sort",           "dicomSeriesSort.py", "Sort a DICOM directory into one directory per series"),
+             ("ingest",         "ingestDICOM.py",     "Sort, decompress, and convert DICOM files as they arrive in a directory"),
+             ("compress",       "compressDICOM.py",   "Losslessly compress DICOM images"),
+             ("decompress",     "decompressDICOM.py", "Decompress DICOM images") ]
+
+
+def print_usage():
+    print ("usage: manskelab.py <command> [arguments]\n")
+    print ("commands:")
+    for command, script, description in COMMANDS:
+        print ( "  {:<16} {}".format(command, description) )
+    print ("\nRun 'manskelab.py <command> --help' for the arguments of a command.")
+
+
+def run_command(command, arguments):
+    #
+    # Run the script of a command as if it was started from the command line
+    # @params:
+    #     command    - Required  : one of COMMANDS (Str)
+    #     arguments  - Required  : the command line arguments for the script (List)
+    #
+    import runpy
+
+    scripts = dict( (name, script) for name, script, description in COMMANDS )
+    scriptPath = os.path.join( SCRIPTS_DIRECTORY, scripts[command] )
+
+    # The scripts import util/ and each other from the scripts directory
+    if SCRIPTS_DIRECTORY not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIRECTORY)
+
+    # run_path sets sys.argv[0] to the script, the usage messages show the script name
+    sys.argv = [ scriptPath ] + list(arguments)
+    runpy.run_path( scriptPath, run_name="__main__" )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+
+    if len(arguments) == 0 or arguments[0] in ["-h", "--help"]:
+        print_usage()
+        sys.exit(0)
+
+    # "help <command>" is the same as "<command> --help"
+    if arguments[0] == "help" and len(arguments) > 1:
+        arguments = [ arguments[1], "--help" ]
+
+    if arguments[0] not in [ command for command, script, description in COMMANDS ]:
+        print ("Error: unknown command: " + arguments[0] + "\n")
+        print_usage()
+        sys.exit(2)
+
+    run_command( arguments[0], arguments[1:] )
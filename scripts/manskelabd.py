@@ -0,0 +1,426 @@
+# coding=utf-8
+#-----------------------------------------------------
+# manskelabd.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Long-lived conversion service. A pool of worker processes imports
+#              the toolkits (SimpleITK, VTK, vtkbone, pydicom, gdcm) once, then
+#              runs manskelab.py commands (convert, resample, flip, sort, ...)
+#              sent over a local socket, so a job does not pay the start-up cost.
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.6 or later
+#
+# Usage:
+#   1. python manskelabd.py serve [--workers N] [--queue N] [--socket PATH | --port PORT]
+#
+#   2. python manskelabd.py submit [--socket PATH | --port PORT] <COMMAND> [ARGUMENTS]   (same as manskelab.py)
+#      e.g. python manskelabd.py submit convert scan.aim scan.nii
+#
+#   3. python manskelabd.py status
+#      python manskelabd.py stop
+#
+#   From Python:
+#      from manskelabd import submit
+#      result = submit("convert", ["scan.aim", "scan.nii"])
+#
+# Notes:
+#   -The service listens on a Unix domain socket (default: manskelabd-<user>.sock in the temp
+#    directory, or $MANSKELABD_SOCKET) that only its user can connect to (mode 0600). Use --port to
+#    listen on TCP instead (e.g. on Windows); the clients need the same --socket/--port.
+#   -Jobs read and write any path the service's user can. TCP is bound to 127.0.0.1 only and is NOT
+#    authenticated: every user of the machine can submit jobs, so only use --port on a single-user machine.
+#   -Protocol: one JSON object per line. A job is {"command": "convert", "arguments": [...], "cwd": "..."},
+#    relative paths are relative to "cwd". The reply is {"status", "exit_code", "output", "queue_seconds",
+#    "run_seconds", "total_seconds", "worker"}. {"command": "status"} (job counts, "pending" is running or
+#    waiting) and {"command": "stop"} control the service.
+#   -At most --workers jobs run at a time and at most --queue jobs wait; more jobs are rejected
+#    with status "busy" so the clients can back off.
+#   -Each job runs the command's script in a worker (as manskelab.py does), its printed output is
+#    returned in "output". The batch-* and ingest commands start their own pools and are not accepted.
+#   -Messages the toolkits print themselves (e.g. ITK warnings) go to the service's console, not to "output".
+#   -The global thread defaults of SimpleITK and VTK (--threads of a job) are reset after every job,
+#    so the next job in the same worker starts with the toolkit defaults again.
+#   -If a worker crashes (e.g. a segmentation fault in a toolkit) its job fails and the pool is
+#    restarted.
+#-----------------------------------------------------
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import getpass
+import argparse
+import tempfile
+import threading
+import traceback
+import contextlib
+import socketserver
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from manskelab import COMMANDS, SCRIPTS_DIRECTORY
+
+# batch-* commands and ingest run their own worker pools (and ingest does not finish)
+JOB_COMMANDS = [ command for command, script, description in COMMANDS if not command.startswith("batch-") and command != "ingest" ]
+
+# Toolkits imported by every worker when it starts
+PRELOAD = ["numpy", "SimpleITK", "vtk", "vtkbone", "pydicom", "gdcm"]
+
+# Global thread defaults of the toolkits when the worker started (toolkit -> number of threads)
+_defaultThreads = {}
+
+# True once _preload ran in this process
+_preloaded = False
+
+
+def default_socket():
+    if "MANSKELABD_SOCKET" in os.environ:
+        return os.environ["MANSKELABD_SOCKET"]
+    return os.path.join( tempfile.gettempdir(), "manskelabd-" + getpass.getuser() + ".sock" )
+
+
+def _preload():
+    # Runs once in every worker process, from its first task (no pool initializer: Python 3.6 has none)
+    global _preloaded
+    if _preloaded:
+        return
+    _preloaded = True
+
+    if SCRIPTS_DIRECTORY not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIRECTORY)
+
+    for module in PRELOAD:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    # The script modules and util/ are imported by the scripts themselves on the first job
+
+    # Jobs can change the global thread defaults (util.resampling.set_threads), remember them
+    if "SimpleITK" in sys.modules:
+        _defaultThreads["SimpleITK"] = sys.modules["SimpleITK"].ProcessObject.GetGlobalDefaultNumberOfThreads()
+    if "vtk" in sys.modules:
+        _defaultThreads["vtk"] = sys.modules["vtk"].vtkMultiThreader.GetGlobalDefaultNumberOfThreads()
+
+
+def _reset_threads():
+    # Give the next job in this worker the thread defaults the worker started with
+    if "SimpleITK" in _defaultThreads:
+        sys.modules["SimpleITK"].ProcessObject.SetGlobalDefaultNumberOfThreads( _defaultThreads["SimpleITK"] )
+    if "vtk" in _defaultThreads:
+        sys.modules["vtk"].vtkMultiThreader.SetGlobalDefaultNumberOfThreads( _defaultThreads["vtk"] )
+
+
+def _warm_up():
+    _preload()
+    return os.getpid()
+
+
+def _run_job(command, arguments, cwd, submitted):
+    #
+    # Run one command in a worker process
+    # @returns:
+    #     A dictionary with the exit code, the printed output, and the timings
+    #
+    from manskelab import run_command
+
+    # A worker started after a crash, or one that got no warm-up task
+    _preload()
+
+    started = time.time()
+    output = io.StringIO()
+    exitCode = 0
+    previousDirectory = os.getcwd()
+    previousArgv = sys.argv
+
+    try:
+        if cwd is not None:
+            os.chdir(cwd)
+
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                run_command(command, arguments)
+            except SystemExit as e:
+                # sys.exit(), argparse errors, --help
+                if e.code is None:
+                    exitCode = 0
+                elif isinstance(e.code, int):
+                    exitCode = e.code
+                else:
+                    print (e.code)
+                    exitCode = 1
+            except Exception:
+                traceback.print_exc()
+                exitCode = 1
+            finally:
+                # --profile is written when a script exits, a worker does not exit after a job
+                if "util.profiling" in sys.modules:
+                    sys.modules["util.profiling"].finish_profiling()
+                # Same for the series directories staged for the VTK DICOM reader
+                if "util.dicom_series" in sys.modules:
+                    sys.modules["util.dicom_series"].remove_staged_series()
+                # --threads of this job must not carry over to the next one
+                _reset_threads()
+    finally:
+        os.chdir(previousDirectory)
+        sys.argv = previousArgv
+
+    return { "status": "ok" if exitCode == 0 else "error",
+             "exit_code": exitCode,
+             "output": output.getvalue(),
+             "queue_seconds": round(started - submitted, 6),
+             "run_seconds": round(time.time() - started, 6),
+             "worker": os.getpid() }
+
+
+class Service(object):
+    #
+    # The worker pool and the job counters
+    #
+    def __init__(self, workers, queue):
+        self.workers = max(1, workers)
+        self.queue = max(0, queue)
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self.started = time.time()
+        self.counts = { "pending": 0, "completed": 0, "failed": 0, "rejected": 0 }
+        self.pool = None
+        self.start_pool()
+
+    def start_pool(self):
+        # Start every worker now, so the first jobs do not wait for the toolkits to import.
+        # The pool starts a new worker for each task submitted while the others are busy importing.
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        for future in [ self.pool.submit(_warm_up) for i in range(self.workers) ]:
+            future.result()
+        print ("Started " + str(self.workers) + " workers.")
+
+    def run(self, command, arguments, cwd):
+        submitted = time.time()
+
+        if command not in JOB_COMMANDS:
+            return { "status": "error", "exit_code": 2, "output": "Error: unknown command: " + str(command) + "\n" }
+
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.counts["rejected"] += 1
+            return { "status": "busy", "exit_code": 75, "output": "Error: the job queue is full, try again later\n" }
+
+        try:
+            with self.lock:
+                self.counts["pending"] += 1
+
+            result = { "status": "error", "exit_code": 1, "output": "Error: the worker running this job crashed\n" }
+
+            for attempt in range(2):
+                with self.lock:
+                    pool = self.pool
+
+                try:
+                    future = pool.submit(_run_job, command, list(arguments), cwd, submitted)
+                except BrokenProcessPool:
+                    # The pool broke before this job was submitted (e.g. an idle worker was killed), start again
+                    self.restart_pool(pool)
+                    continue
+
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    self.restart_pool(pool)
+                break
+
+            result["total_seconds"] = round(time.time() - submitted, 6)
+
+            with self.lock:
+                self.counts["pending"] -= 1
+                self.counts["completed" if result["status"] == "ok" else "failed"] += 1
+
+            return result
+        finally:
+            self.slots.release()
+
+    def restart_pool(self, brokenPool):
+        with self.lock:
+            # Another job may have restarted it already
+            if self.pool is not brokenPool:
+                return
+            print ("A worker crashed, restarting the pool...")
+            brokenPool.shutdown(wait=False)
+            self.start_pool()
+
+    def status(self):
+        with self.lock:
+            status = dict(self.counts)
+        status["status"] = "ok"
+        status["workers"] = self.workers
+        status["queue"] = self.queue
+        status["uptime_seconds"] = round(time.time() - self.started, 3)
+        return status
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    # One connection, one JSON request per line, one JSON reply per line
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() == b"":
+                continue
+
+            try:
+                request = json.loads( line.decode("utf-8") )
+                command = request.get("command")
+            except ValueError:
+                request, command = {}, None
+
+            if command == "status":
+                reply = self.server.service.status()
+            elif command == "stop":
+                reply = { "status": "ok" }
+                # shutdown() waits for serve_forever() to return, it cannot be called from this thread
+                threading.Thread( target=self.server.shutdown ).start()
+            elif command is None:
+                reply = { "status": "error", "exit_code": 2, "output": "Error: invalid request\n" }
+            else:
+                reply = self.server.service.run( command, request.get("arguments", []), request.get("cwd") )
+
+            self.wfile.write( (json.dumps(reply) + "\n").encode("utf-8") )
+            self.wfile.flush()
+
+
+def make_server(service, socketPath=None, port=None):
+    #
+    # Threading server on a Unix domain socket, or on localhost TCP if a port is given (127.0.0.1 only, no authentication)
+    #
+    if port is not None:
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        server = socketserver.ThreadingTCPServer( ("127.0.0.1", port), RequestHandler )
+    else:
+        if os.path.exists(socketPath):
+            # A socket left behind by a service that did not stop cleanly
+            try:
+                request(socketPath, None, { "command": "status" })
+                raise RuntimeError("The service is already running on: " + socketPath)
+            except (IOError, OSError):
+                os.remove(socketPath)
+        # Only the service's user can connect (jobs run with its permissions): the socket is created with mode 0600
+        previousUmask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer( socketPath, RequestHandler )
+        finally:
+            os.umask(previousUmask)
+
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def request(socketPath, port, message):
+    #
+    # Send one request to the service and wait for the reply
+    #
+    if port is not None:
+        connection = socket.create_connection( ("127.0.0.1", port) )
+    else:
+        connection = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+        connection.connect(socketPath)
+
+    with connection:
+        connection.sendall( (json.dumps(message) + "\n").encode("utf-8") )
+        reply = connection.makefile("rb").readline()
+
+    if reply == b"":
+        raise IOError("The service closed the connection")
+
+    return json.loads( reply.decode("utf-8") )
+
+
+def submit(command, arguments, socketPath=None, port=None, cwd=None):
+    #
+    # Run a command on the service
+    # @params:
+    #     command    - Required  : a manskelab.py command, e.g. "convert" (Str)
+    #     arguments  - Required  : its command line arguments (List)
+    #     cwd        - Optional  : directory relative paths are relative to (default: the current directory)
+    # @returns:
+    #     The reply: status, exit_code, output, queue_seconds, run_seconds, total_seconds, worker
+    #
+    if socketPath is None and port is None:
+        socketPath = default_socket()
+
+    return request( socketPath, port, { "command": command,
+                                        "arguments": list(arguments),
+                                        "cwd": os.path.abspath(cwd if cwd is not None else os.getcwd()) } )
+
+
+if __name__ == "__main__":
+    # --socket and --port are options of every action
+    connection = argparse.ArgumentParser(add_help=False)
+    connection.add_argument("--socket", type=str, default=None, help="Unix domain socket of the service (default: " + default_socket() + ")")
+    connection.add_argument("--port", type=int, default=None, help="Use TCP on 127.0.0.1 at this port instead of a Unix domain socket (no authentication)")
+
+    parser = argparse.ArgumentParser()
+    actions = parser.add_subparsers(dest="action", metavar="{serve,submit,status,stop}")
+    actions.required = True
+
+    serve = actions.add_parser("serve", parents=[connection], help="Start the service")
+    serve.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: number of CPUs)")
+    serve.add_argument("--queue", type=int, default=1000, help="Maximum number of waiting jobs (default: 1000)")
+
+    job = actions.add_parser("submit", parents=[connection], help="Run a command on the service and wait for it")
+    job.add_argument("job", type=str, nargs=argparse.REMAINDER, help="The manskelab.py command and its arguments")
+
+    actions.add_parser("status", parents=[connection], help="Print the job counts of the service")
+    actions.add_parser("stop", parents=[connection], help="Stop the service")
+    args = parser.parse_args()
+
+    socketPath = args.socket if args.socket is not None or args.port is not None else default_socket()
+
+    if args.action == "serve":
+        service = Service(args.workers, args.queue)
+        server = make_server(service, socketPath, args.port)
+
+        print ("Listening on: " + ( "127.0.0.1:" + str(args.port) if args.port is not None else socketPath ))
+        if args.port is not None:
+            print ("Warning: TCP connections are not authenticated, every user of this machine can submit jobs")
+        sys.stdout.flush()
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.pool.shutdown()
+            if args.port is None and os.path.exists(socketPath):
+                os.remove(socketPath)
+
+        print ("Stopped.")
+        sys.exit(0)
+
+    try:
+        if args.action == "submit":
+            if len(args.job) == 0:
+                print ("Error: submit needs a command, e.g. submit convert scan.aim scan.nii")
+                sys.exit(2)
+            reply = submit( args.job[0], args.job[1:], socketPath, args.port )
+        else:
+            reply = request( socketPath, args.port, { "command": args.action } )
+    except (IOError, OSError) as e:
+        print ("Error: cannot reach the service (" + str(e) + "), start it with: python manskelabd.py serve")
+        sys.exit(1)
+
+    if args.action == "submit":
+        sys.stdout.write( reply.get("output", "") )
+        if "run_seconds" in reply:
+            print ( "[" + reply["status"] + "] queue: " + str(reply["queue_seconds"]) + " s, run: " + str(reply["run_seconds"]) +
+                    " s, total: " + str(reply["total_seconds"]) + " s (worker " + str(reply["worker"]) + ")" )
+        sys.exit( reply.get("exit_code", 1) )
+
+    print ( json.dumps(reply, indent=2) )
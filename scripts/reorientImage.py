@@ -0,0 +1,140 @@
+# coding=utf-8
+#-----------------------------------------------------
+# reorientImage.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Reorients an image to any anatomical orientation code (e.g. RAS, LPS, RPI).
+#-----------------------------------------------------
+#
+# Requirements:
+#   -Python 3.4 or later
+#
+# Usage:
+#   1. python reorientImage.py <INPUT_IMAGE> <ORIENTATION> [-o <OUTPUT_IMAGE>]
+#
+#   2. python reorientImage.py <INPUT_DICOM_DIRECTORY> <ORIENTATION> -o <OUTPUT_IMAGE>
+#
+#   3. python reorientImage.py <INPUT_IMAGE> <ORIENTATION> --header-only
+#
+#   4. python reorientImage.py <INPUT_IMAGE> --show
+#
+# Notes:
+#   -The orientation code gives the direction each voxel axis (i, j, k) increases towards:
+#    one of L/R, P/A, S/I per axis, in any order (48 codes). See util/orientation.py.
+#   -By default the voxels are reordered (one pass over the volume) so they are stored in the new
+#    orientation. The anatomy stays at the same world positions. Without -o the output is written
+#    next to the input as <INPUT>_<ORIENTATION> with the same extension (.nii for DICOM directories).
+#   -With --header-only the input file is changed in place: the voxels are left as they are and only
+#    the header is rewritten so the voxel axes are labelled with the new code (e.g. to fix a scan that
+#    was exported with the wrong orientation). Only uncompressed NIfTI (.nii), MHA, and MHD files.
+#-----------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+
+from util.orientation import ORIENTATIONS, HEADER_ONLY_FORMATS, orientation_code, reorient_file, relabel_file
+from util.volume_headers import NIFTI_HEADER_SIZE, read_nifti_geometry, read_meta_header, meta_geometry
+
+
+def current_orientation(inputPath):
+    # Orientation code of an image, from its header only where possible
+    extension = os.path.splitext(inputPath)[1].lower()
+
+    if extension == ".nii":
+        with open(inputPath, "rb") as niftiFile:
+            return orientation_code( read_nifti_geometry( niftiFile.read(NIFTI_HEADER_SIZE) )[3] )
+
+    if extension in [".mha", ".mhd"]:
+        return orientation_code( meta_geometry( read_meta_header(inputPath)[0] )[3] )
+
+    import SimpleITK as sitk
+
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(inputPath)
+    reader.ReadImageInformation()
+    return orientation_code( reader.GetDirection() )
+
+
+def default_output(inputPath, code):
+    # <INPUT>_<CODE> with the extension of the input (.nii for DICOM directories)
+    if os.path.isdir(inputPath):
+        return os.path.normpath(inputPath) + "_" + code + ".nii"
+
+    stem, extension = os.path.splitext(inputPath)
+    if extension.lower() == ".gz":
+        stem, extension = os.path.splitext(stem)
+        extension = extension + ".gz"
+
+    return stem + "_" + code + extension
+
+
+if __name__ == "__main__":
+    # Read in the input arguements
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("inputPath", type=str, help="The input image file path or DICOM directory")
+    parser.add_argument("orientation", type=str, nargs="?", help="The new orientation code (e.g. RAS, LPS, RPI)")
+    parser.add_argument("-o", "--outputPath", type=str, default=None, help="The output image file path")
+    parser.add_argument("--header-only", action="store_true", help="Relabel the orientation by rewriting only the header of the input file (in place)")
+    parser.add_argument("--show", action="store_true", help="Only print the current orientation code")
+
+    args = parser.parse_args()
+
+    inputPathAbs = os.path.abspath(args.inputPath)
+
+    # Check if the input exists
+    if not os.path.exists(inputPathAbs):
+        print ("Error: provided file or DICOM directory does not exist!")
+        sys.exit(1)
+
+    if args.show:
+        if os.path.isdir(inputPathAbs):
+            print ("Error: --show needs an image file!")
+            sys.exit(1)
+
+        print ( "Orientation: " + current_orientation(inputPathAbs) )
+        sys.exit(0)
+
+    if args.orientation is None or args.orientation.upper() not in ORIENTATIONS:
+        print ("Error: provide one of the orientation codes: " + ", ".join(ORIENTATIONS))
+        sys.exit(1)
+
+    code = args.orientation.upper()
+    start = time.time()
+
+    if args.header_only:
+        if args.outputPath is not None:
+            print ("Error: --header-only changes the input file in place, do not provide an output path!")
+            sys.exit(1)
+
+        if os.path.splitext(inputPathAbs)[1].lower() not in HEADER_ONLY_FORMATS:
+            print ("Error: --header-only only supports " + ", ".join(HEADER_ONLY_FORMATS) + " files!")
+            sys.exit(1)
+
+        print ("Relabelling image: " + inputPathAbs + " as " + code + " (header only)...")
+
+        try:
+            before, after = relabel_file(inputPathAbs, code)
+        except (ValueError, IOError) as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+    else:
+        outputPathAbs = os.path.abspath( args.outputPath if args.outputPath is not None else default_output(inputPathAbs, code) )
+
+        print ("Reorienting image: " + inputPathAbs + " to " + code + "...")
+
+        try:
+            before, after = reorient_file(inputPathAbs, outputPathAbs, code)
+        except (ValueError, RuntimeError) as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+        print ("Output written to: " + outputPathAbs)
+
+    print ("Orientation: " + before + " -> " + after + " (" + str( round(time.time() - start, 3) ) + " s)")
+    print ("Done!")
@@ -16,12 +16,38 @@
 #
 #   2. python resample.py <INPUT_DICOM_DIRECTORY> <OUTPUT_DIRECTORY> <OUTPUT_SPACING_X> <OUTPUT_SPACING_Y> <OUTPUT_SPACING_Z>
 #
+#   3. python resample.py <INPUT_IMAGE> <OUTPUT_DIRECTORY> <OUTPUT_SPACING_X> <OUTPUT_SPACING_Y> <OUTPUT_SPACING_Z> --max-memory 4G
+#
+#   4. python resample.py <INPUT_IMAGE> <OUTPUT_DIRECTORY> <OUTPUT_SPACING_X> <OUTPUT_SPACING_Y> <OUTPUT_SPACING_Z> --backend sitk --interpolator sinc --threads 8
+#
+#   5. python resample.py <INPUT_IMAGE> <OUTPUT_DIRECTORY> <OUTPUT_SPACING_X> <OUTPUT_SPACING_Y> <OUTPUT_SPACING_Z> --roi 100 400 120 380 0 199
+#
+#   6. python resample.py <INPUT_IMAGE> <OUTPUT_DIRECTORY> <OUTPUT_SPACING_X> <OUTPUT_SPACING_Y> <OUTPUT_SPACING_Z> --profile profile.json
+#
 # Notes:
 #   -Current accepted file formats: NIfTI (.nii), MHA (.mha), DICOM series (provide directory containing uncompressed .dcm files)
 #
 #   -If the input is a DICOM series, the output will be a NIfTI image. Writing out a DICOM series takes more work... (TO-DO later)
-#       -Note that there is currently no functionality to check if a valid DICOM directory has been provided. You MUST provide a DICOM
-#        directory that contains only one series and no other files (ONLY uncompressed .dcm files).
+#       -DICOM directories can contain several series and other files. The first series is resampled, or the one given
+#        with --series (series number or UID). Missing or duplicate slices and non-uniform spacing are printed as warnings.
+#
+#   -The output is written to the output directory as reslice.nii (NIfTI and DICOM inputs) or reslice.mha (MHA inputs).
+#
+#   -With --max-memory the output is computed and written in blocks of slices (tiled), so the
+#    output volume never has to fit in memory. The budget covers one output block plus the
+#    input slices it needs (e.g. 512M, 4G). See util/resampling.py.
+#
+#   -Backends: vtk (vtkImageReslice, default) or sitk (SimpleITK ResampleImageFilter). The sitk backend keeps
+#    the direction cosines of the input. Interpolators: nearest, linear, cubic (vtk default), bspline (sitk default),
+#    sinc. cubic (cubic convolution) is vtk only: SimpleITK does not have it, and its B-spline is a different kernel.
+#    --threads sets the number of threads (default: the toolkit default, usually all cores).
+#    See util/resampling.py.
+#
+#   -With --roi x0 x1 y0 y1 z0 z1 only that region of the input is read and resampled (voxel indices,
+#    or mm with --roi-mm). See util/roi.py.
+#
+#   -With --profile the time, bytes read/written, and memory of each stage (read, reslice, write) are
+#    written to a Chrome trace (.json) or JSON lines file. See util/profiling.py.
 #
 #   -Spacing = voxel size
 #   -Extent  = dimensions
@@ -31,155 +57,156 @@
 
 import os
 import sys
-import vtk
-import errno
-import ntpath
-import pydicom
 import argparse
-import platform
 
-# Read in the input arguements
-parser = argparse.ArgumentParser()
-
-parser.add_argument("inputPath", type=str, help="The input image file path")
-parser.add_argument("outputPath", type=str, help="The output image file path")
-parser.add_argument("spacingX", type=str, help="The new voxel size (X)")
-parser.add_argument("spacingY", type=str, help="The new voxel size (Y)")
-parser.add_argument("spacingZ", type=str, help="The new voxel size (Z)")
-
-args = parser.parse_args()
+from util.resampling import BACKENDS, INTERPOLATORS, BACKEND_INTERPOLATORS, DEFAULT_INTERPOLATORS
+from util.resampling import open_reader, reslice_filter, image_information, dimensions, parse_memory, resample_whole, resample_tiled
+from util.resampling import sitk_read, sitk_output_geometry, resample_sitk_whole, resample_sitk_tiled
+from util.roi import add_roi_arguments, read_sitk_roi, extract_vtk
+from util.dicom_series import add_series_argument, open_series
+from util.profiling import add_profile_argument, enable_profiling, profile_stage
+
+
+def print_information(title, info):
+    # Print some information about the image
+    print ( title )
+    print ( "Dimensions:  " + str( dimensions(info["extent"]) ) )
+    print ( "Spacing:     (" + str( round( info["spacing"][0], 4 ) ) + ", "
+                            + str( round( info["spacing"][1], 4 ) ) + ", "
+                            + str( round( info["spacing"][2], 4 ) ) + ")" )
+    print ( "Origin:      " + str(info["origin"]) )
+
+
+if __name__ == "__main__":
+    # Read in the input arguements
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("inputPath", type=str, help="The input image file path")
+    parser.add_argument("outputPath", type=str, help="The output image file path")
+    parser.add_argument("spacingX", type=str, help="The new voxel size (X)")
+    parser.add_argument("spacingY", type=str, help="The new voxel size (Y)")
+    parser.add_argument("spacingZ", type=str, help="The new voxel size (Z)")
+    parser.add_argument("--max-memory", type=str, default=None, help="Resample in blocks using at most this much memory (e.g. 512M, 4G)")
+    parser.add_argument("--backend", type=str, default="vtk", choices=BACKENDS, help="Resampling backend (default: vtk)")
+    parser.add_argument("--interpolator", type=str, default=None, choices=INTERPOLATORS,
+                        help="Interpolation method (default: cubic with vtk, bspline with sitk; cubic is vtk only)")
+    parser.add_argument("--threads", type=int, default=None, help="Number of threads (default: toolkit default)")
+    add_series_argument(parser)
+    add_roi_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+
+    if args.interpolator is None:
+        args.interpolator = DEFAULT_INTERPOLATORS[args.backend]
+    elif args.interpolator not in BACKEND_INTERPOLATORS[args.backend]:
+        print ("Error: the " + args.interpolator + " interpolator is not available with the " + args.backend + " backend (choose from: " +
+               ", ".join(BACKEND_INTERPOLATORS[args.backend]) + ")")
+        sys.exit(1)
 
-inputPath = args.inputPath
-outputPath = args.outputPath
-spacingX = round( float(args.spacingX), 4)
-spacingY = round( float(args.spacingY), 4)
-spacingZ = round( float(args.spacingZ), 4)
+    if args.profile is not None:
+        enable_profiling(args.profile)
 
-# Get the absolute path for the input
-inputPathAbs = os.path.abspath(inputPath)
-outputPathAbs = os.path.abspath(outputPath)
+    spacingX = round( float(args.spacingX), 4)
+    spacingY = round( float(args.spacingY), 4)
+    spacingZ = round( float(args.spacingZ), 4)
 
-# Create the output file name (resliced)
-outputFileName = os.path.join(outputPathAbs, "reslice.nii")
+    # Get the absolute path for the input
+    inputPathAbs = os.path.abspath(args.inputPath)
+    outputPathAbs = os.path.abspath(args.outputPath)
 
-# Check if the output directory exists
-if not os.path.exists(outputPathAbs):
-    print ("Error: output directory does not exist!")
-    sys.exit(1)
+    # Check if the output directory exists
+    if not os.path.exists(outputPathAbs):
+        print ("Error: output directory does not exist!")
+        sys.exit(1)
 
-# First determine the type of image being input (e.g. NIfTI, MHA, DICOM series, etc.)
-# If the input is a directory, we are getting a DICOM series
-if os.path.isdir(inputPathAbs) :
+    # Check if the input exists
     if not os.path.exists(inputPathAbs):
-        print ("Error: DICOM directory does not exist!")
+        print ("Error: provided file or DICOM directory does not exist!")
         sys.exit(1)
+
+    # Create the output file name (resliced)
+    if os.path.isfile(inputPathAbs) and os.path.splitext(inputPathAbs)[1].lower() in [".mha", ".mhd"]:
+        outputFileName = os.path.join(outputPathAbs, "reslice.mha")
     else:
-        dicomReader = vtk.vtkDICOMImageReader()
-        dicomReader.SetDirectoryName(inputPathAbs) 
-        dicomReader.Update()  
-        dicomImage = dicomReader.GetOutput()
-
-        #Print some information about the image
-        print ( "Dimensions:  " + str(dicomImage.GetDimensions()) )
-        print ( "Spacing:     (" + str( round( dicomImage.GetSpacing()[0], 4 ) ) + ", "
-                                + str( round( dicomImage.GetSpacing()[1], 4 ) )  + ", "
-                                + str( round( dicomImage.GetSpacing()[2], 4 ) )  + ")" )
-        print ( "Origin:      " + str(dicomImage.GetOrigin()) )
-    
-        print ( "\nResampling the input image. New image information will be:" )
-        print ( "Dimensions:   " + str(dicomImage.GetDimensions()) )
-        print ( "Spacing:      (" + str(spacingX) + ", " + str(spacingY) + ", " + str(spacingZ) + ")" )
-        print ( "Origin:       " + str(dicomImage.GetOrigin()) )
-
-        resliceFilter = vtk.vtkImageReslice()
-        resliceFilter.SetInputData(dicomImage)
-
-        # vtkDICOMReader always flips images bottom-to-top.
-        # In order to have a coordinate system defined at the top left corner we need to set the direction cosines.
-        # (i.e. the first pixel for each slice is the top left corner, and images are in ascending order)
-        resliceFilter.SetResliceAxesDirectionCosines(-1,0,0, 0,1,0, 0,0,-1)
-
-        resliceFilter.SetOutputSpacing(spacingX, spacingY, spacingZ)
-        resliceFilter.SetInterpolationModeToCubic()
-        resliceFilter.Update()
-        imageResampled = resliceFilter.GetOutput()
-
-        writer = vtk.vtkNIFTIImageWriter()
-        writer.SetFileName( str(outputFileName) ) 
-        writer.SetInputData(imageResampled)
-        writer.Write()
-
-# If the input is a file, check if it is NIfTI or MHA
-elif os.path.isfile(inputPathAbs) :
-    filename, fileExtension = os.path.splitext(inputPathAbs)
-    outputPath, outputFile = ntpath.split(outputPathAbs)
-
-    # Check if the provided file exists and is a valid format
-    if not os.path.isfile(inputPathAbs) :
-        print ("Error: provided file does not exist!")
-
-    if str(fileExtension).lower() == ".nii" :
-        print ("Input file is NIfTI")
-    
-        NiftiReader = vtk.vtkNIFTIImageReader()  
-        NiftiReader.SetFileName(inputPathAbs)
-        NiftiReader.Update()  
-        NiftiImage = NiftiReader.GetOutput()
-    
-        #Print some information about the image
-        print ( "Dimensions:  " + str(NiftiImage.GetDimensions()) )
-        print ( "Spacing:     " + str( round( NiftiImage.GetSpacing()[0], 4 ) ) 
-                                + str( round( NiftiImage.GetSpacing()[1], 4 ) ) 
-                                + str( round( NiftiImage.GetSpacing()[2], 4 ) ) )
-        print ( "Origin:      " + str(NiftiImage.GetOrigin()) )
-    
+        outputFileName = os.path.join(outputPathAbs, "reslice.nii")
+
+    # Resolve the series of a DICOM directory (sorted by slice position)
+    fileNames = None
+    if os.path.isdir(inputPathAbs):
+        try:
+            fileNames = open_series(inputPathAbs, args.series).files
+        except ValueError as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+    spacing = (spacingX, spacingY, spacingZ)
+    maxMemory = None
+    if args.max_memory is not None:
+        maxMemory = parse_memory(args.max_memory)
+
+    if args.backend == "sitk":
+        try:
+            with profile_stage("read", file=inputPathAbs):
+                if args.roi is not None:
+                    image = read_sitk_roi(inputPathAbs, args.roi, args.roi_mm, fileNames)
+                else:
+                    image = sitk_read(inputPathAbs, fileNames)
+        except (ValueError, RuntimeError) as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+        geometry = sitk_output_geometry(image, spacing)
+
+        print ( "Input image:" )
+        print ( "Dimensions:  " + str(image.GetSize()) )
+        print ( "Spacing:     " + str( tuple( round(v, 4) for v in image.GetSpacing() ) ) )
+        print ( "Origin:      " + str(image.GetOrigin()) )
         print ( "\nResampling the input image. New image information will be:" )
-        print ( "Dimensions:   " + str(NiftiImage.GetDimensions()) )
-        print ( "Spacing:     (" + str(spacingX) + ", " + str(spacingY) + ", " + str(spacingZ) + ")" )
-        print ( "Origin:       " + str(NiftiImage.GetOrigin()) )
-    
-        resliceFilter = vtk.vtkImageReslice()
-        resliceFilter.SetInputData(NiftiImage)
-        resliceFilter.SetOutputSpacing(spacingX, spacingY, spacingZ)
-        # resliceFilter.SetOutputOrigin(-319.375,0,-37.5)
-        # resliceFilter.SetOutputExtent(0,511,0,511,0,61)
-        resliceFilter.SetInterpolationModeToCubic()
-        resliceFilter.Update()
-        imageResampled = resliceFilter.GetOutput()
-    
-        writer = vtk.vtkNIFTIImageWriter()
-        writer.SetFileName( str(outputFileName) ) 
-        writer.SetInputData(imageResampled)
-        writer.Write()
-    
-    elif str(fileExtension).lower() == ".mha" :
-        print ("Input file is MHA\n")
-    
-        MetaReader = vtk.vtkMetaImageReader()
-        MetaReader.SetFileName(inputPathAbs)
-        MetaReader.Update()  
-        MetaImage = MetaReader.GetOutput()
-    
-        #Print some information about the image
-        print ( "Dimensions:  " + str(MetaImage.GetDimensions()) )
-        print ( "Spacing:     " + str( round( MetaImage.GetSpacing()[0], 4 ) ) 
-                                + str( round( MetaImage.GetSpacing()[1], 4 ) ) 
-                                + str( round( MetaImage.GetSpacing()[2], 4 ) ) )
-        print ( "Origin:      " + str(MetaImage.GetOrigin()) )
-    
-        print ( "\nResampling the input image. New image information will be:" )
-        print ( "Dimensions:   " + str(MetaImage.GetDimensions()) )
-        print ( "Spacing:     (" + str(spacingX) + ", " + str(spacingY) + ", " + str(spacingZ) + ")" )
-        print ( "Origin:       " + str(MetaImage.GetOrigin()) )
-    
-        resliceFilter = vtk.vtkImageReslice()
-        resliceFilter.SetInputData(MetaImage)
-        resliceFilter.SetOutputSpacing(spacingX, spacingY, spacingZ)
-        resliceFilter.SetInterpolationModeToCubic()
-        resliceFilter.Update()
-        imageResampled = resliceFilter.GetOutput()
-    
-        writer = vtk.vtkMetaImageWriter()
-        writer.SetFileName( str(outputFileName) ) 
-        writer.SetInputData(imageResampled)
-        writer.Write()
\ No newline at end of file
+        print ( "Dimensions:  " + str(geometry.size) )
+        print ( "Spacing:     " + str(geometry.spacing) )
+        print ( "Origin:      " + str(geometry.origin) )
+
+        if maxMemory is None:
+            resample_sitk_whole( image, spacing, outputFileName, args.interpolator, args.threads )
+        else:
+            depth = resample_sitk_tiled( image, spacing, outputFileName, maxMemory, args.interpolator, args.threads )
+            print ( "\nResampled in blocks of " + str(depth) + " slices (memory budget: " + str(maxMemory // (1024 * 1024)) + " MB)" )
+
+        print ( "Output written to: " + outputFileName )
+        sys.exit(0)
+
+    # First determine the type of image being input (e.g. NIfTI, MHA, DICOM series, etc.)
+    try:
+        reader, cosines = open_reader(inputPathAbs, fileNames)
+    except ValueError as e:
+        print ("Error: " + str(e))
+        sys.exit(1)
+
+    # Only read the region of interest
+    source = reader
+    if args.roi is not None:
+        try:
+            source = extract_vtk(reader, args.roi, args.roi_mm)
+        except ValueError as e:
+            print ("Error: " + str(e))
+            sys.exit(1)
+
+    resliceFilter = reslice_filter( source, spacing, cosines, args.interpolator, args.threads )
+
+    print_information( "Input image:", image_information(reader) )
+    if args.roi is not None:
+        print_information( "\nRegion of interest:", image_information(source) )
+    print_information( "\nResampling the input image. New image information will be:", image_information(resliceFilter) )
+
+    if maxMemory is None:
+        # The whole input is needed, read it first so reading and resampling are timed separately
+        with profile_stage("read", file=inputPathAbs):
+            source.Update()
+
+        resample_whole( resliceFilter, outputFileName )
+    else:
+        depth = resample_tiled( resliceFilter, outputFileName, maxMemory )
+        print ( "\nResampled in blocks of " + str(depth) + " slices (memory budget: " + str(maxMemory // (1024 * 1024)) + " MB)" )
+
+    print ( "Output written to: " + outputFileName )
@@ -0,0 +1,281 @@
+#-----------------------------------------------------
+# aim_io.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Reads and writes Scanco AIM files (version 020 and 030) with
+#              numpy only, so AIM images can be loaded without vtkbone.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.aim_io import read_aim, write_aim
+#
+#   voxels, geometry = read_aim("C0001234.AIM")      # voxels are indexed (z, y, x)
+#   write_aim("copy.aim", voxels, geometry.spacing, geometry.origin)
+#
+# Notes:
+#   -File layout (little endian):
+#       v030 only: "AIMDATA_V030   \0" (16 bytes)
+#       pre-header: pre-header length, image struct length, processing log length,
+#                   image data length, associated data length (int32 in v020, int64 in v030)
+#       image struct: version, proc_log, data, id, reference (5 x int32), type (int32),
+#                     pos, dim, off, supdim, suppos, subdim, testoff (3 ints each), element size (mm)
+#       processing log (text), image data (x fastest), associated data
+#   -The element size is stored as VAX/VMS floats in v020 and as 64 bit integers in units of
+#    1e-6 mm in v030, the same as ITK's ScancoImageIO reads them.
+#   -Supported types: char, unsigned char, short, unsigned short, int, float, and the two binary
+#    segmentation types (run-length encoded bits, and bits packed in 2x2x2 blocks). Other types raise
+#    a ValueError.
+#   -Uncompressed voxels are memory-mapped (nothing is read until the voxels are used).
+#   -The geometry matches what fileConverter.py got from vtkboneAIMReader: spacing = element size,
+#    origin = pos * element size, identity direction (AIM files have no direction).
+#   -write_aim writes v020 files (v030 if the voxels do not fit in 2 GB) of char, short, or float voxels.
+#-----------------------------------------------------
+
+import struct
+
+import numpy as np
+
+from util.slab_io import Geometry
+
+AIM_V030 = b"AIMDATA_V030   \x00"
+
+# AIM type -> numpy type (uncompressed types)
+AIM_TYPES = { 0x00010001: "int8",    0x00160001: "uint8",
+              0x00020002: "int16",   0x00170002: "uint16",
+              0x00030004: "int32",   0x001a0004: "float32" }
+
+# numpy type -> AIM type (types write_aim can write)
+AIM_WRITE_TYPES = { "int8": 0x00010001, "int16": 0x00020002, "float32": 0x001a0004 }
+
+# Binary segmentation types
+AIM_BIN_RUN_LENGTH = 0x00150001
+AIM_BIN_PACKED = 0x00060001
+
+V020_STRUCT_SIZE = 140
+V030_STRUCT_SIZE = 280
+
+PROCESSING_LOG = ( "!\n"
+                   "! Processing Log\n"
+                   "!\n"
+                   "!-------------------------------------------------------------------------------\n"
+                   "Created by                    Manskelab util/aim_io.py\n"
+                   "!-------------------------------------------------------------------------------\n" )
+
+
+def _decode_vms_float(data):
+    # VAX/VMS F_floating -> float (the 16 bit words are swapped and the exponent bias differs by 2)
+    return 0.25 * struct.unpack( "<f", bytes( [data[2], data[3], data[0], data[1]] ) )[0]
+
+
+def _encode_vms_float(value):
+    # float -> VAX/VMS F_floating
+    data = struct.pack( "<f", 4.0 * value )
+    return bytes( [data[2], data[3], data[0], data[1]] )
+
+
+def read_aim_header(fileName):
+    #
+    # Read the header of an AIM file
+    # @returns:
+    #   A dict with: version, type, size, position, spacing, origin, dataOffset, dataSize, log
+    #
+    with open(fileName, "rb") as aimFile:
+        start = aimFile.read(16)
+
+        if start == AIM_V030:
+            version, intFormat, intSize, base = "030", "<q", 8, 16
+        else:
+            version, intFormat, intSize, base = "020", "<i", 4, 0
+
+        aimFile.seek(base)
+        preHeader = aimFile.read(5 * intSize)
+
+        if len(preHeader) < 5 * intSize:
+            raise ValueError("Not an AIM file: " + fileName)
+
+        preHeaderSize, structSize, logSize, dataSize, assocSize = struct.unpack( "<5" + intFormat[1], preHeader )
+
+        if preHeaderSize != 5 * intSize or structSize < 24 + 21 * intSize + 3 * intSize:
+            raise ValueError("Not an AIM file: " + fileName)
+
+        aimFile.seek(base + preHeaderSize)
+        imageStruct = aimFile.read(structSize)
+        log = aimFile.read(logSize).decode("latin-1")
+
+    aimType = struct.unpack_from("<i", imageStruct, 20)[0]
+    values = struct.unpack_from( "<21" + intFormat[1], imageStruct, 24 )
+    elementSize = 24 + 21 * intSize
+
+    if version == "030":
+        spacing = [ 1e-6 * v for v in struct.unpack_from("<3q", imageStruct, elementSize) ]
+    else:
+        spacing = [ _decode_vms_float( imageStruct[elementSize + 4*i : elementSize + 4*i + 4] ) for i in range(3) ]
+
+    spacing = tuple( v if v != 0 else 1.0 for v in spacing )
+    position = tuple( int(v) for v in values[0:3] )
+
+    return { "version": version,
+             "type": aimType,
+             "size": tuple( int(v) for v in values[3:6] ),
+             "position": position,
+             "spacing": spacing,
+             "origin": tuple( position[i] * spacing[i] for i in range(3) ),
+             "dataOffset": base + preHeaderSize + structSize + logSize,
+             "dataSize": dataSize,
+             "log": log }
+
+
+def _unpack_run_length_bits(data, size):
+    #
+    # Binary run-length encoding: data size (int32), the two values, then run lengths.
+    # Each run switches to the other value, except a run of 255 (254 voxels, same value continues).
+    #
+    values = np.array( [data[4], data[5]], dtype=np.uint8 ).view(np.int8)
+    runs = np.frombuffer(data, dtype=np.uint8, offset=6)
+
+    lengths = np.where(runs == 255, 254, runs).astype(np.int64)
+    switches = np.concatenate( ( [0], np.cumsum(runs != 255)[:-1] ) ) % 2
+
+    voxels = np.repeat( values[switches], lengths )
+    count = size[0] * size[1] * size[2]
+
+    if len(voxels) < count:
+        voxels = np.concatenate( ( voxels, np.zeros(count - len(voxels), dtype=np.int8) ) )
+
+    return voxels[:count].reshape( size[2], size[1], size[0] )
+
+
+def _unpack_bits(data, size):
+    #
+    # Bits packed in 2x2x2 blocks: one byte per block (bit = 4*dz + 2*dy + dx), then the value of set voxels
+    #
+    blocks = [ (n + 1) // 2 for n in size ]
+    count = blocks[0] * blocks[1] * blocks[2]
+
+    if len(data) < count + 1:
+        raise ValueError("Truncated AIM bit data")
+
+    value = data[count] if data[count] != 0 else 127
+    if value > 127:
+        value -= 256
+
+    # Least significant bit first (np.unpackbits has no bitorder argument before numpy 1.17)
+    bits = np.unpackbits( np.frombuffer(data, dtype=np.uint8, count=count) ).reshape(-1, 8)[:, ::-1]
+    bits = bits.reshape( blocks[2], blocks[1], blocks[0], 2, 2, 2 ).transpose(0, 3, 1, 4, 2, 5)
+    bits = bits.reshape( 2 * blocks[2], 2 * blocks[1], 2 * blocks[0] )[ :size[2], :size[1], :size[0] ]
+
+    return bits.astype(np.int8) * np.int8(value)
+
+
+def read_aim(fileName, mmap=True):
+    #
+    # Read an AIM file
+    # @params:
+    #     fileName  - Required  : the AIM file (Str)
+    #     mmap      - Optional  : memory-map uncompressed voxels instead of reading them (Bool)
+    # @returns:
+    #     (voxels, geometry): numpy array indexed (z, y, x) and a util.slab_io.Geometry
+    #
+    header = read_aim_header(fileName)
+    size = header["size"]
+    shape = ( size[2], size[1], size[0] )
+
+    geometry = Geometry( size, header["spacing"], header["origin"], (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0) )
+
+    if header["type"] in AIM_TYPES:
+        dtype = np.dtype( AIM_TYPES[header["type"]] ).newbyteorder("<")
+
+        if header["dataSize"] < size[0] * size[1] * size[2] * dtype.itemsize:
+            raise ValueError("Truncated AIM file: " + fileName)
+
+        if mmap:
+            voxels = np.memmap( fileName, dtype=dtype, mode="r", offset=header["dataOffset"], shape=shape )
+        else:
+            with open(fileName, "rb") as aimFile:
+                aimFile.seek(header["dataOffset"])
+                voxels = np.fromfile( aimFile, dtype=dtype, count=size[0] * size[1] * size[2] ).reshape(shape)
+
+        return (voxels, geometry)
+
+    if header["type"] in [AIM_BIN_RUN_LENGTH, AIM_BIN_PACKED]:
+        with open(fileName, "rb") as aimFile:
+            aimFile.seek(header["dataOffset"])
+            data = aimFile.read(header["dataSize"])
+
+        if header["type"] == AIM_BIN_RUN_LENGTH:
+            return (_unpack_run_length_bits(data, size), geometry)
+        return (_unpack_bits(data, size), geometry)
+
+    raise ValueError("Unsupported AIM data type: " + hex(header["type"]))
+
+
+def aim_voxels(voxels):
+    #
+    # Cast voxels to a type AIM files can store (char, short, float), if this loses nothing
+    #
+    if voxels.dtype.name in AIM_WRITE_TYPES:
+        return voxels
+
+    if voxels.dtype.kind in "iu" and voxels.size > 0:
+        low, high = voxels.min(), voxels.max()
+
+        if low >= -128 and high <= 127:
+            return voxels.astype(np.int8)
+        if low >= -32768 and high <= 32767:
+            return voxels.astype(np.int16)
+
+    if voxels.dtype == np.float64:
+        return voxels.astype(np.float32)
+
+    raise ValueError("AIM files can store char, short, or float voxels, not: " + voxels.dtype.name)
+
+
+def write_aim(fileName, voxels, spacing, origin=(0.0, 0.0, 0.0), log=PROCESSING_LOG):
+    #
+    # Write an AIM file
+    # @params:
+    #     fileName  - Required  : the AIM file (Str)
+    #     voxels    - Required  : numpy array indexed (z, y, x) of int8, int16, or float32 (see aim_voxels)
+    #     spacing   - Required  : element size in mm (x, y, z)
+    #     origin    - Optional  : stored as the position, in voxels (rounded)
+    #     log       - Optional  : processing log text (Str)
+    #
+    if voxels.ndim != 3:
+        raise ValueError("AIM files need a 3D image")
+    if voxels.dtype.name not in AIM_WRITE_TYPES:
+        raise ValueError("AIM files can store char, short, or float voxels, not: " + voxels.dtype.name)
+
+    size = ( voxels.shape[2], voxels.shape[1], voxels.shape[0] )
+    position = tuple( int( round( origin[i] / spacing[i] ) ) if spacing[i] != 0 else 0 for i in range(3) )
+    dataSize = voxels.size * voxels.dtype.itemsize
+    logData = log.encode("latin-1")
+
+    # pos, dim, off, supdim, suppos, subdim, testoff
+    values = position + size + (0, 0, 0) + size + position + size + (0, 0, 0)
+
+    if dataSize < 2**31:
+        preHeader = struct.pack( "<5i", 20, V020_STRUCT_SIZE, len(logData), dataSize, 0 )
+        imageStruct = struct.pack( "<6i", 20, 0, 0, 0, 0, AIM_WRITE_TYPES[voxels.dtype.name] )
+        imageStruct += struct.pack( "<21i", *values )
+        imageStruct += b"".join( _encode_vms_float(v) for v in spacing )
+        imageStruct += bytes( V020_STRUCT_SIZE - len(imageStruct) )
+        start = b""
+    else:
+        preHeader = struct.pack( "<5q", 40, V030_STRUCT_SIZE, len(logData), dataSize, 0 )
+        imageStruct = struct.pack( "<6i", 30, 0, 0, 0, 0, AIM_WRITE_TYPES[voxels.dtype.name] )
+        imageStruct += struct.pack( "<21q", *values )
+        imageStruct += struct.pack( "<3q", *[ int( round(v * 1e6) ) for v in spacing ] )
+        imageStruct += bytes( V030_STRUCT_SIZE - len(imageStruct) )
+        start = AIM_V030
+
+    with open(fileName, "wb") as aimFile:
+        aimFile.write(start + preHeader + imageStruct + logData)
+
+        # Write the voxels a few slices at a time (works for memory-mapped and non-contiguous arrays)
+        sliceBytes = max( 1, voxels[0].nbytes )
+        step = max( 1, (64 * 1024 * 1024) // sliceBytes )
+
+        for z in range(0, voxels.shape[0], step):
+            aimFile.write( np.ascontiguousarray( voxels[z:z + step], dtype=voxels.dtype.newbyteorder("<") ).tobytes() )
@@ -0,0 +1,148 @@
+#-----------------------------------------------------
+# dicom_cache.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Persistent on-disk cache of parsed DICOM headers.
+#              Entries are keyed by the absolute file path and are only
+#              valid while the file's modification time and size match.
+#-----------------------------------------------------
+#
+# Notes:
+#   -The cache is a single SQLite database. By default it is stored in:
+#       Linux/Mac: ~/.cache/manskelab/dicom_headers.sqlite
+#       Windows:   %LOCALAPPDATA%\manskelab\dicom_headers.sqlite
+#    Set the MANSKELAB_CACHE_DIR environment variable to use another directory.
+#   -The cache is bounded in size (MANSKELAB_CACHE_MB, default 256 MB). When it grows
+#    past the limit, the least recently used entries are removed.
+#   -Files that are not valid DICOM files are cached too, so they are not re-read.
+#   -If the cache cannot be opened (e.g. read-only home directory) the callers
+#    simply parse every header.
+#-----------------------------------------------------
+
+import os
+import json
+import time
+import sqlite3
+
+# Bump this when the cached fields (util/dicom_index.DicomFile) change
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_MB = 256
+
+
+def default_cache_path():
+    cacheDir = os.environ.get("MANSKELAB_CACHE_DIR")
+
+    if not cacheDir:
+        if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+            cacheDir = os.path.join(os.environ["LOCALAPPDATA"], "manskelab")
+        else:
+            cacheDir = os.path.join(os.path.expanduser("~"), ".cache", "manskelab")
+
+    return os.path.join(cacheDir, "dicom_headers.sqlite")
+
+
+class HeaderCache(object):
+    #
+    # SQLite-backed header cache with least recently used eviction
+    # @params:
+    #     cachePath   - Optional  : path to the SQLite database (Str)
+    #     maxSizeMB   - Optional  : maximum size of the cached headers in MB (Float)
+    #
+    def __init__(self, cachePath=None, maxSizeMB=None):
+        if cachePath is None:
+            cachePath = default_cache_path()
+        if maxSizeMB is None:
+            maxSizeMB = float( os.environ.get("MANSKELAB_CACHE_MB", DEFAULT_CACHE_MB) )
+
+        cacheDir = os.path.dirname(cachePath)
+        if cacheDir and not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+
+        self.cachePath = cachePath
+        self.maxBytes = int(maxSizeMB * 1024 * 1024)
+
+        self._connection = sqlite3.connect(cachePath, timeout=30)
+        self._used = []             # Paths read from the cache (last used time is updated on close)
+        self._new = []              # Rows to insert on close
+
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CACHE_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS headers")
+            self._connection.execute("PRAGMA user_version = %d" % CACHE_VERSION)
+
+        self._connection.execute( "CREATE TABLE IF NOT EXISTS headers ("
+                                  "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, "
+                                  "header TEXT, nbytes INTEGER, used REAL)" )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS headers_used ON headers (used)")
+        self._connection.commit()
+
+    def lookup(self, filePath, stat):
+        #
+        # Look up a file in the cache
+        # @returns:
+        #     (found, entry) where found is False if there is no entry with the same
+        #     modification time and size. entry is None for files that are not DICOM files.
+        #
+        from util.dicom_index import DicomFile
+
+        row = self._connection.execute( "SELECT mtime, size, header FROM headers WHERE path = ?", (filePath,) ).fetchone()
+
+        if row is None or row[0] != stat.st_mtime_ns or row[1] != stat.st_size:
+            return (False, None)
+
+        self._used.append(filePath)
+
+        if row[2] is None:
+            return (True, None)
+
+        values = json.loads(row[2])
+        values = [ tuple(value) if isinstance(value, list) else value for value in values ]
+
+        return (True, DicomFile(filePath, *values))
+
+    def put(self, filePath, stat, entry):
+        # Store an entry (or None for files that are not DICOM files)
+        header = None if entry is None else json.dumps( list(entry[1:]) )
+        nbytes = len(filePath) + (len(header) if header is not None else 0)
+
+        self._new.append( (filePath, stat.st_mtime_ns, stat.st_size, header, nbytes, time.time()) )
+
+    def close(self):
+        try:
+            now = time.time()
+
+            self._connection.executemany( "UPDATE headers SET used = ? WHERE path = ?", [ (now, path) for path in self._used ] )
+            self._connection.executemany( "INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?)", self._new )
+            self._evict()
+            self._connection.commit()
+        except sqlite3.Error:
+            # Failing to update the cache (e.g. locked by another process) is not fatal
+            pass
+        finally:
+            self._connection.close()
+
+    def _evict(self):
+        # Remove the least recently used entries until the cache fits in maxBytes
+        total = self._connection.execute("SELECT COALESCE(SUM(nbytes), 0) FROM headers").fetchone()[0]
+        if total <= self.maxBytes:
+            return
+
+        evict = []
+        for path, nbytes in self._connection.execute("SELECT path, nbytes FROM headers ORDER BY used ASC"):
+            if total <= self.maxBytes:
+                break
+            evict.append( (path,) )
+            total -= nbytes
+
+        self._connection.executemany("DELETE FROM headers WHERE path = ?", evict)
+
+
+def open_cache(cachePath=None, maxSizeMB=None):
+    # Open the header cache, or return None if it can't be used
+    try:
+        return HeaderCache(cachePath, maxSizeMB)
+    except (OSError, sqlite3.Error):
+        return None
@@ -0,0 +1,74 @@
+#-----------------------------------------------------
+# dicom_codecs.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Lossless DICOM compression (transfer syntax change) with GDCM.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.dicom_codecs import compress_file
+#
+#   compress_file(INPUT_DICOM, OUTPUT_DICOM, "jpegls")
+#
+# Notes:
+#   -Supported syntaxes (all lossless):
+#       jpeg     - JPEG Lossless, Process 14 SV1   (1.2.840.10008.1.2.4.70)
+#       jpegls   - JPEG-LS Lossless                 (1.2.840.10008.1.2.4.80)
+#       jpeg2000 - JPEG 2000 Lossless               (1.2.840.10008.1.2.4.90)
+#       rle      - RLE Lossless                     (1.2.840.10008.1.2.5)
+#   -SimpleITK 2.0 and later can write jpeg and jpeg2000 directly (SITK_COMPRESSORS). The other
+#    syntaxes, and all of them with older SimpleITK (no ImageFileWriter.SetCompressor), are
+#    written uncompressed first and then changed with GDCM.
+#-----------------------------------------------------
+
+# Syntax name -> transfer syntax UID
+TRANSFER_SYNTAXES = { "jpeg":     "1.2.840.10008.1.2.4.70",
+                      "jpegls":   "1.2.840.10008.1.2.4.80",
+                      "jpeg2000": "1.2.840.10008.1.2.4.90",
+                      "rle":      "1.2.840.10008.1.2.5" }
+
+# Syntax name -> SimpleITK (GDCMImageIO) compressor
+SITK_COMPRESSORS = { "jpeg":     "JPEG",
+                     "jpeg2000": "JPEG2000" }
+
+# Syntax name -> gdcm.TransferSyntax constant
+_GDCM_SYNTAXES = { "jpeg":     "JPEGLosslessProcess14_1",
+                   "jpegls":   "JPEGLSLossless",
+                   "jpeg2000": "JPEG2000Lossless",
+                   "rle":      "RLELossless" }
+
+SYNTAXES = sorted(TRANSFER_SYNTAXES)
+
+
+def compress_file(inputFile, outputFile, syntax):
+    #
+    # Change the transfer syntax of a single DICOM file. inputFile and outputFile can be the same file.
+    # @params:
+    #     inputFile  - Required  : the input DICOM file (compressed or not) (Str)
+    #     outputFile - Required  : the output DICOM file (Str)
+    #     syntax     - Required  : one of SYNTAXES (Str)
+    #
+    import gdcm
+
+    if syntax not in _GDCM_SYNTAXES:
+        raise ValueError("Unknown transfer syntax: " + str(syntax) + " (choose from: " + ", ".join(SYNTAXES) + ")")
+
+    reader = gdcm.ImageReader()
+    reader.SetFileName(inputFile)
+    if not reader.Read():
+        raise ValueError("Could not read DICOM image: " + inputFile)
+
+    change = gdcm.ImageChangeTransferSyntax()
+    change.SetTransferSyntax( gdcm.TransferSyntax( getattr(gdcm.TransferSyntax, _GDCM_SYNTAXES[syntax]) ) )
+    change.SetInput( reader.GetImage() )
+    if not change.Change():
+        raise ValueError("Could not compress " + inputFile + " with " + syntax)
+
+    writer = gdcm.ImageWriter()
+    writer.SetFileName(outputFile)
+    writer.SetFile( reader.GetFile() )
+    writer.SetImage( change.GetOutput() )
+    if not writer.Write():
+        raise IOError("Could not write DICOM file: " + outputFile)
@@ -0,0 +1,255 @@
+#-----------------------------------------------------
+# dicom_index.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Builds an in-memory index of all DICOM files in a directory.
+#              Only the header of each file is parsed (the pixel data is
+#              never read), so indexing is bound by metadata, not pixels.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.dicom_index import index_directory
+#
+#   index = index_directory(DICOM_FOLDER)
+#   for seriesUID in index.series_uids():
+#       print (index.description(seriesUID), len(index.files(seriesUID)))
+#
+# Notes:
+#   -Files are grouped by series instance UID [0x0020, 0x000e]. Within each series,
+#    files are sorted by slice position (image position [0x0020, 0x0032] projected on
+#    the slice normal), the same order GDCM uses. If a series has no geometry tags
+#    the instance number [0x0020, 0x0013] is used instead.
+#   -Each entry also stores the byte offset of the pixel data element
+#    [0x7fe0, 0x0010] so callers can get to the voxels without re-parsing.
+#   -Parsed headers are kept in a persistent cache (see util/dicom_cache.py) keyed
+#    by path, modification time, and size. Repeat runs over unchanged files skip
+#    header parsing entirely.
+#-----------------------------------------------------
+
+import os
+import collections
+
+import pydicom
+
+from pydicom.errors import InvalidDicomError
+
+from util.dicom_cache import open_cache
+
+# The only tags parsed from each file. Everything else in the header is skipped.
+INDEX_TAGS = [ (0x0008, 0x0018),    # SOP Instance UID
+               (0x0008, 0x103e),    # Series Description
+               (0x0020, 0x000e),    # Series Instance UID
+               (0x0020, 0x0011),    # Series Number
+               (0x0020, 0x0013),    # Instance Number
+               (0x0020, 0x0032),    # Image Position (Patient)
+               (0x0020, 0x0037),    # Image Orientation (Patient)
+               (0x0018, 0x0050),    # Slice Thickness
+               (0x0028, 0x0010),    # Rows
+               (0x0028, 0x0011),    # Columns
+               (0x0028, 0x0030) ]   # Pixel Spacing
+
+# One entry per DICOM file in the index
+DicomFile = collections.namedtuple( "DicomFile", [ "path", "sopInstanceUID", "seriesUID", "seriesDescription",
+                                                   "seriesNumber", "instanceNumber", "transferSyntaxUID", "pixelOffset",
+                                                   "imagePosition", "imageOrientation", "sliceThickness",
+                                                   "rows", "columns", "pixelSpacing" ] )
+
+
+def _value(dataset, tag, default=None):
+    # Return the value of a tag if it is present in the dataset
+    if tag in dataset:
+        return dataset[tag].value
+    return default
+
+
+def _floats(value):
+    # Convert a (multi-valued) DS element to a tuple of floats
+    if value is None or value == "":
+        return None
+    try:
+        return tuple( float(v) for v in value )
+    except TypeError:
+        return ( float(value), )
+
+
+def _float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _int(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def slice_position(entry):
+    #
+    # Position of a slice along its normal (the cross product of the row and column
+    # direction cosines). Returns None if the geometry tags are missing.
+    #
+    if entry.imagePosition is None or entry.imageOrientation is None:
+        return None
+    if len(entry.imagePosition) != 3 or len(entry.imageOrientation) != 6:
+        return None
+
+    row = entry.imageOrientation[0:3]
+    col = entry.imageOrientation[3:6]
+    normal = ( row[1]*col[2] - row[2]*col[1],
+               row[2]*col[0] - row[0]*col[2],
+               row[0]*col[1] - row[1]*col[0] )
+
+    return sum( p * n for p, n in zip(entry.imagePosition, normal) )
+
+
+def read_header(filePath):
+    #
+    # Read the header of a single DICOM file (no pixel data)
+    # @params:
+    #     filePath    - Required  : path to the DICOM file (Str)
+    # @returns:
+    #     A DicomFile entry, or None if the file is not a valid DICOM file
+    #
+    try:
+        with open(filePath, "rb") as fp:
+            dicom = pydicom.dcmread(fp, stop_before_pixels=True, specific_tags=INDEX_TAGS)
+
+            # Reading stops right before the pixel data element
+            pixelOffset = fp.tell()
+            if pixelOffset >= os.fstat(fp.fileno()).st_size:
+                pixelOffset = None
+    except InvalidDicomError:
+        return None
+
+    return entry_from_dataset(dicom, filePath, pixelOffset)
+
+
+def entry_from_dataset(dicom, filePath, pixelOffset=None):
+    #
+    # Index entry of a DICOM dataset that is already parsed (e.g. read from memory)
+    # @params:
+    #     dicom       - Required  : the pydicom dataset (with file_meta) (Dataset)
+    #     filePath    - Required  : path stored in the entry (Str)
+    #     pixelOffset - Optional  : byte offset of the pixel data element in the file (Int)
+    # @returns:
+    #     A DicomFile entry
+    #
+    return DicomFile( path = filePath,
+                      sopInstanceUID = str(_value(dicom, (0x0008, 0x0018), "")),
+                      seriesUID = str(_value(dicom, (0x0020, 0x000e), "")),
+                      seriesDescription = _value(dicom, (0x0008, 0x103e)),
+                      seriesNumber = _int(_value(dicom, (0x0020, 0x0011))),
+                      instanceNumber = _int(_value(dicom, (0x0020, 0x0013))),
+                      transferSyntaxUID = str(dicom.file_meta.TransferSyntaxUID),
+                      pixelOffset = pixelOffset,
+                      imagePosition = _floats(_value(dicom, (0x0020, 0x0032))),
+                      imageOrientation = _floats(_value(dicom, (0x0020, 0x0037))),
+                      sliceThickness = _float(_value(dicom, (0x0018, 0x0050))),
+                      rows = _int(_value(dicom, (0x0028, 0x0010))),
+                      columns = _int(_value(dicom, (0x0028, 0x0011))),
+                      pixelSpacing = _floats(_value(dicom, (0x0028, 0x0030))) )
+
+
+class DicomIndex(object):
+    #
+    # In-memory index: series instance UID -> instances sorted by slice position
+    #
+    def __init__(self, directory):
+        self.directory = directory
+        self.skipped = []               # Files that are not valid DICOM files
+        self._series = collections.OrderedDict()
+        self._sorted = set()
+
+    def __len__(self):
+        return sum( len(instances) for instances in self._series.values() )
+
+    def add(self, entry):
+        self._series.setdefault(entry.seriesUID, []).append(entry)
+        self._sorted.discard(entry.seriesUID)
+
+    def series_uids(self):
+        # Series UIDs ordered by series number (then UID, for series without a number)
+        def key(seriesUID):
+            seriesNumber = self._series[seriesUID][0].seriesNumber
+            return (seriesNumber is None, seriesNumber if seriesNumber is not None else 0, seriesUID)
+
+        return sorted(self._series.keys(), key=key)
+
+    def instances(self, seriesUID):
+        instances = self._series[seriesUID]
+
+        if seriesUID not in self._sorted:
+            positions = [ slice_position(entry) for entry in instances ]
+
+            if None not in positions:
+                order = sorted( range(len(instances)), key=lambda i: (positions[i], instances[i].path) )
+                instances[:] = [ instances[i] for i in order ]
+            else:
+                instances.sort( key=lambda entry: (entry.instanceNumber is None, entry.instanceNumber or 0, entry.path) )
+
+            self._sorted.add(seriesUID)
+
+        return instances
+
+    def files(self, seriesUID):
+        return [ entry.path for entry in self.instances(seriesUID) ]
+
+    def description(self, seriesUID):
+        return self._series[seriesUID][0].seriesDescription
+
+    def entries(self):
+        # All entries, series by series
+        for seriesUID in self.series_uids():
+            for entry in self.instances(seriesUID):
+                yield entry
+
+
+def index_directory(directory, callback=None, useCache=True):
+    #
+    # Index all DICOM files in a directory (not recursive)
+    # @params:
+    #     directory   - Required  : the DICOM directory (Str)
+    #     callback    - Optional  : called as callback(iteration, total) after each file (Function)
+    #     useCache    - Optional  : use the persistent header cache (Bool)
+    # @returns:
+    #     A DicomIndex
+    #
+    index = DicomIndex(directory)
+    cache = open_cache() if useCache else None
+
+    fileNames = [ os.fsdecode(name) for name in os.listdir(directory) ]
+    filePaths = [ os.path.abspath( os.path.join(directory, name) ) for name in fileNames ]
+
+    try:
+        for i, filePath in enumerate(filePaths):
+            try:
+                stat = os.stat(filePath)
+            except OSError:
+                continue
+
+            # Skip directories (e.g. previously sorted series)
+            if not os.path.isfile(filePath):
+                continue
+
+            found, entry = cache.lookup(filePath, stat) if cache is not None else (False, None)
+
+            if not found:
+                entry = read_header(filePath)
+                if cache is not None:
+                    cache.put(filePath, stat, entry)
+
+            if entry is None:
+                index.skipped.append(filePath)
+            else:
+                index.add(entry)
+
+            if callback is not None:
+                callback(i + 1, len(filePaths))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    return index
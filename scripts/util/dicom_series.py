@@ -0,0 +1,290 @@
+#-----------------------------------------------------
+# dicom_series.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Resolves the DICOM series in a directory: every series gets a
+#              file list sorted by slice position and is checked for missing
+#              or duplicate slices, non-uniform slice spacing, and slices
+#              that do not match (size, orientation, pixel spacing).
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.dicom_series import add_series_argument, resolve_series, open_series, stage_series
+#
+#   for series in resolve_series(DICOM_FOLDER):
+#       print (series.summary())
+#       for problem in series.problems:
+#           print ("  " + problem)
+#
+#   add_series_argument(parser)                           # --series NUMBER|UID
+#   series = open_series(DICOM_FOLDER, args.series)       # prints the series found and their problems
+#   reader.SetFileNames(series.files)                     # SimpleITK ImageSeriesReader
+#   vtkReader.SetDirectoryName( stage_series(series.files) )
+#
+# Notes:
+#   -The headers come from util/dicom_index.py (header only, cached), so resolving a directory
+#    that was seen before does not parse any file.
+#   -Files are grouped by series instance UID and sorted by image position projected on the slice
+#    normal (not by file name). Series without geometry tags are sorted by instance number.
+#   -Problems do not stop a conversion, they are printed as warnings:
+#       duplicate  - the same SOP instance UID, or two different slices at the same position
+#       missing    - a gap between two slices that is a multiple of the slice spacing, or a gap
+#                    in the instance numbers
+#       spacing    - a gap that is not a multiple of the slice spacing (non-uniform spacing)
+#       mismatch   - slices with different rows/columns, orientation, or pixel spacing
+#   -Duplicate SOP instances are left out of the file list (the first file is kept).
+#   -stage_series gives the VTK DICOM reader, which reads every file of a directory, a directory with
+#    only the files of one series: hard links in a hidden .manskelab-* directory next to the files
+#    (copies, with a warning, where the files can't be linked). The directory is removed when the
+#    script exits, or by remove_staged_series().
+#-----------------------------------------------------
+
+import os
+import re
+import atexit
+import shutil
+import tempfile
+
+SERIES_HELP = "DICOM series to read from a directory: series number or series instance UID (default: the first series)"
+
+# Relative tolerance for comparing slice gaps (1% of the slice spacing)
+SPACING_TOLERANCE = 0.01
+
+# Directories made by stage_series
+_staged = []
+
+
+def add_series_argument(parser):
+    #
+    # Add --series to an argparse parser
+    #
+    parser.add_argument("--series", type=str, default=None, metavar="SERIES", help=SERIES_HELP)
+
+
+def series_name(description, seriesNumber):
+    #
+    # File name for a series: "<SERIES DESCRIPTION>_<SERIES NUMBER>". Anything but letters, digits, ".", "_",
+    # and "-" (spaces, "/", ...) becomes "_", so the name is one file name that is safe in a shell on every platform
+    #
+    name = str(description).upper().strip()
+    if seriesNumber is not None:
+        name = name + "_" + str(seriesNumber)
+
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._") or "SERIES"
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return 0.5 * (values[middle - 1] + values[middle])
+
+
+def _close(a, b, tolerance=1e-4):
+    if a is None or b is None:
+        return a is b
+    return len(a) == len(b) and all( abs(x - y) <= tolerance for x, y in zip(a, b) )
+
+
+class DicomSeries(object):
+    #
+    # One series of a directory: sorted file list, slice spacing, and problems
+    #
+    def __init__(self, seriesUID, instances):
+        from util.dicom_index import slice_position
+
+        self.seriesUID = seriesUID
+        self.description = instances[0].seriesDescription
+        self.seriesNumber = instances[0].seriesNumber
+        self.problems = []
+
+        # Duplicate SOP instances (e.g. the same image sent twice): keep the first file
+        entries = []
+        sopInstanceUIDs = set()
+        for entry in instances:
+            if entry.sopInstanceUID != "" and entry.sopInstanceUID in sopInstanceUIDs:
+                self.problems.append("duplicate: " + os.path.basename(entry.path) + " is the same instance as another file")
+                continue
+            sopInstanceUIDs.add(entry.sopInstanceUID)
+            entries.append(entry)
+
+        self.entries = entries
+        self.files = [ entry.path for entry in entries ]
+        self.positions = [ slice_position(entry) for entry in entries ]
+        self.sliceSpacing = None
+
+        self._check_slices()
+
+        if None not in self.positions:
+            self._check_positions()
+        else:
+            self._check_instance_numbers()
+
+    def _check_slices(self):
+        first = self.entries[0]
+
+        for entry in self.entries[1:]:
+            if (entry.rows, entry.columns) != (first.rows, first.columns):
+                self.problems.append("mismatch: " + os.path.basename(entry.path) + " is " + str(entry.rows) + "x" + str(entry.columns) +
+                                     ", not " + str(first.rows) + "x" + str(first.columns))
+            elif not _close(entry.imageOrientation, first.imageOrientation):
+                self.problems.append("mismatch: " + os.path.basename(entry.path) + " has a different orientation")
+            elif not _close(entry.pixelSpacing, first.pixelSpacing):
+                self.problems.append("mismatch: " + os.path.basename(entry.path) + " has a different pixel spacing")
+
+    def _check_positions(self):
+        gaps = [ self.positions[i + 1] - self.positions[i] for i in range(len(self.positions) - 1) ]
+        if len(gaps) == 0:
+            return
+
+        nonZero = [ gap for gap in gaps if gap > 1e-4 ]
+        if len(nonZero) == 0:
+            self.problems.append("duplicate: all " + str(len(self.positions)) + " slices are at the same position")
+            return
+
+        # The most common gap is the slice spacing (the median is not moved by a few missing slices)
+        spacing = _median(nonZero)
+        self.sliceSpacing = spacing
+
+        for i, gap in enumerate(gaps):
+            before = os.path.basename(self.files[i])
+            after = os.path.basename(self.files[i + 1])
+            steps = gap / spacing
+
+            if gap <= 1e-4:
+                self.problems.append("duplicate: " + before + " and " + after + " are at the same position (" + str(round(self.positions[i], 4)) + ")")
+            elif abs(steps - round(steps)) <= SPACING_TOLERANCE * max(1, round(steps)) and round(steps) >= 2:
+                self.problems.append("missing: " + str(int(round(steps)) - 1) + " slice(s) between " + before + " and " + after)
+            elif abs(steps - 1) > SPACING_TOLERANCE:
+                self.problems.append("spacing: " + str(round(gap, 4)) + " mm between " + before + " and " + after +
+                                     " (slice spacing: " + str(round(spacing, 4)) + " mm)")
+
+    def _check_instance_numbers(self):
+        numbers = [ entry.instanceNumber for entry in self.entries ]
+        if None in numbers:
+            return
+
+        for i in range(len(numbers) - 1):
+            if numbers[i + 1] == numbers[i]:
+                self.problems.append("duplicate: instance number " + str(numbers[i]) + " is used twice")
+            elif numbers[i + 1] - numbers[i] > 1:
+                self.problems.append("missing: instance number(s) " + str(numbers[i] + 1) + " to " + str(numbers[i + 1] - 1))
+
+    @property
+    def ok(self):
+        return len(self.problems) == 0
+
+    def summary(self):
+        text = "Series " + str(self.seriesNumber) + ": " + str(self.description) + " (" + str(len(self.files)) + " images"
+        if self.sliceSpacing is not None:
+            text += ", " + str(round(self.sliceSpacing, 4)) + " mm slices"
+        text += ")"
+
+        if not self.ok:
+            text += ", " + str(len(self.problems)) + " problem(s)"
+        return text
+
+    def name(self):
+        return series_name(self.description, self.seriesNumber)
+
+    def matches(self, selector):
+        # selector is a series number or a series instance UID
+        return str(selector) == self.seriesUID or str(selector) == str(self.seriesNumber)
+
+
+def resolve_series(directory, useCache=True):
+    #
+    # Resolve and check every DICOM series in a directory
+    # @params:
+    #     directory   - Required  : the DICOM directory (Str)
+    #     useCache    - Optional  : use the persistent header cache (Bool)
+    # @returns:
+    #     A list of DicomSeries, ordered by series number
+    #
+    from util.dicom_index import index_directory
+
+    index = index_directory(directory, useCache=useCache)
+    return [ DicomSeries( seriesUID, index.instances(seriesUID) ) for seriesUID in index.series_uids() ]
+
+
+def open_series(directory, selector=None, useCache=True, verbose=True):
+    #
+    # The series to read from a directory, printing the series found and the problems of the chosen one
+    # @params:
+    #     selector    - Optional  : series number or series instance UID (default: the first series)
+    # @returns:
+    #     A DicomSeries, raises a ValueError if there is no (matching) series
+    #
+    seriesList = resolve_series(directory, useCache)
+
+    if len(seriesList) == 0:
+        raise ValueError("no DICOM files found in the directory!")
+
+    if selector is None:
+        series = seriesList[0]
+    else:
+        matches = [ series for series in seriesList if series.matches(selector) ]
+        if len(matches) == 0:
+            raise ValueError("no series " + str(selector) + " in the directory, found: " +
+                             ", ".join( str(series.seriesNumber) + " (" + str(series.description) + ")" for series in seriesList ))
+        series = matches[0]
+
+    if verbose:
+        if len(seriesList) > 1:
+            print ("Found " + str(len(seriesList)) + " series. Reading: " + series.summary())
+        for problem in series.problems:
+            print ("Warning: " + problem)
+
+    return series
+
+
+def stage_series(fileNames):
+    #
+    # A directory with only the given files, for readers that read a whole directory (vtkDICOMImageReader)
+    # @returns:
+    #     The directory of the files if it has no other files, otherwise a temporary directory of hard links
+    #
+    directory = os.path.dirname( os.path.abspath(fileNames[0]) )
+    names = [ os.path.basename(fileName) for fileName in fileNames ]
+
+    if all( os.path.dirname( os.path.abspath(fileName) ) == directory for fileName in fileNames ):
+        if sorted( os.listdir(directory) ) == sorted(names):
+            return directory
+
+    if len(_staged) == 0:
+        atexit.register(remove_staged_series)
+
+    # On the file system of the series, so the files can be hard linked (the system temporary
+    # directory is often another file system, or in memory)
+    try:
+        stagedDirectory = tempfile.mkdtemp(prefix=".manskelab-", dir=directory)
+    except OSError:
+        # Read-only directory
+        stagedDirectory = tempfile.mkdtemp(prefix="manskelab-")
+    _staged.append(stagedDirectory)
+
+    copying = False
+    for i, fileName in enumerate(fileNames):
+        # Numbered names: files from different directories can have the same name
+        stagedFile = os.path.join( stagedDirectory, str(i).rjust(5, "0") + "_" + os.path.basename(fileName) )
+        try:
+            os.link(fileName, stagedFile)
+        except OSError as e:
+            # Another file system, or no hard links
+            if not copying:
+                print ("Warning: cannot hard link the series into " + stagedDirectory + " (" + str(e.strerror) + "), copying the files instead")
+                copying = True
+            shutil.copy2(fileName, stagedFile)
+
+    return stagedDirectory
+
+
+def remove_staged_series():
+    #
+    # Remove the directories made by stage_series
+    #
+    while len(_staged) > 0:
+        shutil.rmtree( _staged.pop(), ignore_errors=True )
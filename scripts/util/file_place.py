@@ -0,0 +1,79 @@
+#-----------------------------------------------------
+# file_place.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Places a file at a new location without decoding it.
+#              Supported modes:
+#                   copy    - regular copy (file contents and timestamps)
+#                   link    - hard link (no extra disk space, same file system only)
+#                   reflink - copy-on-write clone (Btrfs, XFS, ...), falls back to copy
+#                   move    - rename/move the file
+#-----------------------------------------------------
+
+import os
+import errno
+import shutil
+
+PLACE_MODES = ["copy", "link", "reflink", "move"]
+
+# ioctl request to clone a file on Linux (FICLONE = _IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    # Clone src into dst. Raises OSError if the file system doesn't support it.
+    import fcntl
+
+    with open(src, "rb") as srcFile:
+        with open(dst, "wb") as dstFile:
+            fcntl.ioctl(dstFile.fileno(), FICLONE, srcFile.fileno())
+
+
+def place_file(src, dst, mode="copy"):
+    #
+    # Place a file at a new location
+    # @params:
+    #     src         - Required  : the source file (Str)
+    #     dst         - Required  : the destination file (Str). With copy and reflink an existing file is
+    #                                 replaced, with link and move it is never removed: a FileExistsError is
+    #                                 raised (it may be the only copy of another file)
+    #     mode        - Optional  : one of PLACE_MODES (Str)
+    # @returns:
+    #     The mode that was actually used (reflink falls back to copy)
+    #
+    if mode not in PLACE_MODES:
+        raise ValueError("Unknown mode: " + str(mode))
+
+    # Hard links and clones can't overwrite an existing file
+    if os.path.lexists(dst):
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return mode     # Already in place (e.g. linked by a previous run)
+        if mode in ("link", "move"):
+            raise FileExistsError(errno.EEXIST, "Destination already exists", dst)
+        os.remove(dst)
+
+    if mode == "copy":
+        shutil.copy2(src, dst)
+
+    elif mode == "link":
+        os.link(src, dst)
+
+    elif mode == "reflink":
+        try:
+            _reflink(src, dst)
+        except (OSError, ImportError) as e:
+            # Not Linux, or the file system doesn't support clones
+            if isinstance(e, OSError) and e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                raise
+            if os.path.exists(dst):
+                os.remove(dst)
+            shutil.copy2(src, dst)
+            return "copy"
+        shutil.copystat(src, dst)
+
+    elif mode == "move":
+        shutil.move(src, dst)
+
+    return mode
@@ -1,25 +1,70 @@
-#----------------------------------------------------- 
+#-----------------------------------------------------
 # img2dicom.py
 #
 # Created by:   Michael Kuczynski
 # Created on:   21-01-2020
 #
-# Description: Converts between SimpleITK and VTK image types
+# Description: Writes a 3D SimpleITK image out as a DICOM series
+#-----------------------------------------------------
+#
+# Notes:
+#   -Slices are written concurrently by a pool of threads (SimpleITK releases the
+#    GIL while extracting and writing, so this scales with the number of cores
+#    until the disk is the limit). Use workers=1 to write serially.
+#   -The tags shared by the whole series (including the creation date/time) are
+#    computed once. Only the image position and instance number differ per slice.
+#   -compression writes a lossless compressed series: "jpeg", "jpegls", "jpeg2000",
+#    or "rle" (see util/dicom_codecs.py). Default is uncompressed. The codecs only
+#    handle 8 and 16 bit integer pixels, so wider integer images are cast down when
+#    their values fit (lossless), otherwise a ValueError is raised.
 #-----------------------------------------------------
 
 import os
 import time
 import errno
 
+from concurrent.futures import ThreadPoolExecutor
+
 import SimpleITK as sitk
 
-def img2dicom(img, outDir):
+from util.dicom_codecs import SITK_COMPRESSORS, SYNTAXES, compress_file
+
+def _compressible(img):
+    # Cast an image to a pixel type the lossless DICOM codecs can handle, if this loses nothing
+    if img.GetPixelID() in [sitk.sitkUInt8, sitk.sitkInt8, sitk.sitkUInt16, sitk.sitkInt16]:
+        return img
+
+    if img.GetPixelID() in [sitk.sitkUInt32, sitk.sitkUInt64, sitk.sitkInt32, sitk.sitkInt64]:
+        minMax = sitk.MinimumMaximumImageFilter()
+        minMax.Execute(img)
+
+        if img.GetPixelID() in [sitk.sitkUInt32, sitk.sitkUInt64]:
+            if minMax.GetMaximum() <= 65535:
+                return sitk.Cast(img, sitk.sitkUInt16)
+        elif minMax.GetMinimum() >= -32768 and minMax.GetMaximum() <= 32767:
+            return sitk.Cast(img, sitk.sitkInt16)
+
+    raise ValueError("Compressed DICOM output needs 8 or 16 bit integer pixels, not: " + img.GetPixelIDTypeAsString())
+
+
+def img2dicom(img, outDir, startIndex=0, timestamp=None, workers=None, compression=None):
+    # startIndex and timestamp let a volume be written in several pieces (slabs) as one series:
+    # slices are numbered from startIndex and all pieces share the series date/time/UID of timestamp.
+    # workers is the number of writer threads (default: number of CPUs).
+    # compression is None (uncompressed) or one of util.dicom_codecs.SYNTAXES.
     new_img = img
-    spacingX, spacingY, spacingZ = img.GetSpacing()
-    new_img.SetSpacing([spacingX, spacingY, spacingZ])
 
-    modification_time = time.strftime("%H%M%S")
-    modification_date = time.strftime("%Y%m%d")
+    if compression is not None and compression not in SYNTAXES:
+        raise ValueError("Unknown DICOM compression: " + str(compression) + " (choose from: " + ", ".join(SYNTAXES) + ")")
+
+    if compression is not None:
+        new_img = _compressible(img)
+
+    if timestamp is None:
+        timestamp = time.time()
+
+    modification_time = time.strftime("%H%M%S", time.localtime(timestamp))
+    modification_date = time.strftime("%Y%m%d", time.localtime(timestamp))
 
     # Copy some of the tags and add the relevant tags indicating the change.
     # For the series instance UID (0020|000e), each of the components is a number, cannot start
@@ -32,12 +77,11 @@ def img2dicom(img, outDir):
                          ("0020|000e", "1.2.826.0.1.3680043.2.1125."+modification_date+".1"+modification_time), # Series Instance UID
                          ("0020|0037", '\\'.join(map(str, (direction[0], direction[3], direction[6],# Image Orientation (Patient)
                                                              direction[1],direction[4],direction[7])))),
-                         ("0008|103e", "Created-SimpleITK")] # Series Description
-
-    writer = sitk.ImageFileWriter()
-    # Use the study/series/frame of reference information given in the meta-data
-    # dictionary and not the automatically generated information from the file IO
-    writer.KeepOriginalImageUIDOn()
+                         ("0008|103e", "Created-SimpleITK"), # Series Description
+                         ("0008|0012", modification_date), # Instance Creation Date
+                         ("0008|0013", modification_time), # Instance Creation Time
+                         # Setting the type to CT preserves the slice location.
+                         ("0008|0060", "CT")] # set the type to CT so the thickness is carried over
 
     outPath = os.path.join(outDir, "dcm")
 
@@ -47,21 +91,54 @@ def img2dicom(img, outDir):
         if e.errno != errno.EEXIST:     # Directory already exists error
             raise
 
-    for i in range(new_img.GetDepth()):
-        image_slice = new_img[:,:,i]
-        # Tags shared by the series.
-        for tag, value in series_tag_values:
-            image_slice.SetMetaData(tag, value)
-        # Slice specific tags.
-        image_slice.SetMetaData("0008|0012", time.strftime("%Y%m%d")) # Instance Creation Date
-        image_slice.SetMetaData("0008|0013", time.strftime("%H%M%S")) # Instance Creation Time
-        # Setting the type to CT preserves the slice location.
-        image_slice.SetMetaData("0008|0060", "CT")  # set the type to CT so the thickness is carried over
-        
-        # (0020, 0032) image position patient determines the 3D spacing between slices.
-        image_slice.SetMetaData("0020|0032", '\\'.join(map(str,new_img.TransformIndexToPhysicalPoint((0,0,i))))) # Image Position (Patient)
-        image_slice.SetMetaData("0020,0013", str(i)) # Instance Number
-
-        # Write to the output directory and add the extension dcm, to force writing in DICOM format.
-        writer.SetFileName(os.path.join(outPath, "dcm" + str(i) + '.dcm'))
-        writer.Execute(image_slice)
\ No newline at end of file
+    # JPEG and JPEG2000 are written by SimpleITK directly where it can (ImageFileWriter.SetCompressor,
+    # SimpleITK 2.0 or later), the other syntaxes (and all with older SimpleITK) are changed after writing
+    sitkCompression = compression in SITK_COMPRESSORS and hasattr(sitk.ImageFileWriter, "SetCompressor")
+
+    def write_slices(indices):
+        # One writer per thread
+        writer = sitk.ImageFileWriter()
+        # Use the study/series/frame of reference information given in the meta-data
+        # dictionary and not the automatically generated information from the file IO
+        writer.KeepOriginalImageUIDOn()
+
+        if sitkCompression:
+            writer.SetUseCompression(True)
+            writer.SetCompressor(SITK_COMPRESSORS[compression])
+
+        for i in indices:
+            # Extract only this slice (the volume itself is never copied)
+            image_slice = new_img[:,:,i]
+            # Tags shared by the series.
+            for tag, value in series_tag_values:
+                image_slice.SetMetaData(tag, value)
+
+            # (0020, 0032) image position patient determines the 3D spacing between slices.
+            image_slice.SetMetaData("0020|0032", '\\'.join(map(str,new_img.TransformIndexToPhysicalPoint((0,0,i))))) # Image Position (Patient)
+            image_slice.SetMetaData("0020|0013", str(startIndex + i)) # Instance Number
+
+            # Write to the output directory and add the extension dcm, to force writing in DICOM format.
+            fileName = os.path.join(outPath, "dcm" + str(startIndex + i) + '.dcm')
+            writer.SetFileName(fileName)
+            writer.Execute(image_slice)
+
+            if compression is not None and not sitkCompression:
+                compress_file(fileName, fileName, compression)
+
+    depth = new_img.GetDepth()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, depth))
+
+    if workers == 1:
+        write_slices(range(depth))
+        return
+
+    # Hand each thread a contiguous block of slices
+    blockSize = (depth + workers - 1) // workers
+    blocks = [ range(start, min(start + blockSize, depth)) for start in range(0, depth, blockSize) ]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises any exception from the threads
+        list( pool.map(write_slices, blocks) )
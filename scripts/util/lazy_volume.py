@@ -0,0 +1,250 @@
+#-----------------------------------------------------
+# lazy_volume.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Memory-mapped (lazy) access to uncompressed volumes. Only the
+#              header is read when the volume is opened, voxels are read from
+#              disk when (and only where) they are used.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.lazy_volume import LazyVolume
+#
+#   volume = LazyVolume("scan.nii")
+#   sliceArray = volume.slice(100)                          # one slice (y, x)
+#   roiImage = volume.roi_image([1400, 1400, 1400], [200, 200, 200])   # SimpleITK image of the ROI
+#   print ( volume.statistics() )
+#
+# Notes:
+#   -Supported files: uncompressed MHA, MHD/RAW, NIfTI (.nii, .hdr/.img), and AIM.
+#    Compressed files (.nii.gz, CompressedData = True) raise a ValueError.
+#   -volume.voxels is a numpy memmap indexed (z, y, x[, components]). Index, size, and geometry are
+#    given the SimpleITK way (x, y, z), the same as util.slab_io.Geometry.
+#   -A ROI only reads the pages it covers: a 200^3 ROI of a 3000^3 scan reads about 200^3 voxels
+#    (200 x 200 runs of 200 contiguous voxels).
+#   -NIfTI scl_slope/scl_inter are applied by roi(), roi_image(), and statistics(), not by voxels.
+#-----------------------------------------------------
+
+import os
+import struct
+
+import numpy as np
+
+from util.slab_io import Geometry
+from util.volume_headers import META_TYPES, NIFTI_TYPES, NIFTI_HEADER_SIZE
+from util.volume_headers import nifti_byte_order, read_nifti_geometry, read_meta_header, meta_geometry
+
+LAZY_EXTENSIONS = [".mha", ".mhd", ".raw", ".nii", ".hdr", ".img", ".aim"]
+
+
+def _nifti_layout(fileName):
+    # (geometry, dtype, ncomp, data file, offset, slope, intercept) of a NIfTI-1 file
+    stem, extension = os.path.splitext(fileName)
+    headerFile = stem + ".hdr" if extension.lower() == ".img" else fileName
+
+    with open(headerFile, "rb") as niftiFile:
+        header = niftiFile.read(NIFTI_HEADER_SIZE)
+
+    byteOrder = nifti_byte_order(header)
+    dim = struct.unpack_from(byteOrder + "8h", header, 40)
+    dataType = struct.unpack_from(byteOrder + "h", header, 70)[0]
+    offset = int( struct.unpack_from(byteOrder + "f", header, 108)[0] )
+    slope, intercept = struct.unpack_from(byteOrder + "ff", header, 112)
+
+    if any( dim[i] > 1 for i in range(4, dim[0] + 1) ):
+        raise ValueError("Only 3D NIfTI images are supported: " + fileName)
+
+    types = dict( (code, name) for name, code in NIFTI_TYPES.items() )
+    if dataType not in types:
+        raise ValueError("Unsupported NIfTI data type " + str(dataType) + ": " + fileName)
+
+    dataFile = fileName
+    if extension.lower() in [".hdr", ".img"]:
+        dataFile = stem + ".img"
+
+    size, spacing, origin, direction = read_nifti_geometry(header)
+    dtype = np.dtype( types[dataType] ).newbyteorder(byteOrder)
+
+    return ( Geometry(size, spacing, origin, direction), dtype, 1, dataFile, offset, slope, intercept )
+
+
+def _meta_layout(fileName):
+    # (geometry, dtype, ncomp, data file, offset, slope, intercept) of a MetaImage file
+    if os.path.splitext(fileName)[1].lower() == ".raw":
+        fileName = os.path.splitext(fileName)[0] + ".mhd"
+
+    fields, headerSize = read_meta_header(fileName)
+    values = dict( (key, value) for key, value in fields )
+
+    if values.get("CompressedData", "False").lower() == "true":
+        raise ValueError("Compressed MetaImage files cannot be memory-mapped: " + fileName)
+    if int( values.get("NDims", "3") ) != 3:
+        raise ValueError("Only 3D MetaImage files are supported: " + fileName)
+
+    types = dict( (name, dtype) for dtype, name in META_TYPES.items() )
+    if values.get("ElementType") not in types:
+        raise ValueError("Unsupported MetaImage element type " + str( values.get("ElementType") ) + ": " + fileName)
+
+    byteOrder = ">" if values.get("BinaryDataByteOrderMSB", values.get("ElementByteOrderMSB", "False")).lower() == "true" else "<"
+    dtype = np.dtype( types[ values["ElementType"] ] ).newbyteorder(byteOrder)
+    ncomp = int( values.get("ElementNumberOfChannels", "1") )
+
+    size, spacing, origin, direction = meta_geometry(fields)
+
+    dataFile = values["ElementDataFile"]
+    if dataFile == "LOCAL":
+        dataFile = fileName
+        offset = headerSize
+    elif dataFile.startswith("LIST") or "%" in dataFile:
+        raise ValueError("MetaImage files with a list of data files are not supported: " + fileName)
+    else:
+        dataFile = os.path.join( os.path.dirname( os.path.abspath(fileName) ), dataFile )
+        offset = 0
+
+    # HeaderSize = -1: the voxels are at the end of the data file
+    skip = int( values.get("HeaderSize", "0") )
+    if skip == -1:
+        offset = os.path.getsize(dataFile) - size[0] * size[1] * size[2] * ncomp * dtype.itemsize
+    else:
+        offset += skip
+
+    return ( Geometry(size, spacing, origin, direction), dtype, ncomp, dataFile, offset, 1.0, 0.0 )
+
+
+def _aim_layout(fileName):
+    # (geometry, dtype, ncomp, data file, offset, slope, intercept) of an AIM file
+    from util.aim_io import AIM_TYPES, read_aim_header
+
+    header = read_aim_header(fileName)
+    if header["type"] not in AIM_TYPES:
+        raise ValueError("Compressed AIM files cannot be memory-mapped: " + fileName)
+
+    geometry = Geometry( header["size"], header["spacing"], header["origin"], (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0) )
+    dtype = np.dtype( AIM_TYPES[header["type"]] ).newbyteorder("<")
+
+    return ( geometry, dtype, 1, fileName, header["dataOffset"], 1.0, 0.0 )
+
+
+class LazyVolume(object):
+    #
+    # A memory-mapped 3D volume (see the notes above)
+    #
+    def __init__(self, fileName):
+        extension = os.path.splitext(fileName)[1].lower()
+
+        if extension in [".nii", ".hdr", ".img"]:
+            layout = _nifti_layout(fileName)
+        elif extension in [".mha", ".mhd", ".raw"]:
+            layout = _meta_layout(fileName)
+        elif extension == ".aim":
+            layout = _aim_layout(fileName)
+        else:
+            raise ValueError("Memory-mapping is not supported for: " + fileName + " (use " + ", ".join(LAZY_EXTENSIONS) + ")")
+
+        self.fileName = fileName
+        self.geometry, self.dtype, self.ncomp, self.dataFile, self.offset, self.slope, self.intercept = layout
+
+        shape = ( self.size[2], self.size[1], self.size[0] )
+        if self.ncomp > 1:
+            shape = shape + (self.ncomp,)
+
+        if os.path.getsize(self.dataFile) < self.offset + int( np.prod(shape) ) * self.dtype.itemsize:
+            raise ValueError("Truncated image file: " + self.dataFile)
+
+        self.voxels = np.memmap( self.dataFile, dtype=self.dtype, mode="r", offset=self.offset, shape=shape )
+
+    @property
+    def size(self):
+        return self.geometry.size
+
+    @property
+    def spacing(self):
+        return self.geometry.spacing
+
+    @property
+    def origin(self):
+        return self.geometry.origin
+
+    @property
+    def direction(self):
+        return self.geometry.direction
+
+    def __getitem__(self, key):
+        # Index the memmap directly, (z, y, x[, components])
+        return self.voxels[key]
+
+    def _scaled(self, voxels):
+        # Apply the NIfTI scaling, if there is one
+        if self.slope == 0 or (self.slope == 1 and self.intercept == 0):
+            return voxels
+        return voxels * np.float32(self.slope) + np.float32(self.intercept)
+
+    def slice(self, z):
+        #
+        # One slice as a numpy array (y, x[, components])
+        #
+        return self._scaled( np.array(self.voxels[z]) )
+
+    def roi(self, index, size):
+        #
+        # Read a region of interest
+        # @params:
+        #     index  - Required  : first voxel (x, y, z)
+        #     size   - Required  : number of voxels (x, y, z)
+        # @returns:
+        #     (voxels, geometry): numpy array (z, y, x[, components]) and the util.slab_io.Geometry of the ROI
+        #
+        for i in range(3):
+            if index[i] < 0 or size[i] < 1 or index[i] + size[i] > self.size[i]:
+                raise ValueError("ROI " + str( tuple(index) ) + " + " + str( tuple(size) ) + " is outside the image " + str(self.size))
+
+        voxels = np.array( self.voxels[ index[2]:index[2] + size[2], index[1]:index[1] + size[1], index[0]:index[0] + size[0] ] )
+
+        origin = tuple( self.origin[row] + sum( self.direction[row*3 + column] * index[column] * self.spacing[column] for column in range(3) )
+                        for row in range(3) )
+
+        return ( self._scaled(voxels), Geometry( tuple(size), self.spacing, origin, self.direction ) )
+
+    def roi_image(self, index, size):
+        #
+        # Read a region of interest as a SimpleITK image (with its origin, spacing, and direction)
+        #
+        import SimpleITK as sitk
+
+        voxels, geometry = self.roi(index, size)
+
+        image = sitk.GetImageFromArray( voxels, isVector=self.ncomp > 1 )
+        image.SetSpacing(geometry.spacing)
+        image.SetOrigin(geometry.origin)
+        image.SetDirection(geometry.direction)
+
+        return image
+
+    def statistics(self, slabSize=64):
+        #
+        # Minimum, maximum, mean, and standard deviation, read slabSize slices at a time
+        # @returns:
+        #     A dict with: min, max, mean, std
+        #
+        count = 0
+        total = 0.0
+        squares = 0.0
+        minimum = None
+        maximum = None
+
+        for z in range(0, self.size[2], slabSize):
+            slab = self._scaled( np.asarray( self.voxels[z:z + slabSize] ) ).astype(np.float64)
+
+            count += slab.size
+            total += slab.sum()
+            squares += np.square(slab).sum()
+            minimum = slab.min() if minimum is None else min( minimum, slab.min() )
+            maximum = slab.max() if maximum is None else max( maximum, slab.max() )
+
+        mean = total / count
+        return { "min": float(minimum),
+                 "max": float(maximum),
+                 "mean": float(mean),
+                 "std": float( np.sqrt( max( squares / count - mean * mean, 0.0 ) ) ) }
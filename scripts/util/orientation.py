@@ -0,0 +1,272 @@
+#-----------------------------------------------------
+# orientation.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Anatomical orientation codes (RAS, LPS, RPI, ...) and reorientation
+#              of images to any of the 48 codes, either by permuting the voxels
+#              or by rewriting only the header of NIfTI and MetaImage files.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.orientation import orientation_code, reorient_file, relabel_file
+#
+#   reorient_file(INPUT_IMAGE, OUTPUT_IMAGE, "RAS")    # voxels are reordered, the anatomy stays where it is
+#   relabel_file(INPUT_IMAGE, "RAS")                   # header only, in place
+#
+# Notes:
+#   -A code gives, for voxel axes i, j, k, the anatomical direction each axis increases
+#    towards (L/R, P/A, S/I), the same as DICOM, nibabel, and SimpleITK DICOMOrient.
+#    An identity direction is "LPS" in SimpleITK (ITK/DICOM world coordinates) and "RAS" in NIfTI terms.
+#   -Reorienting (reorient_file) changes the order the voxels are stored in. The image still
+#    shows the same anatomy at the same world positions, so the voxels have to be moved (one
+#    transpose/flip copy of the volume).
+#   -Relabelling (relabel_file) keeps the voxels as they are and changes the header so the voxel
+#    axes are labelled with the new code (e.g. to fix a scan exported with the wrong orientation).
+#    The origin is kept. For uncompressed NIfTI (.nii) and MetaImage (.mha/.mhd) files only the
+#    header is rewritten in place, so this takes milliseconds regardless of the image size.
+#-----------------------------------------------------
+
+import os
+import itertools
+
+import numpy as np
+
+from util.volume_headers import NIFTI_HEADER_SIZE, read_nifti_geometry, update_nifti_geometry
+from util.volume_headers import read_meta_header, meta_geometry, update_meta_fields
+
+# World axis (LPS) -> (letter of the positive direction, letter of the negative direction)
+AXIS_LETTERS = ( ("L", "R"), ("P", "A"), ("S", "I") )
+
+# All 48 orientation codes
+ORIENTATIONS = sorted( "".join( AXIS_LETTERS[axis][0 if sign > 0 else 1] for axis, sign in zip(axes, signs) )
+                       for axes in itertools.permutations(range(3))
+                       for signs in itertools.product([1, -1], repeat=3) )
+
+HEADER_ONLY_FORMATS = [".nii", ".mha", ".mhd"]
+
+
+def parse_orientation(code):
+    #
+    # Orientation code -> [(worldAxis, sign), ...] for voxel axes i, j, k
+    #
+    code = str(code).upper()
+    axes = []
+
+    for letter in code:
+        for axis in range(3):
+            if letter in AXIS_LETTERS[axis]:
+                axes.append( (axis, 1 if letter == AXIS_LETTERS[axis][0] else -1) )
+
+    if len(code) != 3 or len(axes) != 3 or sorted( axis for axis, sign in axes ) != [0, 1, 2]:
+        raise ValueError("Invalid orientation code: " + str(code) + " (use one of L/R, P/A, S/I for each axis, e.g. RAS)")
+
+    return axes
+
+
+def _world_axes(direction):
+    #
+    # [(worldAxis, sign), ...] closest to the columns of a row-major direction matrix.
+    # Oblique directions are matched largest cosine first, so every world axis is used once.
+    #
+    matrix = np.abs( np.array(direction, dtype=float).reshape(3, 3) )
+    axes = [None, None, None]
+
+    for n in range(3):
+        row, column = np.unravel_index( np.argmax(matrix), matrix.shape )
+        axes[column] = ( int(row), 1 if direction[row*3 + column] > 0 else -1 )
+        matrix[row, :] = -1
+        matrix[:, column] = -1
+
+    return axes
+
+
+def orientation_code(direction):
+    #
+    # Orientation code of a row-major direction matrix (LPS), e.g. "LPS" for the identity
+    #
+    return "".join( AXIS_LETTERS[axis][0 if sign > 0 else 1] for axis, sign in _world_axes(direction) )
+
+
+def orientation_axes(direction, code):
+    #
+    # How to get from an image with the given direction to the orientation code:
+    # [(inputAxis, sign), ...] for output axes i, j, k (the same form as util.reorient.signed_permutation)
+    #
+    current = _world_axes(direction)
+    target = parse_orientation(code)
+    axes = []
+
+    for worldAxis, sign in target:
+        for inputAxis in range(3):
+            if current[inputAxis][0] == worldAxis:
+                axes.append( (inputAxis, sign * current[inputAxis][1]) )
+
+    return axes
+
+
+def permute_array(array, axes):
+    #
+    # Reorder a numpy array indexed (z, y, x[, components]) by a signed axis permutation.
+    # Returns a view (no voxels are copied).
+    #
+    array = array.transpose( [ 2 - axes[2 - i][0] for i in range(3) ] + list( range(3, array.ndim) ) )
+
+    for i in range(3):
+        if axes[2 - i][1] < 0:
+            array = np.flip(array, i)
+
+    return array
+
+
+def reoriented_geometry(size, spacing, origin, direction, axes):
+    #
+    # Geometry of an image after its voxels are reordered by axes (same world positions)
+    # @returns:
+    #   (size, spacing, origin, direction)
+    #
+    newDirection = [0.0] * 9
+    newOrigin = list(origin)
+
+    for column, (axis, sign) in enumerate(axes):
+        for row in range(3):
+            newDirection[row*3 + column] = sign * direction[row*3 + axis]
+
+            # A flipped axis starts at the other end of the image
+            if sign < 0:
+                newOrigin[row] += direction[row*3 + axis] * spacing[axis] * (size[axis] - 1)
+
+    return ( tuple( size[axis] for axis, sign in axes ),
+             tuple( spacing[axis] for axis, sign in axes ),
+             tuple(newOrigin),
+             tuple(newDirection) )
+
+
+def relabelled_direction(direction, code):
+    #
+    # Direction matrix that labels the voxel axes of an image with the orientation code,
+    # keeping any obliqueness of the original direction
+    #
+    axes = orientation_axes(direction, code)
+    return tuple( sign * direction[row*3 + axis] for row in range(3) for axis, sign in axes )
+
+
+def reorient_image(image, code):
+    #
+    # Reorient a SimpleITK image to the orientation code by reordering its voxels (one copy)
+    #
+    import SimpleITK as sitk
+
+    axes = orientation_axes(image.GetDirection(), code)
+
+    size, spacing, origin, direction = reoriented_geometry( image.GetSize(), image.GetSpacing(), image.GetOrigin(), image.GetDirection(), axes )
+
+    output = sitk.GetImageFromArray( permute_array( sitk.GetArrayViewFromImage(image), axes ), isVector=image.GetNumberOfComponentsPerPixel() > 1 )
+    output.SetSpacing(spacing)
+    output.SetOrigin(origin)
+    output.SetDirection(direction)
+
+    return output
+
+
+def reorient_file(inputImage, outputImage, code):
+    #
+    # Read an image (file or DICOM directory), reorient it to the orientation code, and write it out
+    # @returns:
+    #   (original code, new code)
+    #
+    import SimpleITK as sitk
+
+    if os.path.isdir(inputImage):
+        from util.dicom_index import index_directory
+
+        index = index_directory(inputImage)
+        if len(index.series_uids()) == 0:
+            raise ValueError("No DICOM series found in: " + inputImage)
+
+        reader = sitk.ImageSeriesReader()
+        reader.SetFileNames( index.files( index.series_uids()[0] ) )
+        image = reader.Execute()
+    else:
+        image = sitk.ReadImage(inputImage)
+
+    if image.GetDimension() != 3:
+        raise ValueError("Reorienting requires a 3D image: " + inputImage)
+
+    output = reorient_image(image, code)
+    sitk.WriteImage(output, outputImage)
+
+    return ( orientation_code( image.GetDirection() ), orientation_code( output.GetDirection() ) )
+
+
+def relabel_file(fileName, code):
+    #
+    # Relabel the orientation of an uncompressed NIfTI (.nii) or MetaImage (.mha/.mhd) file in place,
+    # rewriting only the header. The voxels are not read.
+    # @returns:
+    #   (original code, new code)
+    #
+    extension = os.path.splitext(fileName)[1].lower()
+
+    if extension not in HEADER_ONLY_FORMATS:
+        raise ValueError("Header-only reorientation is only supported for " + ", ".join(HEADER_ONLY_FORMATS) + " files: " + fileName)
+
+    if extension == ".nii":
+        with open(fileName, "r+b") as niftiFile:
+            header = niftiFile.read(NIFTI_HEADER_SIZE)
+            size, spacing, origin, direction = read_nifti_geometry(header)
+
+            newDirection = relabelled_direction(direction, code)
+
+            niftiFile.seek(0)
+            niftiFile.write( update_nifti_geometry(header, origin, newDirection) )
+
+        return ( orientation_code(direction), orientation_code(newDirection) )
+
+    fields, headerSize = read_meta_header(fileName)
+    size, spacing, origin, direction = meta_geometry(fields)
+
+    values = dict( (key, value) for key, value in fields )
+    if values.get("CompressedData", "False").lower() == "true" and values["ElementDataFile"] == "LOCAL":
+        raise ValueError("Header-only reorientation is not supported for compressed .mha files: " + fileName)
+
+    newDirection = relabelled_direction(direction, code)
+    newFields = update_meta_fields(fields, origin, newDirection)
+    header = "".join( key + " = " + value + "\n" for key, value in newFields ).encode("latin-1")
+
+    if values["ElementDataFile"] != "LOCAL":
+        # Separate data file (.mhd): the header file can simply be rewritten
+        with open(fileName, "wb") as metaFile:
+            metaFile.write(header)
+    elif len(header) <= headerSize:
+        # The voxels follow the header in the same file: pad the new header to the old size
+        # (spaces at the end of the first direction line only) and overwrite it in place
+        padding = headerSize - len(header)
+        # (update_meta_fields always writes a direction line)
+        paddedKey = [ key for key, value in newFields if key in ["TransformMatrix", "Rotation", "Orientation"] ][0]
+        header = "".join( key + " = " + value + ( " " * padding if key == paddedKey else "" ) + "\n"
+                          for key, value in newFields ).encode("latin-1")
+
+        # Never write over the voxels
+        assert len(header) == headerSize, "padded header is " + str(len(header)) + " bytes, not " + str(headerSize)
+
+        with open(fileName, "r+b") as metaFile:
+            metaFile.write(header)
+    else:
+        # The new header is longer: the voxels have to be copied to a new file once
+        temporaryName = fileName + ".reorient"
+
+        with open(fileName, "rb") as inputFile, open(temporaryName, "wb") as outputFile:
+            outputFile.write(header)
+            inputFile.seek(headerSize)
+
+            while True:
+                chunk = inputFile.read(64 * 1024 * 1024)
+                if len(chunk) == 0:
+                    break
+                outputFile.write(chunk)
+
+        os.replace(temporaryName, fileName)
+
+    return ( orientation_code(direction), orientation_code(newDirection) )
@@ -0,0 +1,257 @@
+#-----------------------------------------------------
+# profiling.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Per-stage instrumentation for the scripts (--profile). Each stage
+#              (read, cast, sitk2vtk, reslice, write) records its wall time, CPU
+#              time, bytes read/written, and memory.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.profiling import add_profile_argument, enable_profiling, profile_stage
+#
+#   add_profile_argument(parser)                  # --profile FILE
+#   if args.profile is not None:
+#       enable_profiling(args.profile)
+#
+#   with profile_stage("read", file=inputImage):
+#       image = sitk.ReadImage(inputImage)
+#
+# Notes:
+#   -Output: a Chrome trace if FILE ends with .json (open it in chrome://tracing or https://ui.perfetto.dev),
+#    otherwise JSON lines (one record per stage, written as soon as the stage ends). A summary per
+#    stage is printed when the script exits.
+#   -Record fields: stage, parent (the enclosing stage), start_s, wall_s, cpu_s (all threads of the
+#    process, so cpu_s > wall_s means the stage ran in parallel), read_bytes and write_bytes (bytes
+#    passed to read/write system calls, Linux only: memory-mapped reads are not counted), rss_mb and
+#    peak_rss_mb (at the end of the stage), pid, and the fields given to profile_stage.
+#   -Stages can be nested (e.g. cast inside read). VTK pipelines execute lazily, so reading a file
+#    that streams (NIfTI) is counted in the stage that updates the pipeline.
+#   -profile_stage does nothing when profiling is not enabled.
+#-----------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+STAGES = ["read", "cast", "sitk2vtk", "vtk2sitk", "reslice", "write"]
+
+PROFILE_HELP = "Write the time, bytes read/written, and memory of each stage to FILE (Chrome trace for .json, JSON lines otherwise)"
+
+# The active Profile (None when profiling is not enabled)
+_profile = None
+
+
+def _io_counters():
+    # Bytes passed to read() and write() system calls by this process (None if /proc/self/io is not available)
+    try:
+        with open("/proc/self/io") as ioFile:
+            counters = dict( line.split(":", 1) for line in ioFile.read().splitlines() if ":" in line )
+        return ( int(counters["rchar"]), int(counters["wchar"]) )
+    except (IOError, OSError, KeyError, ValueError):
+        return ( None, None )
+
+
+def _memory_mb():
+    # (current, peak) resident memory of this process in MB (None where it cannot be read)
+    current = None
+    try:
+        with open("/proc/self/statm") as statmFile:
+            current = int( statmFile.read().split()[1] ) * os.sysconf("SC_PAGE_SIZE") / 1024.0**2
+    except (IOError, OSError, IndexError, ValueError):
+        pass
+
+    peak = None
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on Mac
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / ( 1024.0**2 if sys.platform == "darwin" else 1024.0 )
+
+        # The kernel updates the peak lazily, it can be a little behind the current value
+        if current is not None:
+            peak = max(peak, current)
+
+    return ( current, peak )
+
+
+def _difference(after, before):
+    if after is None or before is None:
+        return None
+    return after - before
+
+
+def _json_value(value):
+    if value is None or isinstance( value, (bool, int, float, str) ):
+        return value
+    return str(value)
+
+
+class Profile(object):
+    #
+    # The records of one run of a script
+    #
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.chromeTrace = os.path.splitext(fileName)[1].lower() == ".json"
+        self.records = []
+        self.stack = []
+        self.start = time.perf_counter()
+
+        # JSON lines are written as the stages end, so a crash keeps the stages done so far
+        self.lines = None if self.chromeTrace else open(fileName, "w")
+
+    def add(self, record):
+        self.records.append(record)
+
+        if self.lines is not None:
+            self.lines.write( json.dumps(record) + "\n" )
+            self.lines.flush()
+
+    def close(self):
+        if self.lines is not None:
+            self.lines.close()
+            return
+
+        events = []
+        for record in self.records:
+            args = dict( (key, value) for key, value in record.items() if key not in ["stage", "start_s", "wall_s", "pid", "tid"] )
+
+            events.append( { "name": record["stage"], "cat": "manskelab", "ph": "X", "pid": record["pid"], "tid": record["tid"],
+                             "ts": int( record["start_s"] * 1e6 ), "dur": int( record["wall_s"] * 1e6 ), "args": args } )
+
+            if record["rss_mb"] is not None:
+                events.append( { "name": "memory (MB)", "ph": "C", "pid": record["pid"],
+                                 "ts": int( (record["start_s"] + record["wall_s"]) * 1e6 ),
+                                 "args": { "rss": record["rss_mb"], "peak": record["peak_rss_mb"] } } )
+
+        with open(self.fileName, "w") as traceFile:
+            json.dump( { "traceEvents": events, "displayTimeUnit": "ms", "otherData": { "command": " ".join(sys.argv) } }, traceFile )
+
+    def summary(self):
+        #
+        # Totals per stage name
+        # @returns:
+        #     A list of (stage, count, wall_s, cpu_s, read_bytes, write_bytes, peak_rss_mb)
+        #
+        names = []
+        for record in sorted( self.records, key=lambda record: record["start_s"] ):
+            if record["stage"] not in names:
+                names.append(record["stage"])
+
+        totals = []
+        for name in names:
+            records = [ record for record in self.records if record["stage"] == name ]
+            total = lambda key: None if any( record[key] is None for record in records ) else sum( record[key] for record in records )
+            peaks = [ record["peak_rss_mb"] for record in records if record["peak_rss_mb"] is not None ]
+
+            totals.append( ( name, len(records), total("wall_s"), total("cpu_s"), total("read_bytes"), total("write_bytes"),
+                             max(peaks) if len(peaks) > 0 else None ) )
+
+        return totals
+
+
+def add_profile_argument(parser):
+    #
+    # Add --profile FILE to an argparse parser
+    #
+    parser.add_argument("--profile", type=str, default=None, metavar="FILE", help=PROFILE_HELP)
+
+
+def enable_profiling(fileName):
+    #
+    # Record the stages of this process to fileName. The file is finished when the script exits.
+    #
+    global _profile
+
+    if _profile is None:
+        _profile = Profile(fileName)
+        atexit.register(finish_profiling)
+
+
+def finish_profiling(verbose=True):
+    #
+    # Write the profile and print the summary (called when the script exits)
+    #
+    global _profile
+
+    if _profile is None:
+        return
+
+    profile = _profile
+    _profile = None
+    profile.close()
+
+    if not verbose or len(profile.records) == 0:
+        return
+
+    megabytes = lambda value: "-" if value is None else "{:.1f}".format(value / 1024.0**2)
+
+    print ( "\nProfile written to: " + os.path.abspath(profile.fileName) )
+    print ( "{:<10} {:>6} {:>10} {:>10} {:>12} {:>12} {:>10}".format("stage", "count", "wall (s)", "CPU (s)", "read (MB)", "written (MB)", "peak (MB)") )
+
+    for name, count, wall, cpu, readBytes, writeBytes, peak in profile.summary():
+        print ( "{:<10} {:>6} {:>10.3f} {:>10.3f} {:>12} {:>12} {:>10}".format(
+                name, count, wall, cpu, megabytes(readBytes), megabytes(writeBytes), "-" if peak is None else "{:.1f}".format(peak) ) )
+
+
+def profiling_enabled():
+    return _profile is not None
+
+
+@contextlib.contextmanager
+def profile_stage(name, **fields):
+    #
+    # Record a stage (a with block, or a decorator for a whole function)
+    # @params:
+    #     name    - Required  : stage name, usually one of STAGES (Str)
+    #     fields  - Optional  : extra values to store with the record (e.g. file=inputImage, z0=z0)
+    #
+    profile = _profile
+
+    if profile is None:
+        yield
+        return
+
+    parent = profile.stack[-1] if len(profile.stack) > 0 else None
+    profile.stack.append(name)
+
+    readBefore, writeBefore = _io_counters()
+    cpuBefore = time.process_time()
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpuBefore
+        readAfter, writeAfter = _io_counters()
+        current, peak = _memory_mb()
+        profile.stack.pop()
+
+        record = { "stage": name,
+                   "parent": parent,
+                   "start_s": round(start - profile.start, 6),
+                   "wall_s": round(wall, 6),
+                   "cpu_s": round(cpu, 6),
+                   "read_bytes": _difference(readAfter, readBefore),
+                   "write_bytes": _difference(writeAfter, writeBefore),
+                   "rss_mb": None if current is None else round(current, 1),
+                   "peak_rss_mb": None if peak is None else round(peak, 1),
+                   "pid": os.getpid(),
+                   "tid": threading.get_ident() }
+
+        for key, value in fields.items():
+            record[key] = _json_value(value)
+
+        profile.add(record)
@@ -0,0 +1,133 @@
+#-----------------------------------------------------
+# reorient.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Flips and axis permutations of VTK images. Pure flips and
+#              permutations are done by reordering the voxel array (no
+#              interpolation), anything else falls back to vtkImageReslice.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.reorient import FLIP_COSINES, reorient_image
+#
+#   flipped = reorient_image(image, FLIP_COSINES["x"], image.GetOrigin())
+#
+# Notes:
+#   -Cosines are given the vtkImageReslice way: 9 values, the reslice axes
+#    direction cosines (row-major), i.e. input position = cosines * output position.
+#   -Flips and permutations keep the image where it is: the voxels are reordered
+#    within the image's own extent and the output keeps the input origin (the same
+#    as vtkImageFlip with FlipAboutOrigin off). Other rotations are about the image centre.
+#   -VTK is imported by the functions that use it, FLIP_COSINES can be used without VTK.
+#-----------------------------------------------------
+
+import numpy as np
+
+from util.sitk_vtk import _get_direction, _set_direction
+from util.orientation import permute_array
+
+# Flip axis -> reslice axes direction cosines
+FLIP_COSINES = { "x":  (-1,0,0, 0,1,0, 0,0,1),
+                 "y":  (1,0,0, 0,-1,0, 0,0,1),
+                 "z":  (1,0,0, 0,1,0, 0,0,-1),
+                 "xy": (-1,0,0, 0,-1,0, 0,0,1),
+                 "xz": (-1,0,0, 0,1,0, 0,0,-1),
+                 "yz": (1,0,0, 0,-1,0, 0,0,-1) }
+
+for _axes in list(FLIP_COSINES):
+    FLIP_COSINES[_axes[::-1]] = FLIP_COSINES[_axes]
+
+
+def signed_permutation(cosines, tolerance=1e-6):
+    #
+    # If cosines is a signed permutation matrix, return [(inputAxis, sign), ...] for output axes x, y, z.
+    # Otherwise return None.
+    #
+    axes = []
+
+    for column in range(3):
+        values = [ float(cosines[row*3 + column]) for row in range(3) ]
+        nonzero = [ row for row in range(3) if abs(values[row]) > tolerance ]
+
+        if len(nonzero) != 1 or abs( abs(values[nonzero[0]]) - 1.0 ) > tolerance:
+            return None
+
+        axes.append( (nonzero[0], 1 if values[nonzero[0]] > 0 else -1) )
+
+    if sorted( axis for axis, sign in axes ) != [0, 1, 2]:
+        return None
+
+    return axes
+
+
+def reslice_image(image, cosines, outputOrigin=None):
+    #
+    # Reorient an image with vtkImageReslice (works for any rotation). The image is rotated about its centre.
+    #
+    import vtk
+
+    resliceFilter = vtk.vtkImageReslice()
+    resliceFilter.SetInputData(image)
+    resliceFilter.SetResliceAxesDirectionCosines(*cosines)
+    resliceFilter.SetResliceAxesOrigin( image.GetCenter() )
+    resliceFilter.AutoCropOutputOn()
+
+    if outputOrigin is not None:
+        resliceFilter.SetOutputOrigin(outputOrigin)
+
+    resliceFilter.Update()
+    return resliceFilter.GetOutput()
+
+
+def permute_image(image, axes, outputOrigin=None):
+    #
+    # Reorient an image by a signed axis permutation (from signed_permutation) by reordering the voxels
+    # within the image extent. Only the reordered voxels are copied (once), nothing is interpolated.
+    #
+    import vtk
+    from vtk.util.numpy_support import vtk_to_numpy, numpy_to_vtk
+
+    extent = image.GetExtent()
+    spacing = image.GetSpacing()
+    direction = _get_direction(image)
+
+    if outputOrigin is None:
+        outputOrigin = image.GetOrigin()
+
+    scalars = image.GetPointData().GetScalars()
+    ncomp = scalars.GetNumberOfComponents()
+
+    voxels = vtk_to_numpy(scalars).reshape( extent[5] - extent[4] + 1, extent[3] - extent[2] + 1, extent[1] - extent[0] + 1, ncomp )
+    voxels = permute_array(voxels, axes)
+
+    # The reordered view is copied into a new contiguous array, which the VTK image then uses directly
+    voxels = np.ascontiguousarray(voxels).reshape(-1, ncomp)
+
+    vtk_array = numpy_to_vtk(voxels, deep=False, array_type=scalars.GetDataType())
+    vtk_array.SetName( scalars.GetName() )
+    vtk_array._numpy_voxels = voxels  # Keep the numpy buffer alive as long as the VTK array
+
+    output = vtk.vtkImageData()
+    output.SetExtent( [ v for axis, sign in axes for v in (extent[2*axis], extent[2*axis + 1]) ] )
+    output.SetSpacing( [ spacing[axis] for axis, sign in axes ] )
+    output.SetOrigin(outputOrigin)
+    output.GetPointData().SetScalars(vtk_array)
+
+    # The output axes are the permuted input axes
+    _set_direction( output, [ direction[row*3 + axis] for row in range(3) for axis, sign in axes ] )
+
+    return output
+
+
+def reorient_image(image, cosines, outputOrigin=None):
+    #
+    # Reorient an image: flips and axis permutations are done without resampling,
+    # any other rotation goes through vtkImageReslice
+    #
+    axes = signed_permutation(cosines)
+
+    if axes is None:
+        return reslice_image(image, cosines, outputOrigin)
+    return permute_image(image, axes, outputOrigin)
@@ -0,0 +1,559 @@
+#-----------------------------------------------------
+# resampling.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Resampling engine used by resample.py. The whole output can be
+#              computed in one Update(), or in Z-blocks of the output extent
+#              (tiled) so peak memory stays within a given budget.
+#              Two backends: VTK (vtkImageReslice) and SimpleITK (ResampleImageFilter).
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.resampling import open_reader, reslice_filter, resample_whole, resample_tiled
+#
+#   reader, cosines = open_reader(INPUT_IMAGE)
+#   reslice = reslice_filter(reader, (0.03, 0.03, 0.03), cosines)
+#   resample_tiled(reslice, OUTPUT_IMAGE, maxMemory=4 * 1024**3)
+#
+#   image = sitk_read(INPUT_IMAGE)
+#   resample_sitk_whole(image, (0.03, 0.03, 0.03), OUTPUT_IMAGE, "bspline")
+#
+# Notes:
+#   -The reader is connected to vtkImageReslice as a pipeline (not with SetInputData), so
+#    in tiled mode each block only asks the reader for the input slices it needs. The NIfTI
+#    reader then only reads those slices from disk. The MetaImage and DICOM readers cannot
+#    read part of an image (nor can the NIfTI reader when qfac is -1: it returns the wrong
+#    slices), so for those inputs the whole input is read first and only the output is tiled.
+#   -Tiled output is written block by block with util/slab_io.py (NIfTI, MHA, or MHD/RAW).
+#    The header matches what the VTK writers of resample_whole() write.
+#   -The VTK backend drops the input direction cosines (VTK images are axis aligned), the
+#    SimpleITK backend keeps the input origin and direction.
+#   -Interpolators (INTERPOLATORS): nearest, linear, cubic, bspline (cubic B-spline), and
+#    sinc (Lanczos windowed sinc, radius 3). cubic is VTK's cubic convolution, which SimpleITK
+#    does not have: the SimpleITK backend rejects it (BACKEND_INTERPOLATORS) rather than use a
+#    different kernel. The default is cubic for VTK and bspline for SimpleITK (DEFAULT_INTERPOLATORS).
+#   -threads sets the number of threads of the filter and the toolkit's global default
+#    (None: leave the toolkit default, which is usually the number of cores).
+#   -DICOM directories can hold several series: the series to read is resolved with util/dicom_series.py
+#    (first series by default), and vtkDICOMImageReader is given a directory with only that series.
+#   -VTK (and pydicom, for DICOM directories) is only imported by the functions that use it,
+#    so the SimpleITK backend does not load VTK.
+#-----------------------------------------------------
+
+import os
+import sys
+
+import SimpleITK as sitk
+
+from util.slab_io import RawSlabWriter, DicomSlabSource, Geometry
+from util.reorient import FLIP_COSINES
+from util.profiling import profile_stage
+
+# vtkDICOMReader always flips images bottom-to-top.
+# In order to have a coordinate system defined at the top left corner we need to set the direction cosines.
+# (i.e. the first pixel for each slice is the top left corner, and images are in ascending order)
+DICOM_COSINES = FLIP_COSINES["xz"]
+
+# Half width (radius) of the windowed sinc kernel, in voxels
+SINC_RADIUS = 3
+
+# Input slices read for one output slice by each interpolation kernel (kernel width)
+KERNEL_SLICES = { "nearest": 1,
+                  "linear":  2,
+                  "cubic":   4,
+                  "bspline": 4,
+                  "sinc":    2 * SINC_RADIUS }
+
+BACKENDS = ["vtk", "sitk"]
+INTERPOLATORS = ["nearest", "linear", "cubic", "bspline", "sinc"]
+
+# Interpolator -> SimpleITK interpolator (no cubic convolution in SimpleITK)
+SITK_INTERPOLATORS = { "nearest": sitk.sitkNearestNeighbor,
+                       "linear":  sitk.sitkLinear,
+                       "bspline": sitk.sitkBSpline,
+                       "sinc":    sitk.sitkLanczosWindowedSinc }
+
+# Interpolators of each backend, and the default one
+BACKEND_INTERPOLATORS = { "vtk":  INTERPOLATORS,
+                          "sitk": [ interpolator for interpolator in INTERPOLATORS if interpolator in SITK_INTERPOLATORS ] }
+DEFAULT_INTERPOLATORS = { "vtk": "cubic", "sitk": "bspline" }
+
+
+def parse_memory(value):
+    #
+    # Parse a memory size such as "512M", "4G", or "4096" (MB) and return it in bytes
+    #
+    value = str(value).strip().upper().rstrip("B")
+    units = { "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4 }
+
+    if value and value[-1] in units:
+        return int( float(value[:-1]) * units[value[-1]] )
+    return int( float(value) * units["M"] )
+
+
+def open_reader(inputPath, fileNames=None):
+    #
+    # Create (but do not run) the VTK reader for a NIfTI or MHA file, or a DICOM directory
+    # @params:
+    #     fileNames   - Optional  : files of the DICOM series to read (default: the first series of the directory)
+    # @returns:
+    #     (reader, cosines) where cosines are the reslice axes direction cosines to use, or None
+    #
+    import vtk
+
+    if os.path.isdir(inputPath):
+        from util.dicom_series import open_series, stage_series
+
+        if fileNames is None:
+            fileNames = open_series(inputPath, verbose=False).files
+
+        # vtkDICOMImageReader reads every file of the directory: give it a directory with only this series
+        reader = vtk.vtkDICOMImageReader()
+        reader.SetDirectoryName( stage_series(fileNames) )
+        return (reader, DICOM_COSINES)
+
+    extension = os.path.splitext(inputPath)[1].lower()
+
+    if extension == ".nii":
+        reader = vtk.vtkNIFTIImageReader()
+    elif extension == ".mha" or extension == ".mhd":
+        reader = vtk.vtkMetaImageReader()
+    else:
+        raise ValueError("Unsupported input image: " + inputPath)
+
+    reader.SetFileName(inputPath)
+    return (reader, None)
+
+
+def set_threads(threads):
+    #
+    # Set the global default number of threads of VTK and SimpleITK (None: leave the defaults)
+    #
+    if threads is None:
+        return
+
+    # Only VTK filters use the VTK default: do not import VTK for it
+    if "vtk" in sys.modules:
+        sys.modules["vtk"].vtkMultiThreader.SetGlobalDefaultNumberOfThreads(threads)
+    sitk.ProcessObject.SetGlobalDefaultNumberOfThreads(threads)
+
+
+def reslice_filter(reader, spacing, cosines=None, interpolator="cubic", threads=None):
+    #
+    # Connect a vtkImageReslice to a reader
+    # @params:
+    #     reader       - Required  : a VTK image reader (or any algorithm with an image output)
+    #     spacing      - Required  : the output voxel size (x, y, z)
+    #     cosines      - Optional  : reslice axes direction cosines (9 values)
+    #     interpolator - Optional  : one of INTERPOLATORS (Str)
+    #     threads      - Optional  : number of threads (Int)
+    #
+    if interpolator not in INTERPOLATORS:
+        raise ValueError("Unknown interpolator: " + str(interpolator) + " (choose from: " + ", ".join(INTERPOLATORS) + ")")
+
+    import vtk
+
+    resliceFilter = vtk.vtkImageReslice()
+
+    if interpolator == "bspline":
+        # B-spline interpolation works on the spline coefficients of the image, not the image itself.
+        # Keep the output in the pixel type of the input.
+        reader.UpdateInformation()
+        coefficients = vtk.vtkImageBSplineCoefficients()
+        coefficients.SetInputConnection(reader.GetOutputPort())
+        coefficients.SetSplineDegree(3)
+        resliceFilter.SetInputConnection(coefficients.GetOutputPort())
+        resliceFilter.SetOutputScalarType( vtk.vtkImageData.GetScalarType( reader.GetOutputInformation(0) ) )
+
+        bsplineInterpolator = vtk.vtkImageBSplineInterpolator()
+        bsplineInterpolator.SetSplineDegree(3)
+        resliceFilter.SetInterpolator(bsplineInterpolator)
+
+        if threads is not None:
+            coefficients.SetNumberOfThreads(threads)
+    else:
+        resliceFilter.SetInputConnection(reader.GetOutputPort())
+
+        if interpolator == "sinc":
+            sincInterpolator = vtk.vtkImageSincInterpolator()
+            sincInterpolator.SetWindowFunctionToLanczos()
+            sincInterpolator.SetWindowHalfWidth(SINC_RADIUS)
+            resliceFilter.SetInterpolator(sincInterpolator)
+        elif interpolator == "nearest":
+            resliceFilter.SetInterpolationModeToNearestNeighbor()
+        elif interpolator == "linear":
+            resliceFilter.SetInterpolationModeToLinear()
+        else:
+            resliceFilter.SetInterpolationModeToCubic()
+
+    if cosines is not None:
+        resliceFilter.SetResliceAxesDirectionCosines(*cosines)
+
+    resliceFilter.SetOutputSpacing(*spacing)
+
+    if threads is not None:
+        set_threads(threads)
+        resliceFilter.SetNumberOfThreads(threads)
+
+    return resliceFilter
+
+
+def image_information(algorithm):
+    #
+    # Extent, spacing, origin, direction, scalar size (bytes), and components of an algorithm's output,
+    # from the pipeline information only (nothing is read or computed)
+    #
+    import vtk
+
+    algorithm.UpdateInformation()
+    info = algorithm.GetOutputInformation(0)
+
+    scalars = vtk.vtkDataObject.GetActiveFieldInformation( info, vtk.vtkDataObject.FIELD_ASSOCIATION_POINTS, vtk.vtkDataSetAttributes.SCALARS )
+    ncomp = 1
+    if scalars is not None and scalars.Has( vtk.vtkDataObject.FIELD_NUMBER_OF_COMPONENTS() ):
+        ncomp = scalars.Get( vtk.vtkDataObject.FIELD_NUMBER_OF_COMPONENTS() )
+
+    # Older VTK versions have no direction in the pipeline information
+    direction = (1,0,0, 0,1,0, 0,0,1)
+    if hasattr(vtk.vtkDataObject, "DIRECTION") and info.Has( vtk.vtkDataObject.DIRECTION() ):
+        direction = info.Get( vtk.vtkDataObject.DIRECTION() )
+
+    return { "extent": info.Get( vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT() ),
+             "spacing": info.Get( vtk.vtkDataObject.SPACING() ),
+             "origin": info.Get( vtk.vtkDataObject.ORIGIN() ),
+             "direction": direction,
+             "scalarSize": vtk.vtkImageData().GetScalarSize(info),
+             "ncomp": ncomp }
+
+
+def can_stream(reader):
+    #
+    # True if the reader returns correct data for a partial (Z) update extent
+    #
+    import vtk
+
+    if not isinstance(reader, vtk.vtkNIFTIImageReader):
+        return False
+
+    reader.UpdateInformation()
+    return reader.GetQFac() > 0
+
+
+def dimensions(extent):
+    return ( extent[1] - extent[0] + 1, extent[3] - extent[2] + 1, extent[5] - extent[4] + 1 )
+
+
+def kernel_slices(resliceFilter):
+    #
+    # Input slices read for one output slice by the interpolator of a vtkImageReslice (see KERNEL_SLICES)
+    #
+    interpolator = resliceFilter.GetInterpolator()
+
+    if interpolator.IsA("vtkImageSincInterpolator"):
+        return 2 * interpolator.GetWindowHalfWidth()
+    if interpolator.IsA("vtkImageBSplineInterpolator"):
+        return interpolator.GetSplineDegree() + 1
+
+    import vtk
+
+    # vtkImageInterpolator: nearest, linear, or cubic interpolation mode
+    modes = { vtk.VTK_NEAREST_INTERPOLATION: "nearest", vtk.VTK_LINEAR_INTERPOLATION: "linear", vtk.VTK_CUBIC_INTERPOLATION: "cubic" }
+    return KERNEL_SLICES[ modes[ resliceFilter.GetInterpolationMode() ] ]
+
+
+def block_depth(resliceFilter, maxMemory, streaming=True):
+    #
+    # Number of output slices per block so that one output block plus the input slices
+    # it needs (or the whole input, if the input is not streamed) fit in maxMemory bytes (at least 1)
+    #
+    inInfo = image_information( resliceFilter.GetInputAlgorithm() )
+    outInfo = image_information( resliceFilter )
+
+    inDims = dimensions( inInfo["extent"] )
+    outDims = dimensions( outInfo["extent"] )
+
+    inSliceBytes = inDims[0] * inDims[1] * inInfo["scalarSize"] * inInfo["ncomp"]
+    outSliceBytes = outDims[0] * outDims[1] * outInfo["scalarSize"] * outInfo["ncomp"]
+
+    # Input slices covered by one output slice
+    ratio = abs( float(outInfo["spacing"][2]) / inInfo["spacing"][2] )
+
+    if streaming:
+        depth = ( maxMemory - kernel_slices(resliceFilter) * inSliceBytes ) / ( outSliceBytes + ratio * inSliceBytes )
+    else:
+        depth = ( maxMemory - inDims[2] * inSliceBytes ) / outSliceBytes
+
+    return max( 1, min( outDims[2], int(depth) ) )
+
+
+def output_geometry(outputFileName, outInfo):
+    # The VTK NIfTI writer treats VTK coordinates as RAS and ignores the direction, the VTK MetaImage
+    # writer keeps them as they are (LPS). Write the same geometry so tiled and whole outputs read back identically.
+    size = dimensions( outInfo["extent"] )
+    spacing = outInfo["spacing"]
+
+    if os.path.splitext(outputFileName)[1].lower() == ".nii":
+        direction = (1,0,0, 0,1,0, 0,0,1)
+    else:
+        # vtkMetaImageReader stores TransformMatrix transposed in the VTK direction (and vtkMetaImageWriter
+        # transposes it back): the row-major LPS direction is the transpose
+        direction = tuple( outInfo["direction"][column*3 + row] for row in range(3) for column in range(3) )
+
+    # Position of the first voxel of the extent
+    start = [ outInfo["extent"][2*i] * spacing[i] for i in range(3) ]
+    origin = [ outInfo["origin"][row] + sum( direction[row*3 + column] * start[column] for column in range(3) ) for row in range(3) ]
+
+    if os.path.splitext(outputFileName)[1].lower() == ".nii":
+        return Geometry( size, spacing, (-origin[0], -origin[1], origin[2]), (-1,0,0, 0,-1,0, 0,0,1) )
+    return Geometry( size, spacing, tuple(origin), tuple(direction) )
+
+
+def resample_whole(resliceFilter, outputFileName):
+    #
+    # Resample the whole image in one Update() and write it with the VTK writer for the extension
+    #
+    import vtk
+
+    if os.path.splitext(outputFileName)[1].lower() == ".nii":
+        writer = vtk.vtkNIFTIImageWriter()
+    else:
+        writer = vtk.vtkMetaImageWriter()
+
+    writer.SetFileName( str(outputFileName) )
+    writer.SetInputConnection( resliceFilter.GetOutputPort() )
+
+    # Update the reslice filter first so the time spent resampling and writing can be told apart
+    with profile_stage("reslice"):
+        resliceFilter.Update()
+
+    with profile_stage("write", file=outputFileName):
+        writer.Write()
+
+
+def resample_tiled(resliceFilter, outputFileName, maxMemory, callback=None):
+    #
+    # Resample the image one Z-block of the output extent at a time and write each block as it is done
+    # @params:
+    #     resliceFilter  - Required  : the vtkImageReslice (connected to a reader)
+    #     outputFileName - Required  : the output image, .nii, .mha, or .mhd (Str)
+    #     maxMemory      - Required  : memory budget for one block in bytes (Int)
+    #     callback       - Optional  : called as callback(slicesDone, totalSlices) after each block (Function)
+    # @returns:
+    #     the number of output slices per block
+    #
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    reader = resliceFilter.GetInputAlgorithm()
+    streaming = can_stream(reader)
+
+    outInfo = image_information(resliceFilter)
+    extent = outInfo["extent"]
+    depth = block_depth(resliceFilter, maxMemory, streaming)
+    writer = None
+
+    # Read the whole input once. Later (smaller) requests from the reslice filter do not re-execute the reader.
+    if not streaming:
+        with profile_stage("read"):
+            reader.Update()
+
+    try:
+        for z0 in range(extent[4], extent[5] + 1, depth):
+            z1 = min(z0 + depth - 1, extent[5])
+
+            with profile_stage("reslice", z0=z0):
+                resliceFilter.UpdateExtent( (extent[0], extent[1], extent[2], extent[3], z0, z1) )
+            block = resliceFilter.GetOutput()
+
+            # The output can be larger than requested, only keep the requested extent
+            blockExtent = block.GetExtent()
+            blockDims = dimensions(blockExtent)
+            ncomp = block.GetNumberOfScalarComponents()
+
+            voxels = vtk_to_numpy( block.GetPointData().GetScalars() )
+            voxels = voxels.reshape( blockDims[2], blockDims[1], blockDims[0], ncomp )
+            voxels = voxels[ z0 - blockExtent[4] : z1 - blockExtent[4] + 1,
+                             extent[2] - blockExtent[2] : extent[3] - blockExtent[2] + 1,
+                             extent[0] - blockExtent[0] : extent[1] - blockExtent[0] + 1 ]
+
+            if writer is None:
+                writer = RawSlabWriter( outputFileName, output_geometry(outputFileName, outInfo), voxels.dtype, ncomp )
+
+            with profile_stage("write", z0=z0):
+                writer.write( z0 - extent[4], voxels )
+            del block, voxels
+
+            if callback is not None:
+                callback( z1 - extent[4] + 1, extent[5] - extent[4] + 1 )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return depth
+
+
+def sitk_read(inputPath, fileNames=None):
+    #
+    # Read a NIfTI or MHA file, or a DICOM series of a directory (fileNames, default: the first series), with SimpleITK
+    #
+    if os.path.isdir(inputPath):
+        from util.dicom_series import open_series
+
+        if fileNames is None:
+            fileNames = open_series(inputPath, verbose=False).files
+
+        reader = sitk.ImageSeriesReader()
+        reader.SetFileNames(fileNames)
+        return reader.Execute()
+
+    return sitk.ReadImage(inputPath)
+
+
+def sitk_output_geometry(image, spacing):
+    #
+    # Geometry of image resampled to spacing: same origin and direction, the size covers the same extent
+    #
+    size = [ max( 1, int( round( image.GetSize()[i] * image.GetSpacing()[i] / float(spacing[i]) ) ) ) for i in range(3) ]
+    return Geometry( tuple(size), tuple( float(v) for v in spacing ), image.GetOrigin(), image.GetDirection() )
+
+
+def reference_geometry(referencePath, spacing=None):
+    #
+    # Geometry of a reference image (file or DICOM directory), read from the header(s) only.
+    # With spacing, the reference extent is covered with that spacing instead.
+    #
+    if os.path.isdir(referencePath):
+        from util.dicom_index import index_directory
+
+        index = index_directory(referencePath)
+        if len(index.series_uids()) == 0:
+            raise ValueError("No DICOM series found in: " + referencePath)
+
+        reference = DicomSlabSource( index.files( index.series_uids()[0] ) )
+        size, referenceSpacing, origin, direction = reference.size, reference.spacing, reference.origin, reference.direction
+    else:
+        reader = sitk.ImageFileReader()
+        reader.SetFileName(referencePath)
+        reader.ReadImageInformation()
+
+        if reader.GetDimension() != 3:
+            raise ValueError("The reference image must be 3D: " + referencePath)
+
+        size, referenceSpacing, origin, direction = reader.GetSize(), reader.GetSpacing(), reader.GetOrigin(), reader.GetDirection()
+
+    if spacing is not None:
+        size = [ max( 1, int( round( size[i] * referenceSpacing[i] / float(spacing[i]) ) ) ) for i in range(3) ]
+        referenceSpacing = spacing
+
+    return Geometry( tuple( int(v) for v in size ), tuple( float(v) for v in referenceSpacing ), tuple(origin), tuple(direction) )
+
+
+def sitk_resampler(geometry, interpolator="bspline", threads=None):
+    #
+    # Set up a ResampleImageFilter for an output geometry. The filter can be reused for many images
+    # (resample_sitk sets the size and origin of each block).
+    #
+    if interpolator == "cubic":
+        raise ValueError("cubic (cubic convolution) is not available with the sitk backend, use bspline (cubic B-spline) or the vtk backend")
+    if interpolator not in SITK_INTERPOLATORS:
+        raise ValueError("Unknown interpolator: " + str(interpolator) + " (choose from: " + ", ".join(BACKEND_INTERPOLATORS["sitk"]) + ")")
+
+    resampler = sitk.ResampleImageFilter()
+    resampler.SetOutputSpacing( geometry.spacing )
+    resampler.SetOutputDirection( geometry.direction )
+    resampler.SetInterpolator( SITK_INTERPOLATORS[interpolator] )
+
+    if threads is not None:
+        set_threads(threads)
+        resampler.SetNumberOfThreads(threads)
+
+    return resampler
+
+
+def resample_sitk(image, geometry, interpolator="bspline", threads=None, z0=0, nz=None, resampler=None):
+    #
+    # Resample image onto geometry (or onto slices z0 .. z0+nz-1 of it) with SimpleITK's ResampleImageFilter.
+    # Pass a resampler from sitk_resampler() to reuse it (interpolator and threads are then ignored).
+    #
+    if resampler is None:
+        resampler = sitk_resampler(geometry, interpolator, threads)
+
+    if nz is None:
+        nz = geometry.size[2] - z0
+
+    # Origin of the first slice of the block
+    offset = z0 * geometry.spacing[2]
+    origin = [ geometry.origin[row] + geometry.direction[row*3 + 2] * offset for row in range(3) ]
+
+    resampler.SetSize( (geometry.size[0], geometry.size[1], nz) )
+    resampler.SetOutputOrigin( origin )
+    resampler.SetOutputPixelType( image.GetPixelID() )
+
+    return resampler.Execute(image)
+
+
+def resample_to_grid(image, geometry, outputFileName, resampler, maxMemory=None, callback=None):
+    #
+    # Resample a SimpleITK image onto geometry and write it. With maxMemory the output is computed and
+    # written one Z-block at a time (see resample_tiled). The input is in memory already, so the budget
+    # covers the output blocks only.
+    # @params:
+    #     image          - Required  : the input image (SimpleITK image)
+    #     geometry       - Required  : the output grid (Geometry)
+    #     outputFileName - Required  : the output image (Str)
+    #     resampler      - Required  : a filter from sitk_resampler()
+    #     maxMemory      - Optional  : memory budget for one output block in bytes (Int)
+    #     callback       - Optional  : called as callback(slicesDone, totalSlices) after each block (Function)
+    # @returns:
+    #     the number of output slices per block
+    #
+    if maxMemory is None:
+        with profile_stage("reslice"):
+            output = resample_sitk( image, geometry, resampler=resampler )
+
+        with profile_stage("write", file=outputFileName):
+            sitk.WriteImage( output, str(outputFileName) )
+        return geometry.size[2]
+
+    ncomp = image.GetNumberOfComponentsPerPixel()
+    sliceBytes = geometry.size[0] * geometry.size[1] * ncomp * sitk.GetArrayViewFromImage(image).itemsize
+    depth = max( 1, min( geometry.size[2], int( maxMemory // sliceBytes ) ) )
+
+    writer = RawSlabWriter( outputFileName, geometry, sitk.GetArrayViewFromImage(image).dtype, ncomp )
+
+    try:
+        for z0 in range(0, geometry.size[2], depth):
+            nz = min(depth, geometry.size[2] - z0)
+
+            with profile_stage("reslice", z0=z0):
+                block = resample_sitk( image, geometry, z0=z0, nz=nz, resampler=resampler )
+
+            with profile_stage("write", z0=z0):
+                writer.write( z0, block )
+            del block
+
+            if callback is not None:
+                callback( z0 + nz, geometry.size[2] )
+    finally:
+        writer.close()
+
+    return depth
+
+
+def resample_sitk_whole(image, spacing, outputFileName, interpolator="bspline", threads=None):
+    #
+    # Resample a SimpleITK image in one go and write it with SimpleITK
+    #
+    geometry = sitk_output_geometry(image, spacing)
+    resample_to_grid( image, geometry, outputFileName, sitk_resampler(geometry, interpolator, threads) )
+
+
+def resample_sitk_tiled(image, spacing, outputFileName, maxMemory, interpolator="bspline", threads=None, callback=None):
+    #
+    # Resample a SimpleITK image one Z-block of the output at a time (see resample_to_grid)
+    # @returns:
+    #     the number of output slices per block
+    #
+    geometry = sitk_output_geometry(image, spacing)
+    return resample_to_grid( image, geometry, outputFileName, sitk_resampler(geometry, interpolator, threads), maxMemory, callback )
@@ -0,0 +1,178 @@
+#-----------------------------------------------------
+# roi.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Region of interest (crop-on-read) support for the scripts. The
+#              region is pushed down into the readers, so only the voxels in the
+#              region are read from disk (where the file format allows it).
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.roi import add_roi_arguments, read_sitk_roi, extract_vtk
+#
+#   add_roi_arguments(parser)                                  # --roi x0 x1 y0 y1 z0 z1 and --roi-mm
+#   image = read_sitk_roi(INPUT_IMAGE, args.roi, args.roi_mm)  # SimpleITK image of the region
+#   voi = extract_vtk(reader, args.roi, args.roi_mm)           # VTK algorithm producing the region
+#
+# Notes:
+#   -The region is given like a VTK extent: x0 x1 y0 y1 z0 z1, inclusive voxel indices. With --roi-mm
+#    the values are physical coordinates in mm and the region is the voxels whose centres are inside
+#    the box. The region is clipped to the image.
+#   -SimpleITK: files are read with ImageFileReader.SetExtractIndex/SetExtractSize (streamed from disk
+#    for uncompressed MHA/MHD and NIfTI), DICOM series only read the files of the slices in the region,
+#    and AIM files are memory-mapped (util/lazy_volume.py). Physical coordinates use the SimpleITK
+#    geometry (LPS, with the direction cosines).
+#   -VTK: a vtkExtractVOI is put after the reader (the output extent starts at 0, with the origin moved).
+#    Indices and mm are in the VTK image as the VTK reader produces it (e.g. vtkDICOMImageReader
+#    flips the rows and the NIfTI reader ignores the qform origin).
+#    Readers that cannot read part of an image (see util.resampling.can_stream) read the whole image once.
+#-----------------------------------------------------
+
+import os
+import math
+
+ROI_HELP = "Region of interest: x0 x1 y0 y1 z0 z1 (inclusive voxel indices, or mm with --roi-mm)"
+
+
+def add_roi_arguments(parser):
+    #
+    # Add --roi and --roi-mm to an argparse parser
+    #
+    parser.add_argument("--roi", type=float, nargs=6, default=None, metavar=("X0", "X1", "Y0", "Y1", "Z0", "Z1"), help=ROI_HELP)
+    parser.add_argument("--roi-mm", action="store_true", help="The --roi values are physical coordinates (mm), not voxel indices")
+
+
+def roi_region(roi, size, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), direction=(1,0,0, 0,1,0, 0,0,1), physical=False):
+    #
+    # Index and size (x, y, z) of a region of interest in an image, clipped to the image
+    # @params:
+    #     roi       - Required  : x0 x1 y0 y1 z0 z1 (List)
+    #     size      - Required  : image dimensions (x, y, z)
+    #     physical  - Optional  : roi is in mm, otherwise voxel indices (Bool)
+    # @returns:
+    #     (index, size) lists, raises a ValueError if the region does not overlap the image
+    #
+    if physical:
+        # Continuous index of all 8 corners of the box, the region is the bounding box of the corners
+        corners = []
+        for x in roi[0:2]:
+            for y in roi[2:4]:
+                for z in roi[4:6]:
+                    point = [ x - origin[0], y - origin[1], z - origin[2] ]
+                    # The direction matrix is orthonormal, so its inverse is its transpose
+                    corners.append( [ sum( direction[row*3 + column] * point[row] for row in range(3) ) / spacing[column] for column in range(3) ] )
+
+        low = [ int( math.ceil( min( corner[i] for corner in corners ) - 1e-6 ) ) for i in range(3) ]
+        high = [ int( math.floor( max( corner[i] for corner in corners ) + 1e-6 ) ) for i in range(3) ]
+    else:
+        low = [ int( round( min(roi[2*i], roi[2*i + 1]) ) ) for i in range(3) ]
+        high = [ int( round( max(roi[2*i], roi[2*i + 1]) ) ) for i in range(3) ]
+
+    low = [ max(0, low[i]) for i in range(3) ]
+    high = [ min(size[i] - 1, high[i]) for i in range(3) ]
+
+    if any( high[i] < low[i] for i in range(3) ):
+        raise ValueError("The region of interest " + str( list(roi) ) + " is outside the image")
+
+    return ( low, [ high[i] - low[i] + 1 for i in range(3) ] )
+
+
+def read_sitk_roi(inputPath, roi, physical=False, fileNames=None):
+    #
+    # Read only the region of interest of an image with SimpleITK
+    # @params:
+    #     inputPath  - Required  : image file or DICOM directory (Str)
+    #     roi        - Required  : x0 x1 y0 y1 z0 z1 (List)
+    #     physical   - Optional  : roi is in mm (Bool)
+    #     fileNames  - Optional  : sorted files of the DICOM series (default: first series of the directory)
+    # @returns:
+    #     A SimpleITK image of the region (with its origin)
+    #
+    import SimpleITK as sitk
+
+    if os.path.isdir(inputPath):
+        from util.slab_io import DicomSlabSource
+
+        if fileNames is None:
+            from util.dicom_index import index_directory
+
+            index = index_directory(inputPath)
+            if len(index.series_uids()) == 0:
+                raise ValueError("No DICOM series found in: " + inputPath)
+            fileNames = index.files( index.series_uids()[0] )
+
+        source = DicomSlabSource(fileNames)
+        index, size = roi_region( roi, source.size, source.spacing, source.origin, source.direction, physical )
+
+        # Only read the slices in the region, then crop the rows and columns
+        image = sitk.RegionOfInterest( source.read( index[2], size[2] ), size, [index[0], index[1], 0] )
+
+        # Place the region in the geometry of the whole series, so it is the same as cropping the whole series
+        image.SetSpacing(source.spacing)
+        image.SetDirection(source.direction)
+        image.SetOrigin( tuple( source.origin[row] + sum( source.direction[row*3 + column] * index[column] * source.spacing[column] for column in range(3) )
+                                for row in range(3) ) )
+        return image
+
+    if os.path.splitext(inputPath)[1].lower() == ".aim":
+        from util.lazy_volume import LazyVolume
+
+        volume = LazyVolume(inputPath)
+        index, size = roi_region( roi, volume.size, volume.spacing, volume.origin, volume.direction, physical )
+        return volume.roi_image(index, size)
+
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(inputPath)
+    reader.ReadImageInformation()
+
+    if reader.GetDimension() != 3:
+        raise ValueError("A region of interest needs a 3D image: " + inputPath)
+
+    index, size = roi_region( roi, reader.GetSize(), reader.GetSpacing(), reader.GetOrigin(), reader.GetDirection(), physical )
+
+    reader.SetExtractIndex(index)
+    reader.SetExtractSize(size)
+    return reader.Execute()
+
+
+def extract_vtk(reader, roi, physical=False):
+    #
+    # Put a vtkExtractVOI for the region of interest after a VTK reader (nothing is executed yet,
+    # except for readers that cannot stream, which read the whole image once)
+    # @returns:
+    #     The last filter (use it in place of the reader), its output extent starts at 0
+    #
+    import vtk
+
+    from util.resampling import image_information, can_stream, dimensions
+
+    info = image_information(reader)
+    extent = info["extent"]
+
+    # VTK images can have an extent that does not start at 0: the region is relative to the first voxel
+    first = [ extent[0], extent[2], extent[4] ]
+    direction = info["direction"]
+    origin = [ info["origin"][row] + sum( direction[row*3 + column] * first[column] * info["spacing"][column] for column in range(3) ) for row in range(3) ]
+
+    index, size = roi_region( roi, dimensions(extent), info["spacing"], origin, direction, physical )
+
+    voi = vtk.vtkExtractVOI()
+    voi.SetInputConnection( reader.GetOutputPort() )
+    voi.SetVOI( first[0] + index[0], first[0] + index[0] + size[0] - 1,
+                first[1] + index[1], first[1] + index[1] + size[1] - 1,
+                first[2] + index[2], first[2] + index[2] + size[2] - 1 )
+
+    # The VTK writers assume the extent starts at 0: start the region's extent at 0 and move its origin instead
+    start = [ first[i] + index[i] for i in range(3) ]
+
+    change = vtk.vtkImageChangeInformation()
+    change.SetInputConnection( voi.GetOutputPort() )
+    change.SetOutputExtentStart(0, 0, 0)
+    change.SetOutputOrigin( [ info["origin"][row] + sum( direction[row*3 + column] * start[column] * info["spacing"][column] for column in range(3) ) for row in range(3) ] )
+
+    if not can_stream(reader):
+        reader.Update()
+
+    return change
@@ -6,51 +6,94 @@
 #
 # Description: Converts between SimpleITK and VTK image types
 #-----------------------------------------------------
-import vtk
-from vtk.util.numpy_support import vtk_to_numpy
-
+#
+# Notes:
+#   -sitk2vtk does not copy the voxel data. The VTK image uses the SimpleITK image's
+#    buffer directly and keeps a reference to the SimpleITK image so the buffer stays
+#    valid for as long as the VTK image exists. Changing the voxels of one image
+#    changes the other.
+#   -vtk2sitk makes exactly one copy (SimpleITK images always own their buffer).
+#   -Origin, spacing, and direction are carried over in both directions. VTK 9 stores
+#    the direction in the image itself. Older versions of VTK don't have a direction,
+#    so it is stored as a field data array named "Direction" instead.
+#   -VTK is only imported when an image is converted, so LazyImage can be used for
+#    SimpleITK-only conversions without loading VTK.
+#-----------------------------------------------------
 import SimpleITK as sitk
 
+from util.profiling import profile_stage
+
+# VTK scalar types (the values of vtk.VTK_CHAR, ... from vtkType.h), so VTK does not have to be imported for them
+VTK_CHAR, VTK_UNSIGNED_CHAR, VTK_SHORT, VTK_UNSIGNED_SHORT = 2, 3, 4, 5
+VTK_INT, VTK_UNSIGNED_INT, VTK_LONG, VTK_UNSIGNED_LONG = 6, 7, 8, 9
+VTK_FLOAT, VTK_DOUBLE = 10, 11
+
 # dictionary to convert SimpleITK pixel types to VTK
-pixelmap = { sitk.sitkUInt8:   vtk.VTK_UNSIGNED_CHAR,  sitk.sitkInt8:    vtk.VTK_CHAR,
-             sitk.sitkUInt16:  vtk.VTK_UNSIGNED_SHORT, sitk.sitkInt16:   vtk.VTK_SHORT,
-             sitk.sitkUInt32:  vtk.VTK_UNSIGNED_INT,   sitk.sitkInt32:   vtk.VTK_INT,
-             sitk.sitkUInt64:  vtk.VTK_UNSIGNED_LONG,  sitk.sitkInt64:   vtk.VTK_LONG,
-             sitk.sitkFloat32: vtk.VTK_FLOAT,          sitk.sitkFloat64: vtk.VTK_DOUBLE,
+pixelmap = { sitk.sitkUInt8:   VTK_UNSIGNED_CHAR,  sitk.sitkInt8:    VTK_CHAR,
+             sitk.sitkUInt16:  VTK_UNSIGNED_SHORT, sitk.sitkInt16:   VTK_SHORT,
+             sitk.sitkUInt32:  VTK_UNSIGNED_INT,   sitk.sitkInt32:   VTK_INT,
+             sitk.sitkUInt64:  VTK_UNSIGNED_LONG,  sitk.sitkInt64:   VTK_LONG,
+             sitk.sitkFloat32: VTK_FLOAT,          sitk.sitkFloat64: VTK_DOUBLE,
  
-             sitk.sitkVectorUInt8:   vtk.VTK_UNSIGNED_CHAR,  sitk.sitkVectorInt8:    vtk.VTK_CHAR,
-             sitk.sitkVectorUInt16:  vtk.VTK_UNSIGNED_SHORT, sitk.sitkVectorInt16:   vtk.VTK_SHORT,
-             sitk.sitkVectorUInt32:  vtk.VTK_UNSIGNED_INT,   sitk.sitkVectorInt32:   vtk.VTK_INT,
-             sitk.sitkVectorUInt64:  vtk.VTK_UNSIGNED_LONG,  sitk.sitkVectorInt64:   vtk.VTK_LONG,
-             sitk.sitkVectorFloat32: vtk.VTK_FLOAT,          sitk.sitkVectorFloat64: vtk.VTK_DOUBLE,
+             sitk.sitkVectorUInt8:   VTK_UNSIGNED_CHAR,  sitk.sitkVectorInt8:    VTK_CHAR,
+             sitk.sitkVectorUInt16:  VTK_UNSIGNED_SHORT, sitk.sitkVectorInt16:   VTK_SHORT,
+             sitk.sitkVectorUInt32:  VTK_UNSIGNED_INT,   sitk.sitkVectorInt32:   VTK_INT,
+             sitk.sitkVectorUInt64:  VTK_UNSIGNED_LONG,  sitk.sitkVectorInt64:   VTK_LONG,
+             sitk.sitkVectorFloat32: VTK_FLOAT,          sitk.sitkVectorFloat64: VTK_DOUBLE,
  
-             sitk.sitkLabelUInt8:  vtk.VTK_UNSIGNED_CHAR,
-             sitk.sitkLabelUInt16: vtk.VTK_UNSIGNED_SHORT,
-             sitk.sitkLabelUInt32: vtk.VTK_UNSIGNED_INT,
-             sitk.sitkLabelUInt64: vtk.VTK_UNSIGNED_LONG
+             sitk.sitkLabelUInt8:  VTK_UNSIGNED_CHAR,
+             sitk.sitkLabelUInt16: VTK_UNSIGNED_SHORT,
+             sitk.sitkLabelUInt32: VTK_UNSIGNED_INT,
+             sitk.sitkLabelUInt64: VTK_UNSIGNED_LONG
             }
 
 
-def sitk2vtk(img, outVol=None):
-    size = list(img.GetSize())
-    origin = list(img.GetOrigin())
-    spacing = list(img.GetSpacing())
-    sitktype = img.GetPixelID()
-    vtktype = pixelmap[sitktype]
-    ncomp = img.GetNumberOfComponentsPerPixel()
+def _set_direction(vtk_image, direction):
+    # Store the 3x3 direction (row-major) on the VTK image
+    if hasattr(vtk_image, "SetDirectionMatrix"):
+        vtk_image.SetDirectionMatrix(direction)
+    else:
+        import vtk
 
-    # convert the SimpleITK image to a numpy array
-    i2 = sitk.GetArrayFromImage(img)
-    i2_string = i2.tostring()
+        directionArray = vtk.vtkDoubleArray()
+        directionArray.SetName("Direction")
+        for value in direction:
+            directionArray.InsertNextValue(value)
+        vtk_image.GetFieldData().AddArray(directionArray)
 
-    # send the numpy array to VTK with a vtkImageImport object
-    dataImporter = vtk.vtkImageImport()
 
-    dataImporter.CopyImportVoidPointer(i2_string, len(i2_string))
+def _get_direction(vtk_image):
+    # Get the 3x3 direction (row-major) of a VTK image, identity if it has none
+    directionArray = vtk_image.GetFieldData().GetArray("Direction")
 
-    dataImporter.SetDataScalarType(vtktype)
+    if directionArray is not None and directionArray.GetNumberOfTuples() == 9:
+        return tuple( directionArray.GetValue(i) for i in range(9) )
 
-    dataImporter.SetNumberOfScalarComponents(ncomp)
+    if hasattr(vtk_image, "GetDirectionMatrix"):
+        matrix = vtk_image.GetDirectionMatrix()
+        return tuple( matrix.GetElement(i, j) for i in range(3) for j in range(3) )
+
+    return (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+
+
+def sitk2vtk(img, outVol=None):
+    # Import VTK before the "sitk2vtk" stage starts, so a profile times the conversion and not the import
+    import vtk
+    import vtk.util.numpy_support
+
+    return _sitk2vtk(img, outVol)
+
+
+@profile_stage("sitk2vtk")
+def _sitk2vtk(img, outVol=None):
+    import vtk
+    from vtk.util.numpy_support import numpy_to_vtk
+
+    size = list(img.GetSize())
+    origin = list(img.GetOrigin())
+    spacing = list(img.GetSpacing())
+    direction = list(img.GetDirection())
+    ncomp = img.GetNumberOfComponentsPerPixel()
 
     # VTK expects 3-dimensional parameters
     if len(size) == 2:
@@ -62,16 +105,31 @@ def sitk2vtk(img, outVol=None):
     if len(spacing) == 2:
         spacing.append(spacing[0])
 
-    # Set the new VTK image's parameters
-    dataImporter.SetDataExtent(0, size[0]-1, 0, size[1]-1, 0, size[2]-1)
-    dataImporter.SetWholeExtent(0, size[0]-1, 0, size[1]-1, 0, size[2]-1)
+    if len(direction) == 4:
+        direction = [direction[0], direction[1], 0.0, direction[2], direction[3], 0.0, 0.0, 0.0, 1.0]
+
+    # Get a view of the SimpleITK buffer (z, y, x[, components]) as a numpy array (no copy)
+    i2 = sitk.GetArrayViewFromImage(img)
 
-    dataImporter.SetDataOrigin(origin)
-    dataImporter.SetDataSpacing(spacing)
+    if ncomp > 1:
+        i2 = i2.reshape(-1, ncomp)
+    else:
+        i2 = i2.reshape(-1)
 
-    dataImporter.Update()
+    # Wrap the same buffer in a VTK array (no copy)
+    vtk_array = numpy_to_vtk(i2, deep=False)
 
-    vtk_image = dataImporter.GetOutput()
+    # numpy_to_vtk keeps the numpy view alive, but the view does not keep the SimpleITK
+    # image alive. Pin the image to the VTK array so the buffer outlives the caller's reference.
+    vtk_array._sitk_image = img
+
+    # Set the new VTK image's parameters
+    vtk_image = vtk.vtkImageData()
+    vtk_image.SetDimensions(size)
+    vtk_image.SetOrigin(origin)
+    vtk_image.SetSpacing(spacing)
+    _set_direction(vtk_image, direction)
+    vtk_image.GetPointData().SetScalars(vtk_array)
 
     # outVol and this DeepCopy are a work-around to avoid a crash on Windows
     if outVol is not None:
@@ -80,13 +138,53 @@ def sitk2vtk(img, outVol=None):
     return vtk_image
 
 
+@profile_stage("vtk2sitk")
 def vtk2sitk(img):
+    from vtk.util.numpy_support import vtk_to_numpy
+
     vtk_data = img.GetPointData().GetScalars()
-    numpy_data = vtk_to_numpy(vtk_data)
+    ncomp = vtk_data.GetNumberOfComponents()
     dims = img.GetDimensions()
-    numpy_data = numpy_data.reshape(dims[2], dims[1], dims[0])
-    numpy_data = numpy_data.transpose(2, 1, 0)
 
-    sitk_image = sitk.GetImageFromArray(numpy_data)
+    # VTK stores voxels with x varying fastest, which is exactly a C-ordered (z, y, x) numpy array.
+    # Reshaping the view (no copy) is all that is needed before SimpleITK copies it into its own buffer.
+    numpy_data = vtk_to_numpy(vtk_data)
+
+    if ncomp > 1:
+        numpy_data = numpy_data.reshape(dims[2], dims[1], dims[0], ncomp)
+    else:
+        numpy_data = numpy_data.reshape(dims[2], dims[1], dims[0])
+
+    sitk_image = sitk.GetImageFromArray(numpy_data, isVector=(ncomp > 1))
+
+    sitk_image.SetOrigin(img.GetOrigin())
+    sitk_image.SetSpacing(img.GetSpacing())
+    sitk_image.SetDirection(_get_direction(img))
+
+    return sitk_image
+
+
+class LazyImage(object):
+    #
+    # Holds an image as a SimpleITK image, a VTK image, or both. The image is stored in
+    # whichever toolkit read it, and only converted to the other toolkit (once) when the
+    # writer asks for it.
+    #
+    def __init__(self, sitk_image=None, vtk_image=None):
+        if sitk_image is None and vtk_image is None:
+            raise ValueError("LazyImage needs a SimpleITK or a VTK image")
+
+        self._sitk_image = sitk_image
+        self._vtk_image = vtk_image
+
+    @property
+    def sitk_image(self):
+        if self._sitk_image is None:
+            self._sitk_image = vtk2sitk(self._vtk_image)
+        return self._sitk_image
 
-    return sitk_image
\ No newline at end of file
+    @property
+    def vtk_image(self):
+        if self._vtk_image is None:
+            self._vtk_image = sitk2vtk(self._sitk_image)
+        return self._vtk_image
@@ -0,0 +1,227 @@
+#-----------------------------------------------------
+# slab_io.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Streaming (slab by slab) image conversion. The input is read
+#              and the output is written a few slices (a Z-slab) at a time,
+#              so peak memory depends on the slab size, not the volume size.
+#-----------------------------------------------------
+#
+# Usage:
+#   from util.slab_io import convert_slabs
+#
+#   convert_slabs(INPUT_IMAGE, OUTPUT_IMAGE, slabSize=64)
+#
+# Notes:
+#   -Supported inputs:  uncompressed MHA/MHD, uncompressed NIfTI (.nii), DICOM series (directory)
+#   -Supported outputs: MHA, MHD/RAW, NIfTI (.nii), DICOM series (.dcm)
+#   -MHA/MHD and NIfTI inputs are read with ImageFileReader.SetExtractIndex/SetExtractSize,
+#    which only reads the requested slices from disk for uncompressed files.
+#   -DICOM series inputs are read a few files at a time with ImageSeriesReader.
+#   -MHA/MHD and NIfTI outputs are written as a header (see util/volume_headers.py)
+#    followed by the raw voxels of each slab.
+#-----------------------------------------------------
+
+import os
+import time
+import collections
+
+import SimpleITK as sitk
+
+from util.img2dicom import img2dicom
+from util.volume_headers import meta_header, nifti_header
+from util.profiling import profile_stage
+
+STREAM_INPUTS = [".mha", ".mhd", ".nii"]
+STREAM_OUTPUTS = [".mha", ".mhd", ".raw", ".nii", ".dcm"]
+
+# Geometry of an output image for writers that are not fed from a slab source
+Geometry = collections.namedtuple("Geometry", ["size", "spacing", "origin", "direction"])
+
+
+def _meta_is_compressed(fileName):
+    # Check the CompressedData field of a MetaImage header
+    with open(fileName, "rb") as metaFile:
+        for line in metaFile:
+            key, _, value = line.decode("latin-1").partition("=")
+            key = key.strip()
+
+            if key == "CompressedData":
+                return value.strip().lower() == "true"
+            if key == "ElementDataFile":
+                break
+
+    return False
+
+
+class FileSlabSource(object):
+    #
+    # Reads Z-slabs of an uncompressed MHA/MHD/NIfTI image
+    #
+    def __init__(self, fileName):
+        extension = os.path.splitext(fileName)[1].lower()
+
+        if extension not in STREAM_INPUTS:
+            raise ValueError("Streaming is not supported for input: " + fileName)
+        if extension in [".mha", ".mhd"] and _meta_is_compressed(fileName):
+            raise ValueError("Streaming is not supported for compressed MetaImage files: " + fileName)
+
+        self.reader = sitk.ImageFileReader()
+        self.reader.SetFileName(fileName)
+        self.reader.ReadImageInformation()
+
+        if self.reader.GetDimension() != 3:
+            raise ValueError("Streaming requires a 3D image: " + fileName)
+
+        self.size = self.reader.GetSize()
+        self.spacing = self.reader.GetSpacing()
+        self.origin = self.reader.GetOrigin()
+        self.direction = self.reader.GetDirection()
+
+    def read(self, z0, nz):
+        self.reader.SetExtractIndex( [0, 0, z0] )
+        self.reader.SetExtractSize( [self.size[0], self.size[1], nz] )
+        return self.reader.Execute()
+
+
+class DicomSlabSource(object):
+    #
+    # Reads Z-slabs of a DICOM series (the files must be sorted by slice position)
+    #
+    def __init__(self, fileNames):
+        self.fileNames = list(fileNames)
+
+        # Read the first two slices to get the geometry (the slice spacing needs two slices)
+        first = self._read_files( self.fileNames[0:2] )
+
+        self.size = ( first.GetSize()[0], first.GetSize()[1], len(self.fileNames) )
+        self.spacing = first.GetSpacing()
+        self.origin = first.GetOrigin()
+        self.direction = first.GetDirection()
+
+    def _read_files(self, fileNames):
+        reader = sitk.ImageSeriesReader()
+        reader.SetFileNames(fileNames)
+        image = reader.Execute()
+
+        if image.GetDimension() == 2:
+            image = sitk.JoinSeries( [image] )
+
+        return image
+
+    def read(self, z0, nz):
+        return self._read_files( self.fileNames[z0:z0 + nz] )
+
+
+class RawSlabWriter(object):
+    #
+    # Writes an MHA, MHD/RAW, or NIfTI file slab by slab. source is anything with the
+    # size, spacing, origin, and direction of the output (a slab source or a Geometry).
+    #
+    def __init__(self, fileName, source, pixelType, ncomp):
+        extension = os.path.splitext(fileName)[1].lower()
+
+        if extension == ".nii":
+            if ncomp > 1:
+                raise ValueError("Streaming NIfTI output only supports scalar images")
+
+            self.dataFile = open(fileName, "wb")
+            self.dataFile.write( nifti_header(source.size, source.spacing, source.origin, source.direction, pixelType) )
+
+        elif extension == ".mha":
+            self.dataFile = open(fileName, "wb")
+            self.dataFile.write( meta_header(source.size, source.spacing, source.origin, source.direction, pixelType, ncomp).encode("latin-1") )
+
+        else:
+            # Detached header (.mhd) + raw data (.raw)
+            baseName = os.path.splitext(fileName)[0]
+            header = meta_header( source.size, source.spacing, source.origin, source.direction,
+                                  pixelType, ncomp, os.path.basename(baseName + ".raw") )
+
+            with open(baseName + ".mhd", "w") as headerFile:
+                headerFile.write(header)
+
+            self.dataFile = open(baseName + ".raw", "wb")
+
+    def write(self, z0, slab):
+        # Voxels are written little-endian, x fastest, straight from the SimpleITK buffer.
+        # slab can also be a numpy array ordered (z, y, x[, components]).
+        if isinstance(slab, sitk.Image):
+            voxels = sitk.GetArrayViewFromImage(slab)
+        else:
+            voxels = slab
+        voxels = voxels.astype( voxels.dtype.newbyteorder("<"), copy=False )
+        self.dataFile.write( voxels.reshape(-1).data )
+
+    def close(self):
+        self.dataFile.close()
+
+
+class DicomSlabWriter(object):
+    #
+    # Writes a DICOM series slab by slab (all slabs share one series UID)
+    #
+    def __init__(self, outDirectory, compression=None):
+        self.outDirectory = outDirectory
+        self.compression = compression
+        self.timestamp = time.time()
+
+    def write(self, z0, slab):
+        img2dicom(slab, self.outDirectory, startIndex=z0, timestamp=self.timestamp, compression=self.compression)
+
+    def close(self):
+        pass
+
+
+def open_slab_source(inputImage, fileNames=None):
+    #
+    # Open a streaming source for a file, or for a DICOM series (directory + sorted fileNames)
+    #
+    if os.path.isdir(inputImage):
+        return DicomSlabSource(fileNames)
+    return FileSlabSource(inputImage)
+
+
+def convert_slabs(source, outputImage, slabSize, callback=None, compression=None):
+    #
+    # Convert an image slab by slab
+    # @params:
+    #     source      - Required  : a FileSlabSource or DicomSlabSource
+    #     outputImage - Required  : the output image (path + filename) (Str)
+    #     slabSize    - Required  : number of slices per slab (Int)
+    #     callback    - Optional  : called as callback(slicesDone, totalSlices) after each slab (Function)
+    #     compression - Optional  : lossless compression for DICOM output (see util/dicom_codecs.py) (Str)
+    #
+    extension = os.path.splitext(outputImage)[1].lower()
+
+    if extension not in STREAM_OUTPUTS:
+        raise ValueError("Streaming is not supported for output: " + outputImage)
+
+    slabSize = max(1, int(slabSize))
+    depth = source.size[2]
+    writer = None
+
+    try:
+        for z0 in range(0, depth, slabSize):
+            with profile_stage("read", z0=z0):
+                slab = source.read( z0, min(slabSize, depth - z0) )
+
+            # The pixel type is only known once the first slab has been read
+            if writer is None:
+                if extension == ".dcm":
+                    writer = DicomSlabWriter( os.path.dirname(outputImage), compression )
+                else:
+                    pixelType = sitk.GetArrayViewFromImage(slab).dtype
+                    writer = RawSlabWriter( outputImage, source, pixelType, slab.GetNumberOfComponentsPerPixel() )
+
+            with profile_stage("write", z0=z0):
+                writer.write(z0, slab)
+            del slab
+
+            if callback is not None:
+                callback( min(z0 + slabSize, depth), depth )
+    finally:
+        if writer is not None:
+            writer.close()
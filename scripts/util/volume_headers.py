@@ -0,0 +1,344 @@
+#-----------------------------------------------------
+# volume_headers.py
+#
+# Created by:   Michael Kuczynski
+# Created on:   2026.10.17
+#
+# Description: Builds MetaImage (MHA/MHD) and NIfTI-1 headers for
+#              uncompressed volumes, so voxel data can be written in
+#              pieces after the header (see util/slab_io.py).
+#-----------------------------------------------------
+#
+# Notes:
+#   -Geometry is given the SimpleITK/ITK way: origin, spacing, and a row-major 3x3
+#    direction matrix in LPS coordinates. The headers are written the same way
+#    SimpleITK writes them, so the output reads back identically in SimpleITK.
+#   -NIfTI uses RAS coordinates, so the first two rows of the affine are negated.
+#-----------------------------------------------------
+
+import math
+import struct
+
+import numpy as np
+
+# numpy type -> MetaImage element type
+META_TYPES = { "int8":    "MET_CHAR",   "uint8":   "MET_UCHAR",
+               "int16":   "MET_SHORT",  "uint16":  "MET_USHORT",
+               "int32":   "MET_INT",    "uint32":  "MET_UINT",
+               "int64":   "MET_LONG_LONG", "uint64": "MET_ULONG_LONG",
+               "float32": "MET_FLOAT",  "float64": "MET_DOUBLE" }
+
+# numpy type -> NIfTI-1 datatype code
+NIFTI_TYPES = { "uint8":   2,    "int16":   4,    "int32":   8,
+                "float32": 16,   "float64": 64,   "int8":    256,
+                "uint16":  512,  "uint32":  768,  "int64":   1024,
+                "uint64":  1280 }
+
+NIFTI_HEADER_SIZE = 348
+NIFTI_VOX_OFFSET = 352
+
+
+def anatomical_orientation(direction):
+    #
+    # MetaImage AnatomicalOrientation string for a row-major 3x3 direction (e.g. "RAI"
+    # for the identity), written the same way ITK's MetaImageIO does
+    #
+    letters = ( ("R", "L"), ("A", "P"), ("I", "S") )
+    orientation = ""
+
+    for column in range(3):
+        values = [ direction[row*3 + column] for row in range(3) ]
+        axis = max( range(3), key=lambda row: abs(values[row]) )
+        orientation += letters[axis][0] if values[axis] > 0 else letters[axis][1]
+
+    return orientation
+
+
+def meta_header(size, spacing, origin, direction, dtype, ncomp=1, dataFile="LOCAL"):
+    #
+    # Build a MetaImage header (text). dataFile is "LOCAL" for .mha or the name of the raw file for .mhd
+    #
+    dtype = np.dtype(dtype)
+    if dtype.name not in META_TYPES:
+        raise ValueError("Unsupported MetaImage pixel type: " + dtype.name)
+
+    # TransformMatrix is written column by column
+    transform = [ direction[row*3 + column] for column in range(3) for row in range(3) ]
+
+    lines = [ "ObjectType = Image",
+              "NDims = 3",
+              "BinaryData = True",
+              "BinaryDataByteOrderMSB = False",
+              "CompressedData = False",
+              "TransformMatrix = " + " ".join( repr(float(v)) for v in transform ),
+              "Offset = " + " ".join( repr(float(v)) for v in origin ),
+              "CenterOfRotation = 0 0 0",
+              "AnatomicalOrientation = " + anatomical_orientation(direction),
+              "ElementSpacing = " + " ".join( repr(float(v)) for v in spacing ),
+              "DimSize = " + " ".join( str(int(v)) for v in size ) ]
+
+    if ncomp > 1:
+        lines.append("ElementNumberOfChannels = " + str(ncomp))
+
+    lines.append("ElementType = " + META_TYPES[dtype.name])
+    lines.append("ElementDataFile = " + dataFile)
+
+    return "\n".join(lines) + "\n"
+
+
+def _quaternion(rotation):
+    #
+    # Quaternion parameters (b, c, d) and qfac of a 3x3 rotation (row-major), as in nifti1_io.c
+    #
+    r11, r12, r13, r21, r22, r23, r31, r32, r33 = rotation
+
+    determinant = ( r11*(r22*r33 - r32*r23) - r12*(r21*r33 - r31*r23) + r13*(r21*r32 - r31*r22) )
+
+    qfac = 1.0
+    if determinant < 0:
+        qfac = -1.0
+        r13, r23, r33 = -r13, -r23, -r33
+
+    a = r11 + r22 + r33 + 1.0
+    if a > 0.5:
+        a = 0.5 * math.sqrt(a)
+        b = 0.25 * (r32 - r23) / a
+        c = 0.25 * (r13 - r31) / a
+        d = 0.25 * (r21 - r12) / a
+    else:
+        xd = 1.0 + r11 - (r22 + r33)
+        yd = 1.0 + r22 - (r11 + r33)
+        zd = 1.0 + r33 - (r11 + r22)
+
+        if xd > 1.0:
+            b = 0.5 * math.sqrt(xd)
+            c = 0.25 * (r12 + r21) / b
+            d = 0.25 * (r13 + r31) / b
+            a = 0.25 * (r32 - r23) / b
+        elif yd > 1.0:
+            c = 0.5 * math.sqrt(yd)
+            b = 0.25 * (r12 + r21) / c
+            d = 0.25 * (r23 + r32) / c
+            a = 0.25 * (r13 - r31) / c
+        else:
+            d = 0.5 * math.sqrt(zd)
+            b = 0.25 * (r13 + r31) / d
+            c = 0.25 * (r23 + r32) / d
+            a = 0.25 * (r21 - r12) / d
+
+        if a < 0.0:
+            b, c, d = -b, -c, -d
+
+    return (b, c, d, qfac)
+
+
+def nifti_header(size, spacing, origin, direction, dtype):
+    #
+    # Build a single-file (.nii) NIfTI-1 header including the 4 byte extension flag.
+    # The voxel data starts right after it, at NIFTI_VOX_OFFSET.
+    #
+    dtype = np.dtype(dtype)
+    if dtype.name not in NIFTI_TYPES:
+        raise ValueError("Unsupported NIfTI pixel type: " + dtype.name)
+
+    # LPS -> RAS: negate the first two rows
+    flip = (-1.0, -1.0, 1.0)
+    rotation = [ flip[row] * direction[row*3 + column] for row in range(3) for column in range(3) ]
+    offset = [ flip[row] * origin[row] for row in range(3) ]
+
+    b, c, d, qfac = _quaternion(rotation)
+
+    srow = []
+    for row in range(3):
+        srow.append( [ rotation[row*3 + column] * spacing[column] for column in range(3) ] + [ offset[row] ] )
+
+    header = bytearray(NIFTI_VOX_OFFSET)
+
+    struct.pack_into("<i", header, 0, NIFTI_HEADER_SIZE)                        # sizeof_hdr
+    header[38] = ord("r")                                                       # regular
+    struct.pack_into("<8h", header, 40, 3, size[0], size[1], size[2], 1, 1, 1, 1)   # dim
+    struct.pack_into("<hh", header, 70, NIFTI_TYPES[dtype.name], dtype.itemsize * 8) # datatype, bitpix
+    struct.pack_into("<8f", header, 76, qfac, spacing[0], spacing[1], spacing[2], 0, 0, 0, 0) # pixdim
+    struct.pack_into("<f", header, 108, NIFTI_VOX_OFFSET)                       # vox_offset
+    struct.pack_into("<ff", header, 112, 1.0, 0.0)                              # scl_slope, scl_inter
+    header[123] = 10                                                            # xyzt_units: mm, sec
+    struct.pack_into("<hh", header, 252, 1, 1)                                  # qform_code, sform_code
+    struct.pack_into("<6f", header, 256, b, c, d, offset[0], offset[1], offset[2])  # quatern_b/c/d, qoffset_x/y/z
+    struct.pack_into("<12f", header, 280, *(srow[0] + srow[1] + srow[2]))       # srow_x/y/z
+    header[344:348] = b"n+1\x00"                                                # magic
+
+    return bytes(header)
+
+
+def _rotation(b, c, d, qfac):
+    #
+    # 3x3 rotation (row-major) of NIfTI quaternion parameters, as in nifti1_io.c
+    #
+    a = 1.0 - (b*b + c*c + d*d)
+    if a < 1e-7:
+        a = 1.0 / math.sqrt(b*b + c*c + d*d)
+        b, c, d = a*b, a*c, a*d
+        a = 0.0
+    else:
+        a = math.sqrt(a)
+
+    return [ a*a + b*b - c*c - d*d,   2*b*c - 2*a*d,           qfac * (2*b*d + 2*a*c),
+             2*b*c + 2*a*d,           a*a + c*c - b*b - d*d,   qfac * (2*c*d - 2*a*b),
+             2*b*d - 2*a*c,           2*c*d + 2*a*b,           qfac * (a*a + d*d - c*c - b*b) ]
+
+
+def nifti_byte_order(header):
+    #
+    # "<" or ">" for a NIfTI-1 header (from sizeof_hdr), raises ValueError if it is not a NIfTI-1 header
+    #
+    for byteOrder in ["<", ">"]:
+        if struct.unpack_from(byteOrder + "i", header, 0)[0] == NIFTI_HEADER_SIZE:
+            return byteOrder
+
+    raise ValueError("Not a NIfTI-1 header")
+
+
+def read_nifti_geometry(header):
+    #
+    # Size, spacing, origin, and direction (LPS, row-major) of a NIfTI-1 header.
+    # The sform is used if it is set, otherwise the qform (the same as SimpleITK for orthogonal transforms).
+    #
+    byteOrder = nifti_byte_order(header)
+
+    dim = struct.unpack_from(byteOrder + "8h", header, 40)
+    pixdim = struct.unpack_from(byteOrder + "8f", header, 76)
+    qformCode, sformCode = struct.unpack_from(byteOrder + "hh", header, 252)
+
+    size = tuple( int(dim[i]) if i <= dim[0] else 1 for i in range(1, 4) )
+    spacing = tuple( float(abs(pixdim[i])) if pixdim[i] != 0 else 1.0 for i in range(1, 4) )
+
+    if sformCode > 0:
+        srow = struct.unpack_from(byteOrder + "12f", header, 280)
+        rotation = []
+        for row in range(3):
+            rotation += [ srow[row*4 + column] / spacing[column] for column in range(3) ]
+        offset = [ srow[row*4 + 3] for row in range(3) ]
+    elif qformCode > 0:
+        b, c, d, qx, qy, qz = struct.unpack_from(byteOrder + "6f", header, 256)
+        rotation = _rotation( b, c, d, -1.0 if pixdim[0] < 0 else 1.0 )
+        offset = [qx, qy, qz]
+    else:
+        rotation = [1,0,0, 0,1,0, 0,0,1]
+        offset = [0, 0, 0]
+
+    # RAS -> LPS: negate the first two rows
+    flip = (-1.0, -1.0, 1.0)
+    direction = tuple( flip[row] * float(rotation[row*3 + column]) for row in range(3) for column in range(3) )
+    origin = tuple( flip[row] * float(offset[row]) for row in range(3) )
+
+    return (size, spacing, origin, direction)
+
+
+def update_nifti_geometry(header, origin, direction):
+    #
+    # Copy of a NIfTI-1 header with the qform and sform replaced by origin and direction (LPS, row-major).
+    # Everything else (including pixdim[1:4], the voxel size) is kept.
+    #
+    byteOrder = nifti_byte_order(header)
+    header = bytearray(header)
+
+    spacing = read_nifti_geometry(header)[1]
+
+    # LPS -> RAS: negate the first two rows
+    flip = (-1.0, -1.0, 1.0)
+    rotation = [ flip[row] * direction[row*3 + column] for row in range(3) for column in range(3) ]
+    offset = [ flip[row] * origin[row] for row in range(3) ]
+
+    b, c, d, qfac = _quaternion(rotation)
+
+    srow = []
+    for row in range(3):
+        srow += [ rotation[row*3 + column] * spacing[column] for column in range(3) ] + [ offset[row] ]
+
+    qformCode, sformCode = struct.unpack_from(byteOrder + "hh", header, 252)
+
+    struct.pack_into(byteOrder + "f", header, 76, qfac)                          # pixdim[0]
+    struct.pack_into(byteOrder + "hh", header, 252, max(qformCode, 1), max(sformCode, 1)) # qform_code, sform_code
+    struct.pack_into(byteOrder + "6f", header, 256, b, c, d, offset[0], offset[1], offset[2]) # quatern_b/c/d, qoffset_x/y/z
+    struct.pack_into(byteOrder + "12f", header, 280, *srow)                      # srow_x/y/z
+
+    return bytes(header)
+
+
+def read_meta_header(fileName):
+    #
+    # Read the header of a MetaImage (MHA/MHD) file
+    # @returns:
+    #   fields:      list of [key, value] (strings) in file order
+    #   headerSize:  header size in bytes, i.e. where the voxel data starts in a .mha file
+    #
+    fields = []
+    headerSize = 0
+
+    with open(fileName, "rb") as metaFile:
+        for line in metaFile:
+            headerSize += len(line)
+            key, separator, value = line.decode("latin-1").partition("=")
+
+            if separator == "":
+                raise ValueError("Not a MetaImage header: " + fileName)
+
+            fields.append( [key.strip(), value.strip()] )
+
+            if key.strip() == "ElementDataFile":
+                break
+
+    return (fields, headerSize)
+
+
+def meta_geometry(fields):
+    #
+    # Size, spacing, origin, and direction (LPS, row-major) of MetaImage header fields (from read_meta_header)
+    #
+    values = dict( (key, value) for key, value in fields )
+
+    size = tuple( int(v) for v in values["DimSize"].split() )
+    spacing = tuple( float(v) for v in values.get("ElementSpacing", "1 1 1").split() )
+
+    origin = "0 0 0"
+    for key in ["Offset", "Position", "Origin"]:
+        if key in values:
+            origin = values[key]
+    origin = tuple( float(v) for v in origin.split() )
+
+    transform = "1 0 0 0 1 0 0 0 1"
+    for key in ["TransformMatrix", "Rotation", "Orientation"]:
+        if key in values:
+            transform = values[key]
+    transform = [ float(v) for v in transform.split() ]
+
+    # TransformMatrix is written column by column
+    direction = tuple( transform[column*3 + row] for row in range(3) for column in range(3) )
+
+    return (size, spacing, origin, direction)
+
+
+def update_meta_fields(fields, origin, direction):
+    #
+    # Copy of MetaImage header fields with the origin and direction (LPS, row-major) replaced
+    #
+    transform = " ".join( repr(float( direction[row*3 + column] )) for column in range(3) for row in range(3) )
+    offset = " ".join( repr(float(v)) for v in origin )
+
+    updated = []
+    for key, value in fields:
+        if key in ["TransformMatrix", "Rotation", "Orientation"]:
+            value = transform
+        elif key in ["Offset", "Position", "Origin"]:
+            value = offset
+        elif key == "AnatomicalOrientation":
+            value = anatomical_orientation(direction)
+        updated.append( [key, value] )
+
+    keys = [ key for key, value in fields ]
+    if not any( key in keys for key in ["TransformMatrix", "Rotation", "Orientation"] ):
+        updated.insert( len(updated) - 1, ["TransformMatrix", transform] )
+    if not any( key in keys for key in ["Offset", "Position", "Origin"] ):
+        updated.insert( len(updated) - 1, ["Offset", offset] )
+
+    return updated